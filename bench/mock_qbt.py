@@ -0,0 +1,539 @@
+"""
+本地模拟 qBittorrent WebUI（仅实现 qbt.py 用到的接口），用于基准测试。
+
+用法：
+    python bench/mock_qbt.py --torrents 10000 --port 18080 --latency 0.002
+"""
+import argparse
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+USERNAME = "admin"
+PASSWORD = "adminadmin"
+
+TRACKER_DOMAINS = [
+    "tracker.xxx.com",
+    "pt.your",
+    "ptl.your",
+    "tracker.m-your.cc",
+    "tracker.site-a.org",
+    "tracker.site-b.net",
+    "open.tracker.example",
+]
+TAGS = ["", "", "", "MOVIEPILOT", "PTD", "GAME", "TV", "keep"]
+CATEGORIES = ["", "movie", "tv", "music", "game"]
+GROUPS = ["aaa", "bbb", "ccc", "ddd", "web", "raw"]
+# 固定基准时间，保证多次生成的种子库完全一致
+NOW = 1760000000
+STATES = ["uploading", "stalledUP", "stalledUP", "pausedUP", "queuedUP", "downloading"]
+
+
+def generate_library(count, seed=42):
+    """
+    生成合成种子库：约 30% 的种子属于 (name, size) 重复组（辅种），
+    另有约 5% 为改名后的辅种（文件相同、名称不同）
+    :param count: 种子数量
+    :param seed: 随机种子，保证可复现
+    :return: dict - hash -> 种子记录
+    """
+    rng = random.Random(seed)
+    library = {}
+    now = NOW
+    base = []
+    while len(library) < count:
+        roll = rng.random()
+        if base and roll < 0.30:
+            # 同名同大小的辅种，换一个 tracker
+            src = rng.choice(base)
+            entry = dict(src, trackers=[_tracker_url(rng)])
+        elif base and roll < 0.35:
+            # 改名辅种：文件列表相同，顶层目录名不同
+            src = rng.choice(base)
+            entry = dict(src, name=src["name"] + ".REPACK", trackers=[_tracker_url(rng)])
+        else:
+            entry = _new_release(rng, len(base))
+            base.append(entry)
+        h = "%040x" % rng.getrandbits(160)
+        library[h] = _build_torrent(rng, h, entry, now)
+    return library
+
+
+def _tracker_url(rng):
+    domain = rng.choice(TRACKER_DOMAINS)
+    return f"https://{domain}/announce.php?passkey={rng.getrandbits(64):016x}"
+
+
+def _new_release(rng, idx):
+    group = rng.choice(GROUPS)
+    name = f"Release.{idx:06d}.{rng.randint(1990, 2025)}.1080p.BluRay.x264-{group}"
+    files = []
+    for i in range(rng.randint(1, 4)):
+        files.append({"name": f"{name}/part{i}.mkv", "size": rng.randint(50, 20000) * 1024 * 1024})
+    trackers = [_tracker_url(rng)]
+    if rng.random() < 0.2:
+        trackers.append(_tracker_url(rng))
+    return {
+        "name": name,
+        "files": files,
+        "trackers": trackers,
+        "comment": rng.choice(["", f"https://site.example/details.php?id={idx}"]),
+        "piece_size": rng.choice([1, 2, 4, 8, 16]) * 1024 * 1024,
+    }
+
+
+def _build_torrent(rng, h, entry, now):
+    total_size = sum(f["size"] for f in entry["files"])
+    added_on = now - rng.randint(0, 3 * 365 * 86400)
+    files = [
+        {"name": entry["name"] + "/" + f["name"].split("/", 1)[1], "size": f["size"]}
+        for f in entry["files"]
+    ]
+    uploaded = int(total_size * rng.random() * 3)
+    return {
+        "info": {
+            "hash": h,
+            "name": entry["name"],
+            "total_size": total_size,
+            "size": total_size,
+            "progress": 1,
+            "tags": rng.choice(TAGS),
+            "category": rng.choice(CATEGORIES),
+            "added_on": added_on,
+            "completion_on": added_on + 600,
+            "up_limit": rng.choice([0, 0, 0, 600 * 1024]),
+            "dl_limit": 0,
+            "state": rng.choice(STATES),
+            "tracker": entry["trackers"][0],
+            "trackers_count": len(entry["trackers"]),
+            "ratio": round(uploaded / total_size, 4) if total_size else 0,
+            "uploaded": uploaded,
+            "upspeed": rng.choice([0, 0, 0, rng.randint(1, 5000) * 1024]),
+            "dlspeed": 0,
+            "num_complete": rng.randint(0, 200),
+            "num_incomplete": rng.randint(0, 20),
+            "num_seeds": 0,
+            "num_leechs": 0,
+            "save_path": "/downloads",
+            "content_path": "/downloads/" + entry["name"],
+            "magnet_uri": f"magnet:?xt=urn:btih:{h}",
+            "seeding_time": rng.randint(0, 10**7),
+            "last_activity": now - rng.randint(0, 10**6),
+            "amount_left": 0,
+            "auto_tmm": False,
+            "availability": -1,
+            "force_start": False,
+            "priority": 0,
+            "seq_dl": False,
+            "super_seeding": False,
+            "time_active": rng.randint(0, 10**7),
+        },
+        "trackers": list(entry["trackers"]),
+        "comment": entry["comment"],
+        "piece_size": entry["piece_size"],
+        "files": files,
+    }
+
+
+STATE_FILTERS = {
+    "all": None,
+    "downloading": {"downloading", "stalledDL", "metaDL", "queuedDL", "pausedDL", "forcedDL"},
+    "seeding": {"uploading", "stalledUP", "checkingUP", "queuedUP", "forcedUP"},
+    "completed": {"uploading", "stalledUP", "queuedUP", "pausedUP", "forcedUP", "checkingUP"},
+    "paused": {"pausedUP", "pausedDL"},
+    "stopped": {"pausedUP", "pausedDL"},
+    "active": {"uploading", "downloading", "forcedUP", "forcedDL"},
+    "inactive": {"stalledUP", "stalledDL", "pausedUP", "pausedDL", "queuedUP", "queuedDL"},
+    "resumed": {"uploading", "stalledUP", "queuedUP", "downloading", "stalledDL", "forcedUP"},
+    "running": {"uploading", "stalledUP", "queuedUP", "downloading", "stalledDL", "forcedUP"},
+    "stalled": {"stalledUP", "stalledDL"},
+    "checking": {"checkingUP", "checkingDL", "checkingResumeData"},
+    "moving": {"moving"},
+    "errored": {"error", "missingFiles"},
+}
+
+
+class MockState:
+    """模拟服务端状态：种子库、会话、sync 变更日志和调用统计"""
+
+    def __init__(self, library, latency=0.0, error_rate=0.0, max_inflight=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_inflight = max_inflight
+        self.lock = threading.Lock()
+        self.sessions = {}  # SID -> 该会话已下发的 rid 集合（与 qBittorrent 一样按会话记录同步状态）
+        self.last_rid = 0
+        self.rid_versions = {}  # rid -> 下发时的 version
+        self.inflight = 0
+        self.rng = random.Random(7)
+        self.load(library)
+        self.reset_stats()
+
+    def load(self, library):
+        """替换整个种子库（基准测试在会修改数据的命令之后恢复原始种子库）"""
+        with self.lock:
+            self.library = library
+            self.version = 0
+            self.changes = []  # [(version, hash, fields | None)]，None 表示删除
+            self.sessions = {sid: set() for sid in self.sessions}
+
+    def reset_stats(self):
+        with self.lock:
+            self.calls = {}
+            self.bytes_out = 0
+            self.bytes_in = 0
+            self.peak_inflight = 0
+
+    def record_change(self, h, fields):
+        self.version += 1
+        self.changes.append((self.version, h, fields))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "calls": dict(self.calls),
+                "total_calls": sum(self.calls.values()),
+                "bytes_out": self.bytes_out,
+                "bytes_in": self.bytes_in,
+                "peak_inflight": self.peak_inflight,
+                "torrents": len(self.library),
+            }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    state = None  # type: MockState
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _params(self):
+        parsed = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(parsed.query, keep_blank_values=True).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length)
+            with self.state.lock:
+                self.state.bytes_in += length
+            ctype = self.headers.get("Content-Type", "")
+            if "multipart/form-data" in ctype:
+                params.update(_parse_multipart(body, ctype))
+            else:
+                form = parse_qs(body.decode("utf-8"), keep_blank_values=True)
+                params.update({k: v[-1] for k, v in form.items()})
+        return parsed.path, params
+
+    def _send(self, code, payload, cookie=None):
+        if isinstance(payload, (dict, list)):
+            body = json.dumps(payload).encode("utf-8")
+            ctype = "application/json"
+        else:
+            body = str(payload).encode("utf-8")
+            ctype = "text/plain; charset=UTF-8"
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        if cookie:
+            self.send_header("Set-Cookie", f"SID={cookie}; HttpOnly; path=/")
+        self.end_headers()
+        self.wfile.write(body)
+        with self.state.lock:
+            self.state.bytes_out += len(body)
+
+    def _handle(self):
+        st = self.state
+        path, params = self._params()
+        if path.startswith("/bench/"):
+            return self._bench(path, params)
+        endpoint = path.replace("/api/v2/", "", 1)
+        with st.lock:
+            st.calls[endpoint] = st.calls.get(endpoint, 0) + 1
+            st.inflight += 1
+            st.peak_inflight = max(st.peak_inflight, st.inflight)
+            # 登录接口不参与过载/故障模拟
+            limited = endpoint != "auth/login"
+            overloaded = limited and st.max_inflight and st.inflight > st.max_inflight
+            fail = limited and st.error_rate and st.rng.random() < st.error_rate
+        try:
+            if st.latency:
+                time.sleep(st.latency)
+            if overloaded or fail:
+                return self._send(503, "Service Unavailable")
+            if endpoint == "auth/login":
+                if params.get("username") == USERNAME and params.get("password") == PASSWORD:
+                    sid = secrets.token_hex(16)
+                    with st.lock:
+                        st.sessions[sid] = set()
+                    return self._send(200, "Ok.", cookie=sid)
+                return self._send(200, "Fails.")
+            sid = self._session_id()
+            if sid is None:
+                return self._send(403, "Forbidden")
+            handler = ROUTES.get(endpoint)
+            if handler is None:
+                return self._send(404, "Not Found")
+            params["_sid"] = sid
+            code, payload = handler(st, params)
+            return self._send(code, payload)
+        finally:
+            with st.lock:
+                st.inflight -= 1
+
+    def _session_id(self):
+        cookie = self.headers.get("Cookie", "")
+        for part in cookie.split(";"):
+            key, _, value = part.strip().partition("=")
+            if key == "SID" and value in self.state.sessions:
+                return value
+        return None
+
+    def _bench(self, path, params):
+        st = self.state
+        if path == "/bench/stats":
+            return self._send(200, st.stats())
+        if path == "/bench/reset":
+            st.reset_stats()
+            return self._send(200, "Ok.")
+        if path == "/bench/expire_sessions":
+            with st.lock:
+                st.sessions.clear()
+            return self._send(200, "Ok.")
+        if path == "/bench/mutate":
+            return self._send(200, _mutate(st, int(params.get("count", 10)), int(params.get("add", 0))))
+        return self._send(404, "Not Found")
+
+
+def _parse_multipart(body, ctype):
+    boundary = ctype.split("boundary=", 1)[1].encode()
+    out = {}
+    for part in body.split(b"--" + boundary):
+        head, _, value = part.partition(b"\r\n\r\n")
+        if b'name="' not in head:
+            continue
+        name = head.split(b'name="', 1)[1].split(b'"', 1)[0].decode()
+        out[name] = value.rsplit(b"\r\n", 1)[0].decode("utf-8")
+    return out
+
+
+def _hashes(st, params):
+    raw = params.get("hashes", "")
+    if raw == "all":
+        return list(st.library)
+    return [h for h in raw.split("|") if h]
+
+
+def _api_torrents_info(st, params):
+    with st.lock:
+        items = [t["info"] for t in st.library.values()]
+    if params.get("hashes"):
+        wanted = set(params["hashes"].split("|"))
+        items = [t for t in items if t["hash"] in wanted]
+    states = STATE_FILTERS.get(params.get("filter") or "all")
+    if states:
+        items = [t for t in items if t["state"] in states]
+    if params.get("category") is not None and "category" in params:
+        items = [t for t in items if t["category"] == params["category"]]
+    if "tag" in params:
+        tag = params["tag"]
+        items = [
+            t for t in items
+            if (tag == "" and not t["tags"]) or tag in [x.strip() for x in t["tags"].split(",")]
+        ]
+    if params.get("sort"):
+        key = params["sort"]
+        items.sort(key=lambda t: t.get(key), reverse=params.get("reverse") == "true")
+    offset = int(params.get("offset") or 0)
+    if offset:
+        items = items[offset:]
+    if params.get("limit"):
+        items = items[: int(params["limit"])]
+    return 200, items
+
+
+def _api_trackers(st, params):
+    t = st.library.get(params.get("hash"))
+    if t is None:
+        return 404, "Not Found"
+    rows = [
+        {"url": "** [DHT] **", "status": 2, "tier": -1, "num_peers": 0, "msg": ""},
+        {"url": "** [PeX] **", "status": 2, "tier": -1, "num_peers": 0, "msg": ""},
+        {"url": "** [LSD] **", "status": 2, "tier": -1, "num_peers": 0, "msg": ""},
+    ]
+    for i, url in enumerate(t["trackers"]):
+        rows.append({"url": url, "status": 2, "tier": i, "num_peers": 5, "msg": ""})
+    return 200, rows
+
+
+def _api_properties(st, params):
+    t = st.library.get(params.get("hash"))
+    if t is None:
+        return 404, "Not Found"
+    info = t["info"]
+    return 200, {
+        "comment": t["comment"],
+        "piece_size": t["piece_size"],
+        "total_size": info["total_size"],
+        "addition_date": info["added_on"],
+        "save_path": info["save_path"],
+        "share_ratio": info["ratio"],
+        "total_uploaded": info["uploaded"],
+        "up_limit": info["up_limit"],
+    }
+
+
+def _api_files(st, params):
+    t = st.library.get(params.get("hash"))
+    if t is None:
+        return 404, "Not Found"
+    return 200, [
+        {"index": i, "name": f["name"], "size": f["size"], "progress": 1, "priority": 1}
+        for i, f in enumerate(t["files"])
+    ]
+
+
+def _api_delete(st, params):
+    with st.lock:
+        for h in _hashes(st, params):
+            if st.library.pop(h, None) is not None:
+                st.record_change(h, None)
+    return 200, ""
+
+
+def _api_set_upload_limit(st, params):
+    limit = int(params.get("limit", 0))
+    with st.lock:
+        for h in _hashes(st, params):
+            t = st.library.get(h)
+            if t is not None and t["info"]["up_limit"] != limit:
+                t["info"]["up_limit"] = limit
+                st.record_change(h, {"up_limit": limit})
+    return 200, ""
+
+
+def _set_state(st, params, paused):
+    with st.lock:
+        for h in _hashes(st, params):
+            t = st.library.get(h)
+            if t is None:
+                continue
+            new_state = "pausedUP" if paused else "stalledUP"
+            if t["info"]["state"] != new_state:
+                t["info"]["state"] = new_state
+                st.record_change(h, {"state": new_state})
+    return 200, ""
+
+
+def _api_maindata(st, params):
+    rid = int(params.get("rid") or 0)
+    with st.lock:
+        issued = st.sessions[params["_sid"]]
+        known = rid in issued
+        st.last_rid += 1
+        new_rid = st.last_rid
+        issued.add(new_rid)
+        st.rid_versions[new_rid] = st.version
+        if not known:
+            return 200, {
+                "rid": new_rid,
+                "full_update": True,
+                "torrents": {h: dict(t["info"]) for h, t in st.library.items()},
+                "categories": {},
+                "tags": [],
+                "server_state": {},
+            }
+        since = st.rid_versions[rid]
+        torrents, removed = {}, []
+        for version, h, fields in st.changes:
+            if version <= since:
+                continue
+            if fields is None:
+                torrents.pop(h, None)
+                removed.append(h)
+            elif h in st.library:
+                torrents.setdefault(h, {}).update(fields)
+        payload = {"rid": new_rid, "torrents": torrents, "server_state": {}}
+        if removed:
+            payload["torrents_removed"] = removed
+        return 200, payload
+
+
+def _mutate(st, count, add):
+    """模拟服务端变化：修改若干种子的上传数据，并新增若干种子"""
+    with st.lock:
+        hashes = list(st.library)
+        for h in st.rng.sample(hashes, min(count, len(hashes))):
+            info = st.library[h]["info"]
+            info["uploaded"] += 1024 * 1024
+            info["upspeed"] = st.rng.randint(0, 5000) * 1024
+            st.record_change(h, {"uploaded": info["uploaded"], "upspeed": info["upspeed"]})
+        if add:
+            extra = generate_library(add, seed=st.rng.getrandbits(32))
+            for h, t in extra.items():
+                st.library[h] = t
+                st.record_change(h, dict(t["info"]))
+    return {"version": st.version}
+
+
+ROUTES = {
+    "app/version": lambda st, p: (200, "v4.6.7"),
+    "app/webapiVersion": lambda st, p: (200, "2.9.3"),
+    "torrents/info": _api_torrents_info,
+    "torrents/trackers": _api_trackers,
+    "torrents/properties": _api_properties,
+    "torrents/files": _api_files,
+    "torrents/delete": _api_delete,
+    "torrents/setUploadLimit": _api_set_upload_limit,
+    "torrents/pause": lambda st, p: _set_state(st, p, True),
+    "torrents/stop": lambda st, p: _set_state(st, p, True),
+    "torrents/resume": lambda st, p: _set_state(st, p, False),
+    "torrents/start": lambda st, p: _set_state(st, p, False),
+    "sync/maindata": _api_maindata,
+}
+
+
+def serve(library, port=0, latency=0.0, error_rate=0.0, max_inflight=0):
+    """
+    在后台线程启动模拟服务
+    :return: (server, state)，server.server_address[1] 为实际端口
+    """
+    state = MockState(library, latency=latency, error_rate=error_rate, max_inflight=max_inflight)
+    handler = type("BoundHandler", (Handler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="模拟 qBittorrent WebUI")
+    parser.add_argument("--torrents", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求注入的延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回 503 的概率")
+    parser.add_argument("--max-inflight", type=int, default=0, help="超过该并发数返回 503，0 为不限")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    server, _ = serve(
+        generate_library(args.torrents, args.seed),
+        port=args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        max_inflight=args.max_inflight,
+    )
+    print(f"模拟服务已启动：http://127.0.0.1:{server.server_address[1]}  用户 {USERNAME} / {PASSWORD}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,232 @@
+"""
+qbt.py 基准测试：对本地模拟 WebUI 运行各命令，记录耗时、API 调用数、传输字节数和峰值内存，
+并与保存的基线对比，出现性能回退时以非零状态退出。
+
+用法：
+    python bench/run_bench.py                          # 1k / 10k / 100k 种子，全部命令
+    python bench/run_bench.py --sizes 1000 --commands export,total
+    python bench/run_bench.py --save-baseline          # 将本次结果保存为基线
+    python bench/run_bench.py --latency 0.01           # 模拟较慢的 WebUI
+
+仅支持 Linux / macOS（依赖 os.wait4 回收子进程）。
+"""
+import argparse
+import copy
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_qbt import PASSWORD, USERNAME, generate_library, serve  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QBT = os.path.join(ROOT, "qbt.py")
+DEFAULT_BASELINE = os.path.join(ROOT, "bench", "baseline.json")
+
+# 命令 -> qbt.py 参数；会修改种子库的命令放在最后，运行后恢复原始种子库
+COMMANDS = {
+    "export": ["export"],
+    "total": ["total"],
+    "search": ["search", "Release.0001"],
+    "limit": ["limit"],
+    "del": ["del"],
+}
+MUTATING = {"limit", "del"}
+
+# 与 config/demo.yaml 结构一致的测试配置，tracker / 标签 / 官组与模拟种子库对应
+BENCH_CONFIG = {
+    "delete_files_on_remove": True,
+    "required_summer": ["tracker.m-your.cc"],
+    "upload_speed_limits_by_tracker": {"pt.your": 600, "ptl.your": 600},
+    "export_options": {"deduplicate": True},
+    "active_strategies": ["tracker_tag_filter", "missing_trackers", "official_group"],
+    "check_strategies": {
+        "missing_trackers": {"required_trackers": ["tracker.xxx.com"]},
+        "official_group": {"groups": {"group1": ["aaa", "bbb"]}, "selected_group": "group1"},
+        "tracker_tag_filter": {"forbidden_tags": ["MOVIEPILOT", "PTD", "GAME"]},
+    },
+}
+
+# 回退判定：超过基线的比例，以及耗时 / 内存的绝对容差（避免小数值上的抖动误报）
+TOLERANCE = {"wall_s": 0.25, "api_calls": 0.10, "bytes": 0.10, "peak_rss_mb": 0.25}
+SLACK = {"wall_s": 0.5, "api_calls": 5, "bytes": 64 * 1024, "peak_rss_mb": 10}
+
+# 以包装脚本运行 qbt.py，退出时记录自身的峰值内存。Linux 下 fork 出的子进程的 ru_maxrss 会继承父进程
+# （持有模拟种子库和模拟服务）的峰值，因此改为读取 exec 后重新计算的 VmHWM；没有 /proc 时退回 ru_maxrss
+LAUNCHER = """
+import atexit, os, runpy, sys
+
+def record_peak():
+    try:
+        with open("/proc/self/status") as f:
+            peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        return
+    with open(os.environ["QBT_BENCH_PEAK"], "w") as f:
+        f.write(str(peak_kb))
+
+atexit.register(record_peak)
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def write_config(workdir, port):
+    """在临时目录中写入 config.yml 与 config/bench.yaml"""
+    import yaml
+
+    os.makedirs(os.path.join(workdir, "config"), exist_ok=True)
+    with open(os.path.join(workdir, "config.yml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump({"use_env": "bench"}, f)
+    config = dict(BENCH_CONFIG)
+    config["qbittorrent"] = {"host": "127.0.0.1", "port": port, "username": USERNAME, "password": PASSWORD}
+    with open(os.path.join(workdir, "config", "bench.yaml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, allow_unicode=True)
+
+
+def run_command(workdir, args, warm=False):
+    """
+    以子进程运行一次 qbt.py
+    :param warm: 是否保留上一次运行留下的本地缓存
+    :return: (dict - 耗时与峰值内存, int - 退出码)
+    """
+    if not warm:
+        shutil.rmtree(os.path.join(workdir, "cache"), ignore_errors=True)
+    log_path = os.path.join(workdir, "qbt.log")
+    peak_path = os.path.join(workdir, "peak_kb")
+    if os.path.exists(peak_path):
+        os.remove(peak_path)
+    env = dict(os.environ, QBT_BENCH_PEAK=peak_path)
+    with open(log_path, "w", encoding="utf-8") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-c", LAUNCHER, QBT] + args, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        _, status, rusage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+    code = os.waitstatus_to_exitcode(status) if hasattr(os, "waitstatus_to_exitcode") else status >> 8
+    proc.returncode = code  # 已由 wait4 回收，避免 Popen 再次等待
+    if os.path.exists(peak_path):
+        with open(peak_path, encoding="utf-8") as f:
+            rss = int(f.read()) / 1024
+    else:
+        # Linux 下 ru_maxrss 单位为 KB，macOS 为字节
+        rss = rusage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    if code != 0:
+        with open(log_path, encoding="utf-8") as f:
+            print(f.read()[-2000:])
+    return {"wall_s": round(wall, 3), "peak_rss_mb": round(rss, 1)}, code
+
+
+def run_size(size, commands, latency, warm):
+    """
+    对一种规模的种子库运行所有命令
+    :return: dict - 命令 -> 指标
+    """
+    print(f"\n🧪 生成 {size} 个种子的模拟种子库...")
+    pristine = generate_library(size)
+    server, state = serve(copy.deepcopy(pristine), latency=latency)
+    workdir = tempfile.mkdtemp(prefix="qbt-bench-")
+    results = {}
+    try:
+        write_config(workdir, server.server_address[1])
+        for name in commands:
+            state.reset_stats()
+            metrics, code = run_command(workdir, COMMANDS[name], warm)
+            stats = state.stats()
+            metrics.update({
+                "api_calls": stats["total_calls"],
+                "bytes": stats["bytes_out"] + stats["bytes_in"],
+                "calls": stats["calls"],
+                "exit_code": code,
+            })
+            results[name] = metrics
+            print(
+                f"  {name:<7} {metrics['wall_s']:>8.2f}s  {metrics['api_calls']:>7} 次请求  "
+                f"{metrics['bytes'] / 1024 / 1024:>8.1f} MB  峰值内存 {metrics['peak_rss_mb']:>7.1f} MB"
+                + ("" if code == 0 else f"  ❌ 退出码 {code}")
+            )
+            if name in MUTATING:
+                state.load(copy.deepcopy(pristine))
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline):
+    """
+    :return: list - 回退说明
+    """
+    regressions = []
+    for size, commands in results.items():
+        for name, metrics in commands.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            if metrics["exit_code"] != 0:
+                regressions.append(f"{size} {name}: 退出码 {metrics['exit_code']}")
+            for key, tolerance in TOLERANCE.items():
+                limit = max(base[key] * (1 + tolerance), base[key] + SLACK[key])
+                if metrics[key] > limit:
+                    regressions.append(f"{size} {name}: {key} {base[key]} → {metrics[key]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="qbt.py 基准测试")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="种子库规模，逗号分隔")
+    parser.add_argument("--commands", default=",".join(COMMANDS), help="要测试的命令，逗号分隔")
+    parser.add_argument("--latency", type=float, default=0.002, help="每个请求注入的延迟（秒）")
+    parser.add_argument("--warm", action="store_true", help="保留本地缓存，测试缓存命中时的性能")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument("--output", help="将本次结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    commands = [c for c in args.commands.split(",") if c]
+    unknown = [c for c in commands if c not in COMMANDS]
+    if unknown:
+        parser.error(f"未知命令: {', '.join(unknown)}")
+    # 会修改种子库的命令放到最后运行
+    commands.sort(key=lambda c: c in MUTATING)
+
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",") if s):
+        results[str(size)] = run_size(size, commands, args.latency, args.warm)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        for size, commands_result in results.items():
+            baseline.setdefault(size, {}).update(commands_result)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 基线已保存 → {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("\nℹ️ 未找到基线文件，使用 --save-baseline 保存")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f))
+    if regressions:
+        print("\n❌ 性能回退：")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\n✅ 与基线相比无回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
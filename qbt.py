@@ -1,530 +1,3906 @@
 import math
-import qbittorrentapi
 import csv
 import sys
 import datetime
+import json
+import threading
+import time
 from collections import defaultdict
-import yaml
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import os
 
-# 读取主配置文件
-with open("config.yml", "r", encoding="utf-8") as f:  # 添加 encoding="utf-8"
-    main_config = yaml.safe_load(f)
-env_name = main_config["use_env"]
+# 命令行选项：选项名 -> 是否需要取值
+CLI_OPTIONS = {
+    "--format": True,  # 导出格式，见 EXPORT_FORMATS
+    "--output": True,  # 导出路径，"-" 表示输出到标准输出
+    "--profile": False,  # 输出各接口调用与各阶段耗时的性能分析
+    "--profile-json": True,  # 同时将性能分析写入 JSON 文件（隐含 --profile）
+    "--interval": True,  # watch 轮询间隔（秒）
+    "--env": True,  # 要操作的环境，逗号分隔，覆盖 config.yml
+    "--regex": True,  # search：名称匹配正则表达式
+    "--tracker": True,  # search：包含任一 tracker 关键字，逗号分隔
+    "--after": True,  # search：添加日期不早于 YYYY-MM-DD
+    "--before": True,  # search：添加日期早于 YYYY-MM-DD
+    "--files": False,  # search：关键词同时匹配种子内的文件路径
+    "--offline": False,  # search：只查询本地索引，不请求 WebUI
+    "--state": True,  # search：种子状态，见 STATUS_FILTERS
+    "--category": True,  # search：分类
+    "--tag": True,  # search：标签
+    "--dry-run": False,  # del / limit / reclaim：只把计划写入执行日志，不执行
+    "--resume": False,  # del / limit / reclaim：按执行日志继续上次未完成的任务
+}
 
-# 读取环境特定的配置文件
-config_path = os.path.join("config", f"{env_name}.yaml")
-with open(config_path, "r", encoding="utf-8") as f:  # 添加 encoding="utf-8"
-    config = yaml.safe_load(f)
+
+def parse_args(argv):
+    """
+    从命令行参数中分离出 --xxx 选项（支持 --key value 与 --key=value），其余参数保持原来的位置语义
+    :return: (list - 位置参数, dict - 选项，键名去掉 -- 前缀)
+    """
+    args, options = [], {}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg.startswith("--"):
+            key, has_value, value = arg.partition("=")
+            if key not in CLI_OPTIONS:
+                print(f"❌ 未知选项: {key}")
+                sys.exit(1)
+            if CLI_OPTIONS[key] and not has_value:
+                i += 1
+                if i >= len(argv):
+                    print(f"❌ 选项 {key} 需要取值")
+                    sys.exit(1)
+                value = argv[i]
+            options[key[2:]] = value if CLI_OPTIONS[key] else True
+        else:
+            args.append(arg)
+        i += 1
+    return args, options
+
+cli_args, cli_options = parse_args(sys.argv[1:]) if __name__ == "__main__" else ([], {})
+if cli_options.get("output") == "-":
+    # 导出到标准输出时，提示信息改为输出到标准错误，避免混入导出数据
+    sys.stdout = sys.stderr
+
+
+# 性能分析：记录各 API 接口的调用次数、耗时分布和重试，以及命令各阶段的耗时
+class Profiler:
+    def __init__(self, enabled=False):
+        """
+        :param enabled: 未开启时不包装客户端，阶段计时照常进行但不输出
+        """
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.endpoints = defaultdict(lambda: {"calls": 0, "attempts": 0, "errors": 0, "latencies": []})
+        self.retries = defaultdict(int)  # 应用层重试（并发请求重试、批量失败后逐个重试）
+        self.phases = {}  # 阶段路径 -> 累计耗时（秒），按首次进入的顺序排列
+        self._local = threading.local()  # 每个线程各自的阶段栈
+
+    @property
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def instrument(self, client):
+        """
+        包装客户端的请求方法：_auth_request 为一次逻辑调用，_request 为一次 HTTP 请求，
+        两者之差即 qbittorrentapi 内部的重试（5xx 重试、403 重新登录）
+        :return: 传入的客户端
+        """
+        if not self.enabled:
+            return client
+        auth_request, request = client._auth_request, client._request
+
+        def endpoint_of(kwargs):
+            namespace = kwargs.get("api_namespace")
+            return f"{getattr(namespace, 'value', namespace)}/{kwargs.get('api_method')}"
+
+        def counted_auth_request(**kwargs):
+            with self.lock:
+                self.endpoints[endpoint_of(kwargs)]["calls"] += 1
+            return auth_request(**kwargs)
+
+        def timed_request(**kwargs):
+            start = time.perf_counter()
+            ok = False
+            try:
+                result = request(**kwargs)
+                ok = True
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    stats = self.endpoints[endpoint_of(kwargs)]
+                    stats["attempts"] += 1
+                    stats["latencies"].append(elapsed)
+                    if not ok:
+                        stats["errors"] += 1
+
+        client._auth_request = counted_auth_request
+        client._request = timed_request
+        return client
+
+    def record_retry(self, label, count=1):
+        if self.enabled:
+            with self.lock:
+                self.retries[label] += count
+
+    @contextmanager
+    def phase(self, name):
+        """
+        记录一个阶段的耗时，阶段可以嵌套；多个线程同时进入同一阶段时耗时累加
+        :param name: 阶段名称，如 fetch / group / filter / act / write
+        """
+        stack = self._stack
+        stack.append(name)
+        path = " > ".join(stack)
+        with self.lock:
+            self.phases.setdefault(path, 0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases[path] += time.perf_counter() - start
+            stack.pop()
+
+    def propagate(self, fn):
+        """
+        包装要在其他线程中执行的函数，使其中记录的阶段嵌套在当前阶段之下
+        :return: function
+        """
+        parent = list(self._stack)
+
+        def wrapper(*args, **kwargs):
+            self._local.stack = list(parent)
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    @staticmethod
+    def _percentile(sorted_values, p):
+        if not sorted_values:
+            return 0.0
+        index = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+        return sorted_values[index]
+
+    def to_dict(self):
+        endpoints = {}
+        for endpoint, stats in self.endpoints.items():
+            latencies = sorted(stats["latencies"])
+            endpoints[endpoint] = {
+                "calls": stats["calls"],
+                "attempts": stats["attempts"],
+                "retries": max(0, stats["attempts"] - stats["calls"]),
+                "errors": stats["errors"],
+                "total_s": round(sum(latencies), 4),
+                "p50_ms": round(self._percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(self._percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(self._percentile(latencies, 99) * 1000, 2),
+                "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            }
+        return {
+            "argv": sys.argv[1:],
+            "total_s": round(time.perf_counter() - self.started, 4),
+            "phases": {path: round(seconds, 4) for path, seconds in self.phases.items()},
+            "endpoints": endpoints,
+            "retries": dict(self.retries),
+        }
+
+    def report(self, json_path=None):
+        """
+        输出性能分析摘要
+        :param json_path: 同时写入 JSON 报告的路径，便于对比多次运行
+        """
+        if not self.enabled:
+            return
+        data = self.to_dict()
+        total = data["total_s"] or 1e-9
+        print(f"\n⏱️ 性能分析：总耗时 {data['total_s']:.2f}s")
+        print("  阶段耗时：")
+        for path, seconds in data["phases"].items():
+            depth = path.count(" > ")
+            name = "  " * depth + path.rsplit(" > ", 1)[-1]
+            print(f"    {name:<28}{seconds:>9.2f}s {seconds / total:>7.1%}")
+        print("  API 调用：")
+        print(f"    {'接口':<26}{'调用':>7}{'重试':>6}{'失败':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'总耗时':>9}")
+        for endpoint, stats in sorted(data["endpoints"].items(), key=lambda kv: -kv[1]["total_s"]):
+            print(
+                f"    {endpoint:<28}{stats['calls']:>7}{stats['retries']:>6}{stats['errors']:>6}"
+                f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['total_s']:>9.2f}s"
+            )
+        for label, count in data["retries"].items():
+            print(f"  🔁 {label}：{count} 次")
+        if json_path:
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            print(f"  📝 性能报告已写入 {json_path}")
+
+
+profiler = Profiler(enabled="profile" in cli_options or "profile-json" in cli_options)
+
+
+def convert_size(size_bytes):
+    """
+    将字节大小转换为合适的单位
+    :param size_bytes: 字节大小
+    :return: 转换后的字符串，如 "1.23 GB"
+    """
+    if size_bytes == 0:
+        return "0 B"
+    units = ("B", "KB", "MB", "GB", "TB", "PB")
+    i = min(int(math.log(size_bytes, 1024)), len(units) - 1)
+    size = round(size_bytes / (1024 ** i), 2)
+    return f"{size} {units[i]}"
+
+
+def parse_size(value):
+    """
+    解析大小：纯字节数，或带单位（KB / MB / GB / TB / PB，按 1024 换算，可省略 B），如 "5TB"、"500G"
+    :param value: str
+    :return: int - 字节数
+    """
+    import re
+
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGTP]?)(?:I?B)?\s*", value, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"无法解析大小：{value}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** "_KMGTP".index(unit.upper() or "_"))
+
+
+# 不属于真实站点的 tracker 协议标记
+SKIP_TRACKER_PROTOCOLS = ("[DHT]", "[PeX]", "[LSD]")
+
+
+def is_valid_tracker(url):
+    """
+    判断 tracker 是否为真实站点（排除 DHT、PeX、LSD）
+    :param url: tracker URL
+    :return: bool
+    """
+    return not any(proto in url for proto in SKIP_TRACKER_PROTOCOLS)
+
+
+# AIMD 自适应并发窗口：请求顺利时线性扩大，出错或明显变慢时减半
+class AdaptiveLimiter:
+    # 延迟低于该值（秒）时不认为是变慢，避免本地网络抖动导致误判
+    SLOW_LATENCY_FLOOR = 0.05
+
+    def __init__(self, max_inflight, min_inflight=1, slow_factor=3.0):
+        self.max_inflight = max(1, max_inflight)
+        self.min_inflight = max(1, min(min_inflight, self.max_inflight))
+        self.slow_factor = slow_factor
+        self.window = float(self.min_inflight)
+        self.peak = self.window
+        self.inflight = 0
+        self.baseline = None  # 延迟基线（指数滑动平均）
+        self.last_backoff = 0.0
+        self.backoffs = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.inflight >= int(self.window):
+                self.cond.wait()
+            self.inflight += 1
+
+    def release(self, ok, latency):
+        """
+        归还一个并发名额并根据结果调整窗口
+        :param ok: 请求是否成功
+        :param latency: 请求耗时（秒）
+        """
+        with self.cond:
+            self.inflight -= 1
+            slow = (
+                self.baseline is not None
+                and latency > self.SLOW_LATENCY_FLOOR
+                and latency > self.baseline * self.slow_factor
+            )
+            if ok:
+                weight = 0.05 if slow else 0.1
+                self.baseline = latency if self.baseline is None else self.baseline * (1 - weight) + latency * weight
+            if ok and not slow:
+                self.window = min(self.max_inflight, self.window + 1 / self.window)
+            else:
+                # 同一轮并发里的多次失败只减半一次
+                now = time.monotonic()
+                if now - self.last_backoff > max(self.baseline or 0, self.SLOW_LATENCY_FLOOR):
+                    self.window = max(self.min_inflight, self.window / 2)
+                    self.last_backoff = now
+                    self.backoffs += 1
+            self.peak = max(self.peak, self.window)
+            self.cond.notify_all()
+
+
+# 并发抓取引擎：线程池执行请求，由 AdaptiveLimiter 控制同时在途的请求数
+class ConcurrentFetcher:
+    def __init__(self, max_workers=16, min_workers=1, retries=3, slow_factor=3.0):
+        self.max_workers = max(1, max_workers)
+        self.min_workers = min_workers
+        self.retries = retries
+        self.slow_factor = slow_factor
+        self._pool = None  # 线程池在多次 map 之间复用，线程内的客户端随之复用
+
+    def map(self, fn, items):
+        """
+        并发执行 fn(item)，失败时指数退避重试
+        :param fn: 单个请求函数
+        :param items: 请求参数列表（需可哈希）
+        :return: (dict - item -> 结果, dict - item -> 异常)
+        """
+        import qbittorrentapi
+
+        limiter = AdaptiveLimiter(self.max_workers, self.min_workers, self.slow_factor)
+
+        def run(item):
+            for attempt in range(self.retries + 1):
+                limiter.acquire()
+                start = time.monotonic()
+                try:
+                    value = fn(item)
+                except qbittorrentapi.NotFound404Error as e:
+                    # 种子已不存在，重试无意义
+                    limiter.release(True, time.monotonic() - start)
+                    return item, None, e
+                except Exception as e:
+                    limiter.release(False, time.monotonic() - start)
+                    if attempt == self.retries:
+                        return item, None, e
+                    profiler.record_retry("并发请求重试")
+                    time.sleep(min(0.2 * 2 ** attempt, 5))
+                else:
+                    limiter.release(True, time.monotonic() - start)
+                    return item, value, None
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="qbt-fetch")
+        results, errors = {}, {}
+        for item, value, error in self._pool.map(run, items):
+            if error is None:
+                results[item] = value
+            else:
+                errors[item] = error
+        print(
+            f"⚡ 并发请求 {len(results) + len(errors)} 个，失败 {len(errors)} 个，"
+            f"并发窗口峰值 {int(limiter.peak)}，降速 {limiter.backoffs} 次"
+        )
+        return results, errors
+
+
+# 批量执行器：把 hash 列表分块后一次请求处理一整块，只有失败的块才逐个重试
+class BatchExecutor:
+    def __init__(self, chunk_size=200):
+        self.chunk_size = max(1, chunk_size)
+
+    def run(self, label, hashes, action, record=None):
+        """
+        :param label: 操作名称（用于输出）
+        :param hashes: hash 列表
+        :param action: 接收一组 hash 的请求函数
+        :param record: 执行日志的记录函数 function(op, hashes, error=None)，见 Journal.recorder
+        :return: (list - 成功的 hash, dict - 失败的 hash -> 异常)
+        """
+        record = record or (lambda op, hashes, error=None: None)
+        with profiler.phase(label):
+            done, errors = [], {}
+            chunks = [hashes[i:i + self.chunk_size] for i in range(0, len(hashes), self.chunk_size)]
+            for idx, chunk in enumerate(chunks, 1):
+                record("begin", chunk)
+                try:
+                    action(chunk)
+                    done.extend(chunk)
+                    record("done", chunk)
+                    print(f"📦 {label} 批次 {idx}/{len(chunks)}：{len(chunk)} 个成功")
+                    continue
+                except Exception as e:
+                    print(f"⚠️ {label} 批次 {idx}/{len(chunks)} 失败（{e}），逐个重试 {len(chunk)} 个")
+                    profiler.record_retry(f"{label}批次失败后逐个重试", len(chunk))
+                for h in chunk:
+                    try:
+                        action([h])
+                        done.append(h)
+                        record("done", [h])
+                    except Exception as e:
+                        errors[h] = e
+                        record("fail", [h], e)
+                print(f"📦 {label} 批次 {idx}/{len(chunks)}：重试后成功 {len(chunk) - len([h for h in chunk if h in errors])} 个")
+        return done, errors
+
+
+# 执行日志中读出的上一次任务：计划，以及各实例每个步骤（delete / pause / limit / resume）的进度
+class JournalState:
+    def __init__(self):
+        self.command = None
+        self.dry_run = False
+        self.planned = False  # 计划已完整写入
+        self.finished = False
+        self.plan = defaultdict(dict)  # 实例名 -> hash -> 计划条目
+        self.begun = defaultdict(set)  # (实例名, 步骤) -> 已发出请求的 hash
+        self.done = defaultdict(set)  # (实例名, 步骤) -> 已完成的 hash
+        self.failed = defaultdict(set)  # (实例名, 步骤) -> 最近一次失败、之后没有成功的 hash
+        self.paused = defaultdict(set)  # 实例名 -> 最近一次暂停请求之后还没有恢复成功的 hash
+
+    def apply(self, entry):
+        op = entry.get("op")
+        if op == "start":
+            self.command = entry.get("command")
+            self.dry_run = entry.get("dry_run", False)
+        elif op == "plan":
+            self.plan[entry["instance"]][entry["hash"]] = entry
+        elif op == "planned":
+            self.planned = True
+        elif op == "begin":
+            self.begun[(entry["instance"], entry["step"])].update(entry["hashes"])
+            if entry["step"] == "pause":
+                self.paused[entry["instance"]].update(entry["hashes"])
+        elif op == "done":
+            key = (entry["instance"], entry["step"])
+            self.done[key].update(entry["hashes"])
+            self.failed[key].difference_update(entry["hashes"])
+            if entry["step"] == "resume":
+                self.paused[entry["instance"]].difference_update(entry["hashes"])
+        elif op == "fail":
+            self.failed[(entry["instance"], entry["step"])].update(entry["hashes"])
+        elif op == "finish":
+            self.finished = True
+
+    def remaining(self, instance, step):
+        """
+        :return: list - 计划中尚未完成该步骤的 hash
+        """
+        done = self.done[(instance, step)]
+        return [h for h in self.plan[instance] if h not in done]
+
+    def uncertain(self, instance, step, hashes):
+        """
+        :return: list - 请求已发出、但没有成功记录的 hash（可能已经生效）
+        """
+        begun = self.begun[(instance, step)]
+        return [h for h in hashes if h in begun]
+
+    def paused_before(self, instance):
+        """
+        :return: set - limit 中由本脚本暂停、还没有恢复成功的 hash
+                 （暂停请求已发出但结果未知的也算在内，恢复运行中的种子没有影响）。
+                 按日志顺序判断：同一种子在多次运行中先恢复、后来又被暂停的仍算在内
+        """
+        return set(self.paused[instance])
+
+    def failures(self):
+        """
+        :return: int - 有步骤失败且尚未重试成功的种子数
+        """
+        return len({(instance, h) for (instance, _), hashes in self.failed.items() for h in hashes})
+
+    def pending(self):
+        """
+        :return: int - 计划中主操作尚未完成的种子数
+        """
+        return sum(
+            1
+            for instance, plan in self.plan.items()
+            for h, entry in plan.items()
+            if h not in self.done[(instance, entry["action"])]
+        )
+
+
+# 执行日志：del / limit / reclaim 执行前把完整计划（hash → 操作）写入追加式 JSONL 文件，
+# 每批请求发出前和完成后各记一行。中途崩溃或断线后用 --resume 继续：已完成的跳过，
+# 请求已发出但没有结果的种子先向 WebUI 确认，重新开始的代价只与剩余的工作量有关
+class Journal:
+    def __init__(self, command, instances):
+        """
+        :param command: 命令名，每个命令一个日志文件
+        :param instances: 本次操作的实例，日志保存在主实例的缓存目录
+        """
+        self.command = command
+        directory = os.path.dirname(instances[0].cache_path) or "."
+        names = "+".join(inst.name for inst in instances)
+        self.path = os.path.join(directory, f"{names}.{command}.journal")
+        self._lock = threading.Lock()
+        self._file = None
+        self._failed = set()  # 本次运行中失败、之后没有成功的 (实例名, 步骤, hash)
+
+    def load(self):
+        """
+        :return: JournalState，没有日志时为 None
+        """
+        if not os.path.exists(self.path):
+            return None
+        state = JournalState()
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # 进程在写入时崩溃，最后一行不完整
+                state.apply(entry)
+        return state
+
+    def start(self, entries, dry_run=False):
+        """
+        新建日志并写入完整计划，覆盖上一次的日志
+        :param entries: list - 计划条目 dict（instance、hash、name、action 及操作参数）
+        :param dry_run: 演练模式，只写计划不执行
+        """
+        previous = self.load()
+        if previous is not None and previous.planned and not previous.finished:
+            print(
+                f"⚠️ 上次的 {self.command} 任务还有 {previous.pending()} 个种子未完成，本次重新计划并覆盖执行日志；"
+                f"如需继续上次的任务请使用 --resume"
+            )
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._write({"op": "start", "command": self.command, "dry_run": dry_run, "at": time.time()}, flush=False)
+        for entry in entries:
+            self._write({"op": "plan", **entry}, flush=False)
+        self._write({"op": "planned", "count": len(entries)})
+
+    def reopen(self):
+        """在已有的日志后继续追加（--resume）"""
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._write({"op": "resume", "at": time.time()})
+
+    def record(self, instance, step, op, hashes, error=None):
+        """
+        :param op: begin 请求发出前 / done 已完成 / fail 失败
+        """
+        entry = {"op": op, "instance": instance, "step": step, "hashes": list(hashes)}
+        if error is not None:
+            entry["error"] = str(error)
+        with self._lock:
+            if op == "fail":
+                self._failed.update((instance, step, h) for h in entry["hashes"])
+            elif op == "done":
+                self._failed.difference_update((instance, step, h) for h in entry["hashes"])
+        self._write(entry)
+
+    def recorder(self, inst, step):
+        """
+        :return: function(op, hashes, error=None) - 记录某个实例某一步骤的进度，供 BatchExecutor 使用
+        """
+        return lambda op, hashes, error=None: self.record(inst.name, step, op, hashes, error)
+
+    def finish(self):
+        """
+        全部成功时写入 finish；仍有失败的种子时不写，日志保持未完成，--resume 会重试这些种子
+        :return: bool - 是否已全部完成
+        """
+        failed = len({(instance, h) for instance, _, h in self._failed})
+        if failed:
+            print(f"⚠️ {failed} 个种子处理失败，执行日志保留为未完成，可用 python qbt.py {self.command} --resume 重试")
+        else:
+            self._write({"op": "finish", "at": time.time()})
+        self.close()
+        return not failed
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, entry, flush=True):
+        # 多实例时各实例在各自的线程中记录
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if flush:
+                self._file.flush()
+
+
+def open_cache_db(path):
+    """
+    打开本地缓存数据库（快照与持久化元数据缓存共用）
+    :param path: SQLite 文件路径
+    :return: sqlite3 连接
+    """
+    import sqlite3
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # 多实例时各实例的缓存在各自的线程中读写，同一时刻只有一个线程使用同一个连接
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    return db
+
+
+# 紧凑的种子记录：只保留各命令用到的字段（torrents_info 每个种子有几十个字段），
+# 重复出现的字符串（状态、标签、分类、tracker）驻留为同一个对象
+class TorrentRecord:
+    FIELDS = (
+        "hash", "name", "total_size", "added_on", "state", "tags", "category",
+        "tracker", "trackers_count", "up_limit", "ratio", "upspeed", "num_complete", "uploaded",
+    )
+    INTERNED = frozenset(("state", "tags", "category", "tracker"))
+    DEFAULTS = {"name": "", "total_size": 0, "added_on": 0, "state": "", "tags": "", "category": "",
+                "tracker": "", "trackers_count": 0, "up_limit": 0, "ratio": 0, "upspeed": 0, "num_complete": 0, "uploaded": 0}
+    __slots__ = FIELDS + ("instance",)
+
+    def __init__(self, data):
+        """
+        :param data: 种子信息 dict（torrents_info / sync/maindata 的种子条目或快照中保存的数据）
+        """
+        self.instance = None  # 所在实例，由 Fleet 设置
+        for field, default in self.DEFAULTS.items():
+            setattr(self, field, default)
+        self.update(data)
+
+    def update(self, fields):
+        """
+        合并变化的字段，未保留的字段直接忽略
+        :param fields: dict
+        """
+        for field, value in fields.items():
+            if field in self.INTERNED and isinstance(value, str):
+                setattr(self, field, sys.intern(value))
+            elif field in _RECORD_FIELDS:
+                setattr(self, field, value)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+_RECORD_FIELDS = frozenset(TorrentRecord.FIELDS)
+
+
+def project_torrent(obj):
+    """
+    json.loads 的 object_hook：完整的种子条目在解析时就只保留 TorrentRecord 的字段，
+    不会同时保留全部原始字段（也不转换为 qbittorrentapi 的属性字典）
+    """
+    # 只有完整的种子条目同时带有 name 和 added_on，sync/maindata 的增量条目本来就很小
+    if "added_on" in obj and "name" in obj:
+        return {field: obj[field] for field in TorrentRecord.FIELDS if field in obj}
+    return obj
+
+
+# torrents/info 的状态筛选 -> 包含的种子状态（与 qBittorrent 的判断一致），启用快照时按这里在本地筛选
+# paused 在 Web API 2.11 起改名为 stopped，两种写法都可以
+STATUS_FILTERS = {
+    "downloading": frozenset((
+        "downloading", "metaDL", "forcedMetaDL", "stalledDL", "checkingDL",
+        "pausedDL", "stoppedDL", "queuedDL", "forcedDL",
+    )),
+    "seeding": frozenset(("uploading", "stalledUP", "checkingUP", "queuedUP", "forcedUP")),
+    "completed": frozenset(("uploading", "stalledUP", "checkingUP", "pausedUP", "stoppedUP", "queuedUP", "forcedUP")),
+    "paused": frozenset(("pausedDL", "pausedUP", "stoppedDL", "stoppedUP")),
+    "stalled": frozenset(("stalledUP", "stalledDL")),
+    "checking": frozenset(("checkingUP", "checkingDL", "checkingResumeData")),
+    "moving": frozenset(("moving",)),
+    "errored": frozenset(("error", "missingFiles")),
+}
+STATUS_FILTERS["stopped"] = STATUS_FILTERS["paused"]
+
+
+# 种子列表的查询条件：状态、分类、标签、hash。请求 WebUI 时作为 torrents/info 的参数由 qBittorrent 筛选，
+# 启用快照时对同步下来的种子在本地做同样的判断
+class TorrentQuery:
+    def __init__(self, status=None, category=None, tag=None, hashes=None):
+        """
+        :param status: 状态筛选，见 STATUS_FILTERS
+        :param category: 分类，空字符串表示未分类
+        :param tag: 标签，空字符串表示无标签
+        :param hashes: hash 列表
+        :raises ValueError: 状态筛选无效
+        """
+        if status is not None and status not in STATUS_FILTERS:
+            raise ValueError(f"状态只能是 {' / '.join(STATUS_FILTERS)}")
+        self.status = status
+        self.category = category
+        self.tag = tag
+        self.hashes = list(hashes) if hashes is not None else None
+        self._hash_set = frozenset(self.hashes) if hashes is not None else None
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        :param config: dict - state / category / tag，未填写的不筛选
+        """
+        config = config or {}
+        return cls(config.get("state"), config.get("category"), config.get("tag"))
+
+    def is_empty(self):
+        return self.status is None and self.category is None and self.tag is None and self.hashes is None
+
+    @property
+    def fields(self):
+        """
+        :return: frozenset - 筛选时读取的种子字段
+        """
+        used = {"state": self.status, "category": self.category, "tags": self.tag, "hash": self.hashes}
+        return frozenset(field for field, value in used.items() if value is not None)
+
+    def override(self, other):
+        """
+        :param other: TorrentQuery，已指定的条件优先
+        :return: TorrentQuery
+        """
+        pick = lambda mine, theirs: mine if theirs is None else theirs  # noqa: E731
+        return TorrentQuery(
+            pick(self.status, other.status), pick(self.category, other.category),
+            pick(self.tag, other.tag), pick(self.hashes, other.hashes),
+        )
+
+    def params(self, client):
+        """
+        :param client: qBittorrent 客户端，paused / stopped 需要按 Web API 版本换算
+        :return: dict - torrents/info 的请求参数
+        """
+        params = {}
+        if self.status is not None:
+            status = self.status
+            if status in ("paused", "stopped"):
+                version = tuple(int(x) for x in client.app_web_api_version().split(".")[:2])
+                status = "stopped" if version >= (2, 11) else "paused"
+            params["filter"] = status
+        if self.category is not None:
+            params["category"] = self.category
+        if self.tag is not None:
+            params["tag"] = self.tag
+        if self.hashes is not None:
+            params["hashes"] = "|".join(self.hashes)
+        return params
+
+    def matches(self, torrent):
+        """
+        :param torrent: TorrentRecord
+        :return: bool
+        """
+        if self.status is not None and torrent.state not in STATUS_FILTERS[self.status]:
+            return False
+        if self.category is not None and torrent.category != self.category:
+            return False
+        if self.tag is not None:
+            tags = [t.strip() for t in torrent.tags.split(",") if t.strip()]
+            if (self.tag not in tags) if self.tag else tags:
+                return False
+        if self._hash_set is not None and torrent.hash not in self._hash_set:
+            return False
+        return True
+
+    def filter(self, torrents):
+        """
+        :param torrents: TorrentRecord 列表
+        :return: list - 满足条件的种子
+        """
+        if self.is_empty():
+            return list(torrents)
+        return [t for t in torrents if self.matches(t)]
+
+    def describe(self):
+        parts = []
+        if self.status is not None:
+            parts.append(f"状态 {self.status}")
+        if self.category is not None:
+            parts.append(f"分类 {self.category or '（未分类）'}")
+        if self.tag is not None:
+            parts.append(f"标签 {self.tag or '（无标签）'}")
+        if self.hashes is not None:
+            parts.append(f"{len(self.hashes)} 个 hash")
+        return "，".join(parts)
+
+
+# 连续退回重新请求的最多次数，种子列表持续变化（或服务端排序不稳定）时不会一直退回
+PAGE_RESYNC_LIMIT = 10
+
+
+def iter_torrent_pages(client, query=None, page_size=5000):
+    """
+    分页请求 torrents/info，每页解析后即产出，不会一次性生成完整种子列表的响应。
+    按 hash 排序保证翻页顺序固定，但 offset 会随种子增删移动：翻页期间新增的种子使后续页面出现重复条目，
+    删除的种子使后续页面整体前移、跳过种子。因此相邻页面相互重叠一部分并按 hash 去重；
+    新一页为空或第一个 hash 大于上一页的最后一个时，说明删除的种子超过了重叠部分，退回重新请求，
+    连续退回时每次退回的页数加倍，最多连续 PAGE_RESYNC_LIMIT 次。每页 1 个种子时无法重叠，按 offset 顺序翻页
+    :param query: TorrentQuery，筛选条件由 qBittorrent 完成
+    :param page_size: 每页种子数，0 表示不分页
+    :return: generator - TorrentRecord
+    """
+    from qbittorrentapi import APINames
+
+    params = query.params(client) if query is not None else {}
+    overlap = min(max(1, page_size // 20), page_size - 1) if page_size else 0
+    resyncs = 0  # 连续退回的次数
+    warned = False
+    seen = set()
+    offset = 0
+    last = None  # 上一页最后一个 hash
+    while True:
+        data = dict(params)
+        if page_size:
+            data.update(sort="hash", limit=page_size, offset=offset)
+        with profiler.phase("page"):
+            raw = client._post_cast(_name=APINames.Torrents, _method="info", data=data, response_class=bytes)
+            page = json.loads(raw, object_hook=project_torrent)
+            del raw
+        if overlap and offset and (not page or page[0]["hash"] > last):
+            if resyncs < PAGE_RESYNC_LIMIT:
+                offset = max(0, offset - page_size * 2 ** resyncs)
+                resyncs += 1
+                continue
+            if not warned:
+                warned = True
+                print("⚠️ 翻页期间种子列表持续变化，本次获取的种子列表可能不完整")
+        resyncs = 0
+        for item in page:
+            if item["hash"] not in seen:
+                seen.add(item["hash"])
+                yield TorrentRecord(item)
+        if not page_size or len(page) < page_size:
+            return
+        last = page[-1]["hash"]
+        offset += page_size - overlap
+
+
+# 本地快照：通过 sync/maindata 增量同步种子列表，只保存 TorrentRecord 中的字段
+class SnapshotStore:
+    def __init__(self, db):
+        self.db = db
+        self.db.execute("CREATE TABLE IF NOT EXISTS torrents (hash TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        self.torrents = None  # hash -> TorrentRecord，首次同步时从数据库加载，之后常驻内存
+
+    def get_meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(value)))
+
+    def apply(self, client, rid=None):
+        """
+        从上次保存的 rid 开始拉取一次变更并写入快照，只处理变化的部分
+        :param client: qBittorrent 客户端
+        :param rid: 指定起始 rid，默认读取快照中保存的值
+        :return: (dict - hash -> 本次变化的字段, list - 被移除的 hash, bool - 是否为全量同步)
+        """
+        if rid is None:
+            rid = int(self.get_meta("rid", 0))
+            # 保存的字段少于当前需要的字段（升级后新增了字段）时重新全量同步
+            saved_fields = self.get_meta("fields")
+            if saved_fields is not None and not _RECORD_FIELDS.issubset(saved_fields.split(",")):
+                rid = 0
+        data = self._fetch_maindata(client, rid)
+        if self.torrents is None:
+            self.torrents = {
+                h: TorrentRecord(json.loads(d)) for h, d in self.db.execute("SELECT hash, data FROM torrents")
+            }
+        torrents = self.torrents
+        full_update = bool(data.get("full_update"))
+        changed = data.get("torrents") or {}
+        if full_update:
+            removed = [h for h in torrents if h not in changed]
+            torrents.clear()
+        else:
+            removed = [h for h in data.get("torrents_removed") or [] if h in torrents]
+            # 本地快照缺失该种子的完整信息（例如快照被清空），只能重新全量同步
+            if any(h not in torrents and "name" not in fields for h, fields in changed.items()):
+                return self.apply(client, rid=0)
+
+        for h, fields in changed.items():
+            record = torrents.get(h)
+            if record is None:
+                torrents[h] = TorrentRecord(dict(fields, hash=h))
+            else:
+                record.update(fields)
+        for h in removed:
+            torrents.pop(h, None)
+
+        with self.db:
+            if full_update:
+                self.db.execute("DELETE FROM torrents")
+            self.db.executemany(
+                "INSERT OR REPLACE INTO torrents VALUES (?, ?)",
+                ((h, json.dumps(torrents[h].to_dict(), ensure_ascii=False)) for h in changed),
+            )
+            self.db.executemany("DELETE FROM torrents WHERE hash = ?", ((h,) for h in removed))
+            self.set_meta("rid", data.get("rid", 0))
+            self.set_meta("fields", ",".join(TorrentRecord.FIELDS))
+        return changed, removed, full_update
+
+    @staticmethod
+    def _fetch_maindata(client, rid):
+        """
+        请求 sync/maindata 并自行解析（见 project_torrent），全量同步十万个种子时不会同时保留全部原始字段
+        :return: dict
+        """
+        from qbittorrentapi import APINames
+
+        raw = client._post_cast(_name=APINames.Sync, _method="maindata", data={"rid": rid}, response_class=bytes)
+        return json.loads(raw, object_hook=project_torrent)
+
+    def sync(self, client, rid=None):
+        """
+        同步快照并返回全部种子
+        :return: list - TorrentRecord（与快照共用同一批对象）
+        """
+        changed, removed, full_update = self.apply(client, rid)
+        mode = "全量" if full_update else "增量"
+        print(f"🔄 快照{mode}同步：更新 {len(changed)} 个，移除 {len(removed)} 个，共 {len(self.torrents)} 个种子")
+        return list(self.torrents.values())
+
+    def get(self, hashes):
+        """
+        读取指定种子，不请求 WebUI；快照尚未加载到内存时只从数据库读取这些种子
+        :param hashes: hash 列表
+        :return: list - TorrentRecord（按传入顺序，快照中不存在的跳过）
+        """
+        if self.torrents is not None:
+            return [self.torrents[h] for h in hashes if h in self.torrents]
+        found = {}
+        hashes = list(hashes)
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            found.update(self.db.execute(
+                f"SELECT hash, data FROM torrents WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return [TorrentRecord(json.loads(found[h])) for h in hashes if h in found]
+
+
+# 持久化元数据缓存：按 infohash 保存 tracker 列表、种子注释和内容指纹
+# - 注释和内容指纹对同一个 infohash 不会变化，永不过期
+# - tracker 列表在种子的 tracker / trackers_count 变化或超过 TTL 时失效
+# - 超过 max_entries 时按最近使用时间淘汰，种子从客户端消失后立即删除
+class MetaStore:
+    TOUCH_INTERVAL = 86400  # 最近使用时间的更新粒度（秒），避免每次运行都改写全部记录
+
+    def __init__(self, db, tracker_ttl=7 * 86400, max_entries=200000):
+        self.db = db
+        self.tracker_ttl = tracker_ttl
+        self.max_entries = max_entries
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(trackers)")]
+        if columns and "fetched_at" not in columns:
+            # 旧版本的 tracker 表没有时间字段，缓存数据直接重建
+            self.db.execute("DROP TABLE trackers")
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS trackers (
+                hash TEXT PRIMARY KEY,
+                urls TEXT NOT NULL,
+                tracker TEXT,
+                trackers_count INTEGER,
+                fetched_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS comments (
+                hash TEXT PRIMARY KEY,
+                comment TEXT NOT NULL,
+                used_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                hash TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                used_at REAL NOT NULL
+            );
+            """
+        )
+
+    def load(self):
+        """
+        :return: (dict - hash -> (tracker 列表, tracker 字段, trackers_count, used_at),
+                  dict - hash -> (注释, used_at),
+                  dict - hash -> (内容指纹, used_at))，已过期的 tracker 不返回
+        """
+        expire_before = time.time() - self.tracker_ttl
+        # 同一站点的 tracker 地址（含 passkey）在大量种子间重复，驻留后只保存一份
+        trackers = {
+            h: ([sys.intern(url) for url in json.loads(urls)], tracker, count, used_at)
+            for h, urls, tracker, count, used_at in self.db.execute(
+                "SELECT hash, urls, tracker, trackers_count, used_at FROM trackers WHERE fetched_at >= ?",
+                (expire_before,),
+            )
+        }
+        comments = {
+            h: (comment, used_at)
+            for h, comment, used_at in self.db.execute("SELECT hash, comment, used_at FROM comments")
+        }
+        fingerprints = {
+            h: (fingerprint, used_at)
+            for h, fingerprint, used_at in self.db.execute("SELECT hash, fingerprint, used_at FROM fingerprints")
+        }
+        return trackers, comments, fingerprints
+
+    def save(self, trackers, comments, fingerprints, used):
+        """
+        写入新获取的数据并更新最近使用时间
+        :param trackers: [(hash, tracker 列表, tracker 字段, trackers_count)]
+        :param comments: [(hash, 注释)]
+        :param fingerprints: [(hash, 内容指纹)]
+        :param used: 本次复用过的 hash 列表
+        """
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO trackers VALUES (?, ?, ?, ?, ?, ?)",
+                ((h, json.dumps(urls), tracker, count, now, now) for h, urls, tracker, count in trackers),
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO comments VALUES (?, ?, ?)",
+                ((h, comment, now) for h, comment in comments),
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?)",
+                ((h, fingerprint, now) for h, fingerprint in fingerprints),
+            )
+            for table in ("trackers", "comments", "fingerprints"):
+                self.db.executemany(
+                    f"UPDATE {table} SET used_at = ? WHERE hash = ?", ((now, h) for h in used)
+                )
+                self.db.execute(
+                    f"DELETE FROM {table} WHERE hash IN "
+                    f"(SELECT hash FROM {table} ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def forget(self, hashes):
+        with self.db:
+            for table in ("trackers", "comments", "fingerprints"):
+                self.db.executemany(f"DELETE FROM {table} WHERE hash = ?", ((h,) for h in hashes))
+
+
+# 本地搜索索引：由快照增量维护，保存在同一个缓存文件中
+# - 名称（可选加上种子内的文件路径）通过 SQLite FTS5 的 trigram 分词建立 n-gram 倒排索引，
+#   关键词先用索引缩小范围再逐个确认；SQLite 不支持 trigram（低于 3.34）时退化为逐行匹配本地表
+# - 大小、添加时间列带索引，范围条件直接由 SQLite 完成
+# - 每次刷新只重写名称、大小等发生变化的种子
+class SearchIndex:
+    def __init__(self, db):
+        import sqlite3
+
+        self.db = db
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS search_torrents (
+                id INTEGER PRIMARY KEY,
+                hash TEXT NOT NULL UNIQUE,
+                name TEXT NOT NULL,
+                name_lower TEXT NOT NULL,
+                total_size INTEGER NOT NULL,
+                added_on INTEGER NOT NULL,
+                tracker TEXT,
+                files TEXT NOT NULL DEFAULT '',
+                files_indexed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS search_torrents_size ON search_torrents (total_size);
+            CREATE INDEX IF NOT EXISTS search_torrents_added ON search_torrents (added_on);
+            """
+        )
+        try:
+            self.db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS search_text USING fts5(name, files, tokenize='trigram')"
+            )
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM search_torrents").fetchone()[0]
+
+    def refresh(self, torrents, fetch_files=None):
+        """
+        按快照增量更新索引
+        :param torrents: dict - hash -> TorrentRecord（SnapshotStore.torrents）
+        :param fetch_files: function(hashes) -> dict - hash -> 文件路径列表；提供时同时索引尚未索引文件的种子
+        """
+        existing = {
+            row[0]: row[1:]
+            for row in self.db.execute("SELECT hash, id, name, total_size, added_on, tracker FROM search_torrents")
+        }
+        removed = [existing[h][0] for h in existing if h not in torrents]
+        added, updated, renamed = [], [], []
+        for h, record in torrents.items():
+            name = record.name
+            row = (name, record.total_size, record.added_on, record.tracker)
+            old = existing.get(h)
+            if old is None:
+                added.append((h, name, name.lower()) + row[1:])
+            elif old[1:] != row:
+                updated.append((name, name.lower()) + row[1:] + (old[0],))
+                if old[1] != name:
+                    renamed.append((name, old[0]))
+
+        with self.db:
+            self.db.executemany("DELETE FROM search_torrents WHERE id = ?", ((i,) for i in removed))
+            self.db.executemany(
+                "UPDATE search_torrents SET name = ?, name_lower = ?, total_size = ?, added_on = ?, tracker = ? "
+                "WHERE id = ?",
+                updated,
+            )
+            last_id = self.db.execute("SELECT COALESCE(MAX(id), 0) FROM search_torrents").fetchone()[0]
+            self.db.executemany(
+                "INSERT INTO search_torrents (hash, name, name_lower, total_size, added_on, tracker) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                added,
+            )
+            if self.fts:
+                self.db.executemany("DELETE FROM search_text WHERE rowid = ?", ((i,) for i in removed))
+                self.db.executemany("UPDATE search_text SET name = ? WHERE rowid = ?", renamed)
+                self.db.execute(
+                    "INSERT INTO search_text (rowid, name, files) SELECT id, name, '' FROM search_torrents WHERE id > ?",
+                    (last_id,),
+                )
+        if added or updated or removed:
+            print(f"🗂️ 搜索索引：新增 {len(added)} 个，更新 {len(updated)} 个，移除 {len(removed)} 个")
+        if fetch_files is not None:
+            self._index_files(fetch_files)
+
+    def _index_files(self, fetch_files):
+        pending = dict(self.db.execute("SELECT hash, id FROM search_torrents WHERE files_indexed = 0"))
+        if not pending:
+            return
+        files = fetch_files(list(pending))
+        rows = [("\n".join(paths).lower(), pending[h]) for h, paths in files.items()]
+        with self.db:
+            self.db.executemany("UPDATE search_torrents SET files = ?, files_indexed = 1 WHERE id = ?", rows)
+            if self.fts:
+                self.db.executemany("UPDATE search_text SET files = ? WHERE rowid = ?", rows)
+        failed = len(pending) - len(files)
+        print(f"🗂️ 搜索索引：索引 {len(files)} 个种子的文件列表" + (f"，失败 {failed} 个（下次重试）" if failed else ""))
+
+    def query(self, query):
+        """
+        :param query: SearchQuery，tracker 条件不在这里处理
+        :return: list - 匹配的 hash
+        """
+        where, params = [], []
+        # trigram 索引只能用于不少于 3 个字符的关键词，所有关键词最终都逐行确认
+        phrases = ['"' + keyword.replace('"', '""') + '"' for keyword in query.keywords if len(keyword) >= 3]
+        if self.fts and phrases:
+            columns = "{name files}" if query.match_files else "name"
+            where.append("t.id IN (SELECT rowid FROM search_text WHERE search_text MATCH ?)")
+            params.append(" AND ".join(f"{columns} : {phrase}" for phrase in phrases))
+        for keyword in query.keywords:
+            if query.match_files:
+                where.append("(instr(t.name_lower, ?) > 0 OR instr(t.files, ?) > 0)")
+                params += [keyword, keyword]
+            else:
+                where.append("instr(t.name_lower, ?) > 0")
+                params.append(keyword)
+        if query.min_size:
+            where.append("t.total_size >= ?")
+            params.append(query.min_size)
+        if query.max_size:
+            where.append("t.total_size <= ?")
+            params.append(query.max_size)
+        if query.added_after is not None:
+            where.append("t.added_on >= ?")
+            params.append(query.added_after)
+        if query.added_before is not None:
+            where.append("t.added_on < ?")
+            params.append(query.added_before)
+        if query.regex is not None:
+            self.db.create_function("search_regexp", 1, lambda text: query.regex.search(text) is not None)
+            where.append("(search_regexp(t.name) OR search_regexp(t.files))" if query.match_files else "search_regexp(t.name)")
+        sql = "SELECT t.hash FROM search_torrents t"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return [h for (h,) in self.db.execute(sql + " ORDER BY t.id", params)]
+
+
+# 种子元数据缓存：一次运行中每个 hash 的 tracker、属性和文件列表最多请求一次；
+# 配合 MetaStore 时 tracker 列表、注释和内容指纹会跨运行复用
+class TorrentMetaCache:
+    def __init__(self, instance, store=None):
+        """
+        :param instance: 所属实例，提供客户端与并发抓取引擎
+        :param store: 持久化缓存（MetaStore），None 表示只在本次运行内缓存
+        """
+        self.instance = instance
+        self.store = store
+        self._trackers = {}
+        self._properties = {}
+        self._comments = {}
+        self._fingerprints = {}
+        self._saved_trackers = None  # 持久化缓存中的数据，首次使用时加载
+        self._saved_comments = None
+        self._saved_fingerprints = None
+        self._dirty_trackers = {}
+        self._dirty_comments = {}
+        self._dirty_fingerprints = {}
+        self._used = set()
+        self.restored = {"tracker": 0, "注释": 0, "内容指纹": 0}
+        # [命中, 未命中]；fingerprints 只在按内容分组时出现
+        self.stats = {"trackers": [0, 0], "properties": [0, 0]}
+
+    @staticmethod
+    def _signature(torrent):
+        return getattr(torrent, "tracker", None), getattr(torrent, "trackers_count", None)
+
+    def _load(self):
+        if self._saved_trackers is None:
+            if self.store is None:
+                self._saved_trackers, self._saved_comments, self._saved_fingerprints = {}, {}, {}
+            else:
+                self._saved_trackers, self._saved_comments, self._saved_fingerprints = self.store.load()
+
+    def _restore(self, h, used_at):
+        if used_at < time.time() - MetaStore.TOUCH_INTERVAL:
+            self._used.add(h)
+
+    def retain(self, torrents):
+        """
+        删除已不在客户端中的种子的持久化缓存
+        :param torrents: 当前全部种子
+        """
+        if self.store is None:
+            return
+        self._load()
+        current = {t.hash for t in torrents}
+        saved = set(self._saved_trackers) | set(self._saved_comments) | set(self._saved_fingerprints)
+        stale = [h for h in saved if h not in current]
+        if stale:
+            self.forget(stale)
+            print(f"🧹 已清理 {len(stale)} 个不存在种子的缓存")
+
+    def forget(self, hashes):
+        """
+        删除指定种子的缓存（内存与持久化）
+        :param hashes: hash 列表
+        """
+        for h in hashes:
+            for cache in (
+                self._trackers, self._properties, self._comments, self._fingerprints,
+                self._dirty_trackers, self._dirty_comments, self._dirty_fingerprints,
+            ):
+                cache.pop(h, None)
+            self._used.discard(h)
+        if self.store is None:
+            return
+        self._load()
+        self.store.forget(hashes)
+        for h in hashes:
+            self._saved_trackers.pop(h, None)
+            self._saved_comments.pop(h, None)
+            self._saved_fingerprints.pop(h, None)
+
+    def _lookup_trackers(self, torrent):
+        h = torrent.hash
+        if h in self._trackers:
+            return self._trackers[h]
+        self._load()
+        saved = self._saved_trackers.get(h)
+        if saved is None or saved[1:3] != self._signature(torrent):
+            return None
+        self._trackers[h] = saved[0]
+        self._restore(h, saved[3])
+        self.restored["tracker"] += 1
+        return saved[0]
+
+    def _lookup_comment(self, torrent):
+        h = torrent.hash
+        if h in self._comments:
+            return self._comments[h]
+        self._load()
+        saved = self._saved_comments.get(h)
+        if saved is None:
+            return None
+        self._comments[h] = saved[0]
+        self._restore(h, saved[1])
+        self.restored["注释"] += 1
+        return saved[0]
+
+    def _lookup_fingerprint(self, torrent):
+        h = torrent.hash
+        if h in self._fingerprints:
+            return self._fingerprints[h]
+        self._load()
+        saved = self._saved_fingerprints.get(h)
+        # 旧版本的指纹，或是否包含分块大小与当前配置不一致时重新计算
+        if (
+            saved is None
+            or not saved[0].startswith(FINGERPRINT_VERSION)
+            or (":" in saved[0]) != self.instance.fingerprint_piece_size
+        ):
+            return None
+        self._fingerprints[h] = saved[0]
+        self._restore(h, saved[1])
+        self.restored["内容指纹"] += 1
+        return saved[0]
+
+    def _remember_trackers(self, torrent, urls):
+        urls = [sys.intern(url) for url in urls]
+        self._trackers[torrent.hash] = urls
+        if self.store is not None:
+            self._dirty_trackers[torrent.hash] = (urls,) + self._signature(torrent)
+
+    def _remember_properties(self, h, properties):
+        self._properties[h] = properties
+        self._comments[h] = properties.comment or ""
+        if self.store is not None:
+            self._dirty_comments[h] = self._comments[h]
+
+    def _remember_fingerprint(self, h, fingerprint):
+        self._fingerprints[h] = fingerprint
+        if self.store is not None:
+            self._dirty_fingerprints[h] = fingerprint
+
+    def trackers(self, torrent):
+        """
+        获取种子的有效 tracker 列表（已排除 DHT/PeX/LSD）
+        :param torrent: 种子对象
+        :return: list - tracker URL
+        """
+        urls = self._lookup_trackers(torrent)
+        if urls is not None:
+            self.stats["trackers"][0] += 1
+            return urls
+        if self.instance.offline:
+            # 离线模式不请求 WebUI，没有缓存时只能使用种子当前的 tracker
+            tracker = getattr(torrent, "tracker", "")
+            return [tracker] if tracker and is_valid_tracker(tracker) else []
+        self.stats["trackers"][1] += 1
+        trackers = self.instance.client.torrents_trackers(torrent.hash)
+        urls = [t.url for t in trackers if is_valid_tracker(t.url)]
+        self._remember_trackers(torrent, urls)
+        return urls
+
+    def properties(self, torrent):
+        """
+        获取种子属性，请求失败时抛出异常且不缓存
+        :param torrent: 种子对象
+        :return: 种子属性
+        """
+        h = torrent.hash
+        if h in self._properties:
+            self.stats["properties"][0] += 1
+        else:
+            self.stats["properties"][1] += 1
+            self._remember_properties(h, self.instance.client.torrents_properties(h))
+        return self._properties[h]
+
+    def comment(self, torrent):
+        comment = self._lookup_comment(torrent)
+        if comment is not None:
+            self.stats["properties"][0] += 1
+            return comment
+        return self.properties(torrent).comment or ""
+
+    def fingerprint(self, torrent):
+        """
+        获取已缓存的内容指纹，不会发起请求（需先 prefetch(..., fingerprints=True)）
+        :param torrent: 种子对象
+        :return: str - 内容指纹，未能获取文件列表时为 None
+        """
+        fingerprint = self._lookup_fingerprint(torrent)
+        if fingerprint is not None:
+            self.stats.setdefault("fingerprints", [0, 0])[0] += 1
+        return fingerprint
+
+    def prefetch(self, torrents, trackers=True, comments=False, fingerprints=False):
+        """
+        并发预取尚未缓存的 tracker、注释和内容指纹，失败的留到按需读取时再请求
+        :param torrents: 种子列表
+        :param trackers: 是否预取 tracker
+        :param comments: 是否预取注释（来自种子属性）
+        :param fingerprints: 是否预取内容指纹（来自文件列表）
+        """
+        if self.instance.offline:
+            return
+        by_hash = {t.hash: t for t in torrents}
+        jobs = []
+        if trackers:
+            jobs += [("trackers", h) for h, t in by_hash.items() if self._lookup_trackers(t) is None]
+        if comments:
+            jobs += [("properties", h) for h, t in by_hash.items() if self._lookup_comment(t) is None]
+        if fingerprints:
+            jobs += [("fingerprints", h) for h, t in by_hash.items() if self._lookup_fingerprint(t) is None]
+        if not jobs:
+            return
+        with profiler.phase("prefetch"):
+            results, errors = self.instance.fetcher.map(lambda job: self._fetch(job, by_hash[job[1]]), jobs)
+            for (kind, h), value in results.items():
+                self.stats.setdefault(kind, [0, 0])[1] += 1
+                if kind == "trackers":
+                    self._remember_trackers(by_hash[h], value)
+                elif kind == "fingerprints":
+                    if value is not None:
+                        self._remember_fingerprint(h, value)
+                else:
+                    self._remember_properties(h, value)
+            self.save()
+
+    def _fetch(self, job, torrent):
+        kind, h = job
+        worker = self.instance.worker_client()
+        if kind == "trackers":
+            return [t.url for t in worker.torrents_trackers(h) if is_valid_tracker(t.url)]
+        if kind == "fingerprints":
+            files = worker.torrents_files(h, SIMPLE_RESPONSES=True)
+            if not files:
+                return None  # 磁力链接尚未取得元数据，暂不计算
+            piece_size = None
+            if self.instance.fingerprint_piece_size:
+                piece_size = worker.torrents_properties(h, SIMPLE_RESPONSES=True)["piece_size"]
+            return content_fingerprint(files, torrent.name, piece_size)
+        return worker.torrents_properties(h)
+
+    def save(self):
+        """将本次新获取的 tracker 列表、注释、内容指纹和使用记录写入持久化缓存"""
+        if self.store is None or not (
+            self._dirty_trackers or self._dirty_comments or self._dirty_fingerprints or self._used
+        ):
+            return
+        self.store.save(
+            [(h,) + row for h, row in self._dirty_trackers.items()],
+            list(self._dirty_comments.items()),
+            list(self._dirty_fingerprints.items()),
+            list(self._used),
+        )
+        self._dirty_trackers.clear()
+        self._dirty_comments.clear()
+        self._dirty_fingerprints.clear()
+        self._used.clear()
+
+    def report(self):
+        if not any(hit + miss for hit, miss in self.stats.values()):
+            return
+        parts = [f"{kind} 命中 {hit} / 请求 {miss}" for kind, (hit, miss) in self.stats.items()]
+        restored = [f"{kind} {count} 个" for kind, count in self.restored.items() if count]
+        if restored:
+            parts.append(f"从本地缓存复用 {'、'.join(restored)}")
+        print(f"📊 {self.instance.label}元数据缓存：{'，'.join(parts)}")
+
+
+# 一个 qBittorrent 实例的运行上下文：创建时读取环境配置，
+# 客户端与登录、并发线程池、本地缓存都在首次使用时才创建
+class Instance:
+    def __init__(self, env_name):
+        """
+        :param env_name: 环境名称，对应 config/ 目录下的 xxx.yaml 文件
+        """
+        import yaml
+
+        self.name = env_name
+        self.label = ""  # 多实例时输出信息的前缀，如 "[home] "
+        self.offline = False  # 离线模式：只使用本地快照和缓存，不请求 WebUI
+        with open(os.path.join("config", f"{env_name}.yaml"), "r", encoding="utf-8") as f:
+            self.config = config = yaml.safe_load(f)
+        
+        # 从配置文件中提取配置
+        self.qb_host = config["qbittorrent"]["host"]
+        self.qb_port = config["qbittorrent"]["port"]
+        self.qb_username = config["qbittorrent"]["username"]
+        self.qb_password = config["qbittorrent"]["password"]
+        self.delete_files_on_remove = config["delete_files_on_remove"]
+        self.required_summer = config["required_summer"]
+        self.upload_speed_limits_by_tracker = config["upload_speed_limits_by_tracker"]
+        self.upload_limit_index = DomainIndex(self.upload_speed_limits_by_tracker or {})
+        self.export_deduplicate = config.get("export_options", {}).get("deduplicate", True)
+        # 检查策略配置
+        self.check_strategies = config.get("check_strategies", {})
+        # 读取启用的检查策略列表
+        self.active_strategies = config.get("active_strategies", [])
+        self.snapshot_config = config.get("snapshot", {})
+        self.meta_cache_config = config.get("meta_cache", {})
+        self.cache_path = self.snapshot_config.get("path") or os.path.join("cache", f"{env_name}.sqlite")
+        self.search_config = config.get("search", {})
+        grouping = config.get("grouping", {})
+        self.grouping_mode = grouping.get("mode", "name_size")
+        if self.grouping_mode not in GROUPING_MODES:
+            print(f"⚠️ {env_name}: grouping.mode 只能是 {' / '.join(GROUPING_MODES)}，已按 name_size 分组")
+            self.grouping_mode = "name_size"
+        self.fingerprint_piece_size = bool(grouping.get("include_piece_size", False))
+        query_config = config.get("query", {})
+        self.page_size = int(query_config.get("page_size", 5000))
+        try:
+            self.scope = TorrentQuery.from_config(query_config.get("scope"))
+        except ValueError as e:
+            print(f"⚠️ {env_name}: query.scope.state 无效（{e}），已忽略该条件")
+            self.scope = TorrentQuery.from_config(dict(query_config["scope"], state=None))
+        self.persist_session = config.get("session", {}).get("persist", True)
+        self.session_path = os.path.join(os.path.dirname(self.cache_path) or ".", f"{env_name}.session")
+
+        self._lock = threading.Lock()
+        self._worker_local = threading.local()
+        self._client = None
+        self._saved_session = None
+        self._fetcher = None
+        self._batch_executor = None
+        self._cache_db = None
+        self._snapshot = None
+        self._meta_store = None
+        self._meta_cache = None
+        self._search_index = None
+
+    def create_client(self):
+        import qbittorrentapi
+
+        return profiler.instrument(qbittorrentapi.Client(
+            host=self.qb_host, port=self.qb_port, username=self.qb_username, password=self.qb_password
+        ))
+
+    @property
+    def client(self):
+        """主客户端，首次使用时登录（有已保存的会话则直接复用，不再请求登录接口）"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._connect()
+        return self._client
+
+    def _connect(self):
+        import qbittorrentapi
+
+        client = self.create_client()
+        saved = self._load_session()
+        if saved is not None:
+            # 直接使用保存的地址，避免首次探测地址时重建会话清掉 cookie；
+            # 会话失效时 qbittorrentapi 收到 403 会自动重新登录
+            client._url._base_url = saved["base_url"]
+            client._session.cookies.update(saved["cookies"])
+            self._saved_session = saved
+            print(f"🍪 {self.label}复用已保存的登录会话（失效时自动重新登录）")
+            return client
+        try:
+            client.auth_log_in()
+            print(f"{self.label}登录成功！")
+        except qbittorrentapi.LoginFailed as e:
+            print(f"{self.label}登录失败: {e}")
+            sys.exit(1)
+        return client
+
+    def _session_key(self):
+        return {"host": str(self.qb_host), "port": self.qb_port, "username": self.qb_username}
+
+    def _load_session(self):
+        """
+        :return: dict - 保存的会话（连接信息与当前配置一致时），否则 None
+        """
+        if not self.persist_session or not os.path.exists(self.session_path):
+            return None
+        try:
+            with open(self.session_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if saved.get("key") != self._session_key() or not saved.get("base_url") or not saved.get("cookies"):
+            return None
+        return saved
+
+    def _save_session(self):
+        """保存登录 cookie，文件仅当前用户可读写"""
+        if self._client is None or not self.persist_session:
+            return
+        cookies = {c.name: c.value for c in self._client._session.cookies}
+        base_url = getattr(self._client._url, "_base_url", None)
+        if not cookies or not base_url:
+            return
+        saved = {"key": self._session_key(), "base_url": base_url, "cookies": cookies}
+        if saved == self._saved_session:
+            return
+        directory = os.path.dirname(self.session_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.session_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        os.chmod(self.session_path, 0o600)  # 文件已存在时 os.open 不会修改权限
+        self._saved_session = saved
+
+    def worker_client(self):
+        """
+        获取当前工作线程专用的客户端，复用主客户端的登录 cookie。
+        qbittorrentapi 在请求出错重试时会重建会话，各线程独立会话可避免连带其他线程一起重新登录。
+        """
+        worker = getattr(self._worker_local, "client", None)
+        if worker is None:
+            worker = self.create_client()
+            # 沿用主客户端已探测好的地址（首次探测会重建会话并清掉 cookie），再复制登录 cookie
+            worker._url = self.client._url
+            worker._session.cookies.update(self.client._session.cookies)
+            self._worker_local.client = worker
+        return worker
+
+    @property
+    def fetcher(self):
+        if self._fetcher is None:
+            concurrency = self.config.get("concurrency", {})
+            self._fetcher = ConcurrentFetcher(
+                max_workers=concurrency.get("max_workers", 16),
+                min_workers=concurrency.get("min_workers", 2),
+                retries=concurrency.get("retries", 3),
+                slow_factor=concurrency.get("slow_factor", 3.0),
+            )
+        return self._fetcher
+
+    @property
+    def batch_executor(self):
+        if self._batch_executor is None:
+            self._batch_executor = BatchExecutor(self.config.get("batch", {}).get("chunk_size", 200))
+        return self._batch_executor
+
+    @property
+    def cache_db(self):
+        if self._cache_db is None:
+            self._cache_db = open_cache_db(self.cache_path)
+        return self._cache_db
+
+    @property
+    def snapshot(self):
+        """本地快照，未启用时为 None"""
+        if self._snapshot is None and self.snapshot_config.get("enabled", True):
+            self._snapshot = SnapshotStore(self.cache_db)
+        return self._snapshot
+
+    @property
+    def meta_store(self):
+        """持久化元数据缓存，未启用时为 None"""
+        if self._meta_store is None and self.meta_cache_config.get("persistent", True):
+            self._meta_store = MetaStore(
+                self.cache_db,
+                tracker_ttl=self.meta_cache_config.get("tracker_ttl_days", 7) * 86400,
+                max_entries=self.meta_cache_config.get("max_entries", 200000),
+            )
+        return self._meta_store
+
+    @property
+    def meta_cache(self):
+        if self._meta_cache is None:
+            self._meta_cache = TorrentMetaCache(self, self.meta_store)
+        return self._meta_cache
+
+    @property
+    def search_index(self):
+        """本地搜索索引，未启用快照或索引时为 None"""
+        if self._search_index is None and self.snapshot is not None and self.search_config.get("index", True):
+            self._search_index = SearchIndex(self.cache_db)
+        return self._search_index
+
+    def fetch_files(self, hashes):
+        """
+        并发获取种子内的文件路径
+        :param hashes: hash 列表
+        :return: dict - hash -> 文件路径列表，失败的不返回
+        """
+        def fetch(h):
+            return [f.name for f in self.worker_client().torrents_files(h)]
+
+        with profiler.phase("files"):
+            results, _ = self.fetcher.map(fetch, hashes)
+        return results
+
+    def fetch_torrents(self, query=None):
+        """
+        获取种子：启用快照时只拉取上次运行以来的变更，再在本地按条件筛选；
+        否则把条件交给 torrents/info 由 qBittorrent 筛选，并分页获取
+        :param query: TorrentQuery，默认使用配置中的 query.scope
+        :return: list - TorrentRecord
+        """
+        query = self.scope if query is None else query
+        with profiler.phase("fetch"):
+            if self.snapshot is None:
+                torrents = list(iter_torrent_pages(self.client, query, self.page_size))
+                # 只取回了部分种子时无法判断哪些种子已被删除，不清理元数据缓存
+                if query.is_empty():
+                    self.meta_cache.retain(torrents)
+            else:
+                torrents = self.snapshot.sync(self.client)
+                self.meta_cache.retain(torrents)
+                torrents = query.filter(torrents)
+        if not query.is_empty():
+            print(f"🎯 {self.label}筛选条件：{query.describe()}，共 {len(torrents)} 个种子")
+        return torrents
+
+    def lookup_torrents(self, hashes):
+        """
+        按 hash 直接向 WebUI 查询种子的当前信息（不经过快照），用于 --resume 时确认中断前的操作结果
+        :param hashes: hash 列表
+        :return: dict - hash -> TorrentRecord，已不存在的种子不返回
+        """
+        found = {}
+        hashes = list(hashes)
+        chunk_size = self.batch_executor.chunk_size
+        with profiler.phase("verify"):
+            for i in range(0, len(hashes), chunk_size):
+                for record in iter_torrent_pages(self.client, TorrentQuery(hashes=hashes[i:i + chunk_size]), 0):
+                    record.instance = self
+                    found[record.hash] = record
+        return found
+
+    def close(self):
+        """保存本次运行的元数据缓存与登录会话"""
+        if self._meta_cache is not None:
+            with profiler.phase("save"):
+                self._meta_cache.save()
+            self._meta_cache.report()
+        self._save_session()
+
+
+def read_env_names(override=None):
+    """
+    读取主配置文件中要操作的环境：use_env 为单个名称或名称列表，也可以在 instances 中列出多个环境
+    :param override: 命令行 --env 指定的环境，逗号分隔，优先于配置文件
+    :return: list - 环境名称（去重，保持顺序）
+    """
+    if override:
+        names = override.split(",")
+    else:
+        import yaml
+
+        with open("config.yml", "r", encoding="utf-8") as f:  # 添加 encoding="utf-8"
+            main_config = yaml.safe_load(f)
+        names = main_config.get("instances") or main_config["use_env"]
+        if not isinstance(names, list):
+            names = [names]
+    return list(dict.fromkeys(str(name).strip() for name in names if str(name).strip()))
+
+
+# 多实例：并发查询各实例并合并结果，删除、限速等操作按种子所在的实例分发回去。
+# 取回的每个种子都带有 instance 属性；同时提供与 TorrentMetaCache 相同的 trackers / comment / prefetch 接口，
+# 按种子所在实例读取各自的元数据缓存，规则过滤因此可以直接跨实例进行
+class Fleet:
+    def __init__(self, instances):
+        """
+        :param instances: Instance 列表，第一个为主实例（检查策略、导出去重等全局设置取自主实例）
+        """
+        self.instances = instances
+        self.primary = instances[0]
+        self.multi = len(instances) > 1
+        if self.multi:
+            for inst in instances:
+                inst.label = f"[{inst.name}] "
+
+    def map(self, fn, instances=None):
+        """
+        对每个实例执行 fn，多个实例时并发执行
+        :param fn: function(instance)
+        :param instances: 要执行的实例，默认全部
+        :return: list - 各实例的返回值，与实例顺序一致
+        """
+        instances = self.instances if instances is None else instances
+        if len(instances) <= 1:
+            return [fn(inst) for inst in instances]
+        with ThreadPoolExecutor(max_workers=len(instances)) as pool:
+            return list(pool.map(profiler.propagate(fn), instances))
+
+    def map_torrents(self, fn, torrents):
+        """
+        按种子所在实例分组后执行 fn，各实例并发执行
+        :param fn: function(instance, torrents)
+        :return: list - 各实例（有种子的）的返回值
+        """
+        by_instance = defaultdict(list)
+        for torrent in torrents:
+            by_instance[torrent.instance].append(torrent)
+        return self.map(lambda inst: fn(inst, by_instance[inst]), list(by_instance))
+
+    def fetch_torrents(self, query=None):
+        """
+        并发获取所有实例的种子，并为每个种子标记所在的实例
+        :param query: TorrentQuery，默认使用各实例配置中的 query.scope
+        :return: list - TorrentRecord
+        """
+        def fetch(inst):
+            torrents = inst.fetch_torrents(query)
+            for torrent in torrents:
+                torrent.instance = inst
+            if self.multi:
+                print(f"📡 {inst.label}获取到 {len(torrents)} 个种子")
+            return torrents
+
+        return [torrent for torrents in self.map(fetch) for torrent in torrents]
+
+    def trackers(self, torrent):
+        return torrent.instance.meta_cache.trackers(torrent)
+
+    def comment(self, torrent):
+        return torrent.instance.meta_cache.comment(torrent)
+
+    def fingerprint(self, torrent):
+        return torrent.instance.meta_cache.fingerprint(torrent)
+
+    def prefetch(self, torrents, trackers=True, comments=False, fingerprints=False):
+        """各实例并发预取，参数同 TorrentMetaCache.prefetch"""
+        self.map_torrents(
+            lambda inst, items: inst.meta_cache.prefetch(items, trackers, comments, fingerprints), torrents
+        )
+
+    def instance_names(self, torrent_group):
+        """
+        :return: list - 种子组所在的实例名称
+        """
+        return list(dict.fromkeys(t.instance.name for t in torrent_group))
+
+    def group_trackers(self, torrent_group):
+        """
+        :return: list - 组内所有 tracker（去重）；多实例时注明所在实例，如 "[home] https://..."
+        """
+        if not self.multi:
+            trackers = set()
+            for t in torrent_group:
+                trackers.update(self.trackers(t))
+            return list(trackers)
+        return list(dict.fromkeys(f"{t.instance.label}{url}" for t in torrent_group for url in self.trackers(t)))
+
+    def delete(self, torrents, journal=None):
+        """
+        删除种子：按所在实例分批删除，各实例并发进行，是否同时删除文件按各实例自己的配置
+        :param journal: 执行日志，None 表示不记录
+        :return: (list - 已删除的种子, list - (删除失败的种子, 异常))
+        """
+        def run(inst, items):
+            by_hash = {t.hash: t for t in items}
+            deleted, errors = inst.batch_executor.run(
+                "删除",
+                list(by_hash),
+                lambda chunk: inst.client.torrents_delete(delete_files=inst.delete_files_on_remove, torrent_hashes=chunk),
+                record=journal and journal.recorder(inst, "delete"),
+            )
+            return [by_hash[h] for h in deleted], [(by_hash[h], e) for h, e in errors.items()]
+
+        deleted, errors = [], []
+        for done, failed in self.map_torrents(run, torrents):
+            deleted += done
+            errors += failed
+        return deleted, errors
+
+    def close(self):
+        for inst in self.instances:
+            inst.close()
+
+
+fleet = None  # 当前命令操作的实例（一个或多个），在主函数中创建
+
+
+# 各类数据的获取成本：每个种子需要的额外请求数（torrents_info 已有的字段为 0）
+FIELD_COSTS = {"trackers": 1, "comments": 1}
+
+
+# Aho-Corasick 多模式匹配：一次扫描即可判断文本是否包含任一模式
+class MultiPatternMatcher:
+    def __init__(self, patterns, ignore_case=False, memoize=False):
+        """
+        :param patterns: 模式字符串列表
+        :param ignore_case: 是否忽略大小写
+        :param memoize: 是否按文本缓存结果（tracker URL 大量重复时使用）
+        """
+        self.ignore_case = ignore_case
+        self._memo = {} if memoize else None
+        patterns = [p.lower() if ignore_case else p for p in patterns]
+        self.match_all = "" in patterns  # 空模式与原来的 `"" in text` 一样匹配任何文本
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [False]
+        for pattern in patterns:
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(False)
+                node = nxt
+            self._out[node] = True
+        # 按层构建失败指针
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, nxt in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] or self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def search(self, text):
+        """
+        :return: bool - 文本是否包含任一模式
+        """
+        if self.match_all:
+            return True
+        if self._memo is not None and text in self._memo:
+            return self._memo[text]
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        found = False
+        for ch in text.lower() if self.ignore_case else text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found = True
+                break
+        if self._memo is not None:
+            self._memo[text] = found
+        return found
+
+
+def tracker_host(url):
+    """
+    取 tracker 地址中的主机名（比 urlparse 快得多，统计、限速时每个种子都要调用）
+    :return: str - 小写主机名，无法解析时为空字符串
+    """
+    rest = url.partition("://")[2] or url
+    host = rest.split("/", 1)[0].split("?", 1)[0].rpartition("@")[2]
+    if host.startswith("["):
+        return host[1:host.find("]")].lower() if "]" in host else ""
+    return host.partition(":")[0].lower()
+
+
+# tracker 域名索引：规则的域名按 . 分隔后倒序建成前缀树，主机名从顶级域开始逐级向下匹配，
+# 与主机名本身或其上级域名相同的规则中最长（最具体）的优先，与配置顺序无关。
+# 没有完整匹配时兼容原来的写法：规则是主机名的一部分（如 "pt.your"）也算匹配，同样取最长的规则。
+# 一个种子有多个 tracker 时，在所有 tracker 匹配到的规则中同样取最具体的一条，与 tracker 的顺序无关。
+# 结果按 URL 缓存，同一个 tracker 地址只解析、匹配一次
+class DomainIndex:
+    def __init__(self, rules):
+        """
+        :param rules: dict - 域名 -> 值
+        """
+        self._root = {}
+        self._fragments = []
+        for domain, value in rules.items():
+            key = str(domain).strip().strip(".").lower()
+            node = self._root
+            for label in reversed(key.split(".")):
+                node = node.setdefault(label, {})
+            node[None] = (domain, value)  # None 标记规则结束的节点
+            self._fragments.append((key, (domain, value)))
+        # 排序是稳定的，长度相同时保持配置顺序
+        self._fragments.sort(key=lambda item: len(item[0]), reverse=True)
+        self._by_host = {}
+        self._by_url = {}
+
+    def match_host(self, host):
+        """
+        :param host: 小写主机名
+        :return: (规则域名, 值)，未匹配时为 None
+        """
+        return self._match_host(host)[1]
+
+    def match(self, url):
+        """
+        :param url: tracker 地址
+        :return: (规则域名, 值)，未匹配时为 None
+        """
+        return self._match_url(url)[1]
+
+    def best(self, urls):
+        """
+        在种子的所有 tracker 匹配到的规则中选出一条：完整域名匹配优先于部分匹配，其次规则最长，
+        再按规则和地址排序，结果只取决于 tracker 的集合
+        :param urls: tracker 地址列表
+        :return: (规则域名, 值, 匹配的 tracker)，都未匹配时为 None
+        """
+        best = None
+        for url in urls:
+            rank, found = self._match_url(url)
+            if found is not None and (best is None or (rank, url) < best[0]):
+                best = ((rank, url), found)
+        return None if best is None else best[1] + (best[0][1],)
+
+    def _match_url(self, url):
+        if url not in self._by_url:
+            self._by_url[url] = self._match_host(tracker_host(url))
+        return self._by_url[url]
+
+    def _match_host(self, host):
+        """
+        :return: (排序键, (规则域名, 值))，排序键越小的规则越具体；未匹配时为 (None, None)
+        """
+        if host in self._by_host:
+            return self._by_host[host]
+        found, key = None, None
+        node = self._root
+        labels = []
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            labels.append(label)
+            if None in node:
+                found, key = node[None], ".".join(reversed(labels))
+        if found is not None:
+            result = ((0, -len(key), key), found)
+        else:
+            match = next(((key, rule) for key, rule in self._fragments if key in host), None) if host else None
+            result = (None, None) if match is None else ((1, -len(match[0]), match[0]), match[1])
+        self._by_host[host] = result
+        return result
+
+
+# 规则引擎使用的种子组视图：统一按组计算各字段
+class GroupView:
+    __slots__ = ("group",)
+
+    def __init__(self, group):
+        self.group = group
+
+    @property
+    def name(self):
+        return self.group[0].name
+
+    @property
+    def size(self):
+        return self.group[0].total_size
+
+    @property
+    def tags(self):
+        return {tag.strip().lower() for t in self.group if t.tags for tag in t.tags.split(",")}
+
+    @property
+    def states(self):
+        return {t.state for t in self.group}
+
+    @property
+    def age_days(self):
+        # 以组内最早添加的种子计算
+        return (time.time() - min(t.added_on for t in self.group)) / 86400
+
+    @property
+    def ratio(self):
+        # 以组内分享率最高的种子计算
+        return max(t.ratio for t in self.group)
+
+    def trackers(self, meta):
+        return [url for t in self.group for url in meta.trackers(t)]
+
+
+# 规则节点：evaluate 返回 True / False，缺少所需数据（meta 为 None）时返回 None 表示暂时无法判断；
+# fields 为规则读取的种子字段，watch 据此判断种子变化后是否需要重新检查
+class Rule:
+    needs = frozenset()
+    fields = frozenset()
+
+    @property
+    def cost(self):
+        return sum(FIELD_COSTS[field] for field in self.needs)
+
+    def evaluate(self, view, meta):
+        raise NotImplementedError("子类必须实现 evaluate 方法")
+
+
+class AllRule(Rule):
+    def __init__(self, children):
+        # 成本低的子规则先求值，遇到 False 立即短路
+        self.children = sorted(children, key=lambda rule: rule.cost)
+        self.needs = frozenset().union(*(rule.needs for rule in self.children))
+        self.fields = frozenset().union(*(rule.fields for rule in self.children))
+
+    def evaluate(self, view, meta):
+        result = True
+        for rule in self.children:
+            value = rule.evaluate(view, meta)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
+
+class AnyRule(Rule):
+    def __init__(self, children):
+        self.children = sorted(children, key=lambda rule: rule.cost)
+        self.needs = frozenset().union(*(rule.needs for rule in self.children))
+        self.fields = frozenset().union(*(rule.fields for rule in self.children))
+
+    def evaluate(self, view, meta):
+        result = False
+        for rule in self.children:
+            value = rule.evaluate(view, meta)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
+
+class NotRule(Rule):
+    def __init__(self, child):
+        self.child = child
+        self.needs = child.needs
+        self.fields = child.fields
+
+    def evaluate(self, view, meta):
+        value = self.child.evaluate(view, meta)
+        return None if value is None else not value
+
+
+class TrackerContainsRule(Rule):
+    needs = frozenset(["trackers"])
+    fields = frozenset(["tracker", "trackers_count"])
+
+    def __init__(self, patterns):
+        self.matcher = MultiPatternMatcher(patterns, memoize=True)
+
+    def evaluate(self, view, meta):
+        if meta is None:
+            return None
+        return any(self.matcher.search(url) for url in view.trackers(meta))
+
+
+class NameContainsRule(Rule):
+    fields = frozenset(["name"])
+
+    def __init__(self, patterns):
+        self.matcher = MultiPatternMatcher(patterns, ignore_case=True)
+
+    def evaluate(self, view, meta):
+        return self.matcher.search(view.name)
+
+
+class TagInRule(Rule):
+    fields = frozenset(["tags"])
+
+    def __init__(self, tags):
+        self.tags = {tag.lower() for tag in tags}
+
+    def evaluate(self, view, meta):
+        return not self.tags.isdisjoint(view.tags)
+
+
+class StateInRule(Rule):
+    fields = frozenset(["state"])
+
+    def __init__(self, states):
+        self.states = set(states)
+
+    def evaluate(self, view, meta):
+        return not self.states.isdisjoint(view.states)
+
+
+class RangeRule(Rule):
+    # 规则字段 -> 计算时读取的种子字段
+    FIELDS = {"size": "total_size", "age_days": "added_on", "ratio": "ratio"}
+
+    def __init__(self, field, bounds):
+        self.field = field
+        self.fields = frozenset([self.FIELDS[field]])
+        self.min = bounds.get("min")
+        self.max = bounds.get("max")
+
+    def evaluate(self, view, meta):
+        value = getattr(view, self.field)
+        if self.min is not None and value < self.min:
+            return False
+        if self.max is not None and value > self.max:
+            return False
+        return True
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def _compile_children(spec):
+    # 空列表会让 all 匹配所有种子组（del 时会全部删除），与空规则 {} 一样视为无效
+    children = _as_list(spec)
+    if not children:
+        raise ValueError("规则列表不能为空")
+    return [compile_rule(child) for child in children]
+
+
+# 规则关键字 -> 节点构造函数
+RULE_BUILDERS = {
+    "all": lambda spec: AllRule(_compile_children(spec)),
+    "any": lambda spec: AnyRule(_compile_children(spec)),
+    "not": lambda spec: NotRule(compile_rule(spec)),
+    "tracker_contains": lambda spec: TrackerContainsRule(_as_list(spec)),
+    "tracker_not_contains": lambda spec: NotRule(TrackerContainsRule(_as_list(spec))),
+    "name_contains": lambda spec: NameContainsRule(_as_list(spec)),
+    "tag_in": lambda spec: TagInRule(_as_list(spec)),
+    "state_in": lambda spec: StateInRule(_as_list(spec)),
+    "size": lambda spec: RangeRule("size", spec),
+    "age_days": lambda spec: RangeRule("age_days", spec),
+    "ratio": lambda spec: RangeRule("ratio", spec),
+}
+
+
+def compile_rule(spec):
+    """
+    将配置中的规则编译为规则节点
+    :param spec: dict（一个或多个关键字，多个时按 all 组合）或 list（按 all 组合）
+    :return: Rule
+    """
+    if isinstance(spec, list):
+        return AllRule(_compile_children(spec))
+    if not isinstance(spec, dict) or not spec:
+        raise ValueError(f"无效规则: {spec!r}")
+    rules = []
+    for key, value in spec.items():
+        if key not in RULE_BUILDERS:
+            raise ValueError(f"未知规则: {key}")
+        rules.append(RULE_BUILDERS[key](value))
+    return rules[0] if len(rules) == 1 else AllRule(rules)
+
+
+def collect_trackers(torrent_group, meta, with_comments=True):
+    """
+    合并一组种子的有效 tracker，并生成 “tracker-注释” 对
+    :param with_comments: 是否获取注释
+    :return: (set - 所有 tracker, set - tracker 与注释的组合)
+    """
+    all_trackers = set()
+    tracker_comment_pairs = set()
+    for t in torrent_group:
+        valid_trackers = meta.trackers(t)
+        all_trackers.update(valid_trackers)
+        if not with_comments:
+            continue
+        try:
+            comment = meta.comment(t)
+        except Exception as e:
+            print(f"警告: 无法获取种子 {t.name} 的评论: {e}")
+            continue
+        if comment:
+            for tracker_url in valid_trackers:
+                tracker_comment_pairs.add(f"站点tracker：{tracker_url}-->>>注释：{comment}")
+    return all_trackers, tracker_comment_pairs
+
+
+# 启用的检查策略：一条规则，加上导出时写入的注释
+class CheckStrategy:
+    def __init__(self, name, rule, comment=None):
+        """
+        :param rule: 规则配置（见 compile_rule）
+        :param comment: 导出注释，None 表示写入各 tracker 对应的种子注释
+        """
+        self.name = name
+        self.rule = rule
+        self.comment = comment
+        self.describe_needs = ("trackers", "comments") if comment is None else ()
+
+    def describe(self, torrent_group, meta):
+        if self.comment is not None:
+            return self.comment
+        _, tracker_comment_pairs = collect_trackers(torrent_group, meta)
+        return "\n".join(sorted(tracker_comment_pairs))
+
+
+def _missing_trackers_strategy(config):
+    return CheckStrategy("missing_trackers", {"tracker_not_contains": config.get("required_trackers", [])})
+
+
+def _official_group_strategy(config):
+    groups = config.get("groups", {})
+    selected_group = config.get("selected_group", "")
+    if selected_group not in groups:
+        raise ValueError(f"未找到指定的官组: {selected_group}")
+    group_names = [name.lower() for name in groups[selected_group]]
+    return CheckStrategy(
+        "official_group",
+        {"not": {"name_contains": group_names}},
+        f"Does not belong to official group: {', '.join(group_names)}",
+    )
+
+
+def _tracker_tag_filter_strategy(config):
+    forbidden_tags = [tag.lower() for tag in config.get("forbidden_tags", [])]
+    return CheckStrategy(
+        "tracker_tag_filter",
+        {"not": {"tag_in": forbidden_tags}},
+        f"Does not contain protected tags: {', '.join(forbidden_tags)}",
+    )
+
+
+def _rules_strategy(config):
+    if "match" not in config:
+        raise ValueError("rules 策略缺少 match 配置")
+    return CheckStrategy("rules", config["match"], config.get("comment", "Matched custom rules"))
+
+
+# 策略名 -> 构造函数；新增策略只需在这里注册
+STRATEGY_BUILDERS = {
+    "missing_trackers": _missing_trackers_strategy,
+    "official_group": _official_group_strategy,
+    "tracker_tag_filter": _tracker_tag_filter_strategy,
+    "rules": _rules_strategy,
+}
+
+
+def create_strategy(strategy_name, config):
+    if strategy_name not in STRATEGY_BUILDERS:
+        raise ValueError(f"未知策略: {strategy_name}")
+    strategy = STRATEGY_BUILDERS[strategy_name](config)
+    compile_rule(strategy.rule)  # 提前校验规则
+    return strategy
+
+
+# 种子分组方式（判断哪些种子是同一资源的辅种）：
+# name_size  名称与大小都相同
+# content    内容指纹相同：文件相对路径（去掉与种子名相同的顶层目录）与大小，可选加上分块大小，改名的辅种也能识别
+GROUPING_MODES = ("name_size", "content")
+
+
+# 内容指纹的版本前缀，计算方式变化时更换，缓存中旧版本的指纹会重新计算
+FINGERPRINT_VERSION = "c3-"
+
+
+def content_fingerprint(files, root, piece_size=None):
+    """
+    计算种子的内容指纹
+    :param files: torrents_files 返回的文件列表（name 为相对路径）
+    :param root: 种子名；所有文件都在以种子名命名的顶层目录下时去掉这一层
+    :param piece_size: 分块大小，None 表示不参与计算
+    :return: str - 指纹；包含分块大小时以 ":<分块大小>" 结尾
+    """
+    import hashlib
+
+    paths = [f["name"].replace("\\", "/") for f in files]
+    prefix = f"{root}/"
+    if root and all(path.startswith(prefix) for path in paths):
+        # 多文件种子的顶层目录即种子名，改名的辅种通常只改了这一层；
+        # 没有顶层目录的种子（如 CD1/…、CD2/…）保留完整路径，目录名是内容的一部分
+        paths = [path[len(prefix):] for path in paths]
+    # 单文件种子保留文件名：只比较大小会把大小恰好相同的无关种子归为一组，
+    # 因此单文件种子改名后不会归为一组，与按名称和大小分组相同
+    entries = sorted(f"{path}\t{f['size']}" for path, f in zip(paths, files))
+    digest = FINGERPRINT_VERSION + hashlib.sha1("\n".join(entries).encode("utf-8")).hexdigest()
+    return digest if piece_size is None else f"{digest}:{piece_size}"
+
+
+def group_key(torrent, meta, mode):
+    """
+    :return: 种子所在分组的键：按内容分组时为内容指纹，没有指纹时退回 (name, size)
+    """
+    if mode == "content":
+        fingerprint = meta.fingerprint(torrent)
+        if fingerprint is not None:
+            return fingerprint
+    return torrent.name, torrent.total_size
+
+
+def group_torrents(torrents, meta, mode=None):
+    """
+    把同一资源的种子分为一组；按内容分组时先并发获取尚未缓存的文件列表，再按指纹做一次哈希分组
+    :param meta: 种子元数据缓存
+    :param mode: 分组方式（GROUPING_MODES），默认取主实例的配置
+    :return: dict - 分组键 -> 种子列表（保持种子顺序）
+    """
+    mode = mode or fleet.primary.grouping_mode
+    if mode == "content":
+        meta.prefetch(torrents, trackers=False, fingerprints=True)
+    with profiler.phase("group"):
+        grouped = defaultdict(list)
+        for torrent in torrents:
+            grouped[group_key(torrent, meta, mode)].append(torrent)
+    if mode == "content":
+        fallback = sum(len(group) for key, group in grouped.items() if isinstance(key, tuple))
+        print(
+            f"🧬 内容指纹分组：{len(torrents)} 个种子分为 {len(grouped)} 组"
+            + (f"，{fallback} 个种子未能获取文件列表，按名称和大小分组" if fallback else "")
+        )
+    return grouped
+
+
+def filter_groups(rule, groups, meta):
+    """
+    对所有种子组求值编译后的规则：先只用 torrents_info 字段判断，
+    无法确定的组再批量获取 tracker 后判断
+    :param rule: 编译后的规则
+    :param groups: dict - 分组键 -> 种子列表
+    :param meta: 种子元数据缓存
+    :return: dict - 命中规则的种子组（保持原顺序）
+    """
+    with profiler.phase("filter"):
+        matched, pending = set(), {}
+        with profiler.phase("cheap"):
+            for key, group in groups.items():
+                result = rule.evaluate(GroupView(group), None)
+                if result:
+                    matched.add(key)
+                elif result is None:
+                    pending[key] = group
+        print(f"✅ 规则初筛：{len(groups)} 个种子组中 {len(matched)} 个直接命中，{len(pending)} 个需要 tracker 信息")
+        if pending:
+            meta.prefetch(
+                [t for group in pending.values() for t in group],
+                trackers="trackers" in rule.needs,
+                comments="comments" in rule.needs,
+            )
+            with profiler.phase("recheck"):
+                matched.update(key for key, group in pending.items() if rule.evaluate(GroupView(group), meta))
+        print(f"✅ 规则过滤后剩余 {len(matched)} 个种子组")
+    return {key: group for key, group in groups.items() if key in matched}
+
+
+def fetch_scoped_groups():
+    """
+    获取所有实例的全部种子并分组，再按各实例的 query.scope 选择种子组（见 select_scoped_groups）。
+    这里不向 torrents/info 下推任何条件：query.scope 和检查策略中的状态、标签等条件都按种子组判断
+    （组内任一种子满足即可），只取回满足条件的种子会把组拆散，规则会在不完整的组上求值，
+    删除时留下组内其余仍在使用同一份数据的辅种
+    :return: dict - 分组键 -> 种子列表
+    """
+    torrents = fleet.fetch_torrents(TorrentQuery())
+    groups = group_torrents(torrents, fleet)
+    scoped = [inst for inst in fleet.instances if not inst.scope.is_empty()]
+    if not scoped:
+        return groups
+    groups = select_scoped_groups(groups)
+    for inst in scoped:
+        print(f"🎯 {inst.label}筛选条件：{inst.scope.describe()}，组内任一种子在范围内即处理整组")
+    print(f"🎯 范围内共 {len(groups)} 个种子组")
+    return groups
+
+
+def select_scoped_groups(groups):
+    """
+    组内任一种子在所在实例的 query.scope 范围内即选中整组，之后的规则求值和删除都作用于整组
+    :param groups: dict - 分组键 -> 种子列表（种子已标记所在实例）
+    :return: dict - 选中的种子组（保持原顺序）
+    """
+    return {key: group for key, group in groups.items() if any(t.instance.scope.matches(t) for t in group)}
+
+
+def build_strategies(inst=None):
+    """
+    创建所有启用的策略，并编译为一条组合规则（串行过滤即全部满足）
+    :param inst: 读取策略配置的实例，默认为主实例
+    :return: (list - 策略, Rule - 组合规则)，无有效策略时为 ([], None)
+    """
+    inst = inst or fleet.primary
+    strategies = []
+    for strategy_name in inst.active_strategies:
+        strategy_config = inst.check_strategies.get(strategy_name, {})
+        try:
+            strategies.append(create_strategy(strategy_name, strategy_config))
+        except ValueError as e:
+            print(f"⚠️ 跳过无效策略 {strategy_name}: {e}")
+            continue
     
-# 从配置文件中提取配置
-qb_host = config["qbittorrent"]["host"]
-qb_port = config["qbittorrent"]["port"]
-qb_username = config["qbittorrent"]["username"]
-qb_password = config["qbittorrent"]["password"]
-delete_files_on_remove = config["delete_files_on_remove"]
-required_summer = config["required_summer"]
-upload_speed_limits_by_tracker = config["upload_speed_limits_by_tracker"]
-export_deduplicate = config.get("export_options", {}).get("deduplicate", True)
-# 检查策略配置
-check_strategies = config.get("check_strategies", {})
-# 读取启用的检查策略列表
-active_strategies = config.get("active_strategies", [])  
-
-# 登录客户端
-
-client = qbittorrentapi.Client(
-    host=qb_host, port=qb_port, username=qb_username, password=qb_password
-)
-try:
-    client.auth_log_in()
-    print("登录成功！")
-except qbittorrentapi.LoginFailed as e:
-    print(f"登录失败: {e}")
-    exit(1)
+    if not strategies:
+        print("❌ 无有效策略配置")
+        return [], None
+    return strategies, compile_rule({"all": [strategy.rule for strategy in strategies]})
+
+
+def check_missing_trackers(details=True):
+    """
+    :param details: 是否获取导出所需的 tracker 和注释；删除时不需要
+    :return: iterator - 逐个产出需要处理的种子组信息（筛选在调用时完成，逐行生成导出内容）
+    """
+    strategies, rule = build_strategies()
+    if rule is None:
+        return iter(())
     
-def convert_size(size_bytes):
+    # 获取所有实例的种子并把同一资源分为一组，多实例时同一资源跨实例合并为一组
+    grouped = fetch_scoped_groups()
+
+    final_groups = filter_groups(rule, grouped, fleet)
+
+    if not details:
+        return (
+            {"name": group[0].name, "size": group[0].total_size, "torrents": group}
+            for group in final_groups.values()
+        )
+
+    # 导出注释沿用配置中最后一个策略的说明
+    last = strategies[-1]
+    fleet.prefetch(
+        [t for group in final_groups.values() for t in group],
+        comments="comments" in last.describe_needs,
+    )
+    return iter_group_details(final_groups, last)
+
+
+def iter_group_details(final_groups, strategy):
+    """
+    :param strategy: 提供导出注释的策略
+    :return: generator - 逐个产出种子组的 tracker 与注释（名称、大小取组内第一个种子）
+    """
+    for group in final_groups.values():
+        yield {
+            "name": group[0].name,
+            "size": group[0].total_size,
+            "instance": fleet.instance_names(group),
+            "trackers": fleet.group_trackers(group),
+            "hashes": [t.hash for t in group],
+            "comment": strategy.describe(group, fleet),
+        }
+
+
+# 导出格式：csv / jsonl 可加 .gz 压缩，parquet / arrow 需要安装 pyarrow
+EXPORT_FORMATS = ("csv", "csv.gz", "jsonl", "jsonl.gz", "parquet", "arrow")
+
+
+def resolve_export_target(default_name, output=None, fmt=None):
+    """
+    确定导出路径与格式：未指定格式时按输出文件扩展名推断，默认 csv
+    :param default_name: 未指定输出时使用的文件名（不含扩展名）
+    :param output: 输出路径，"-" 表示标准输出
+    :param fmt: 导出格式
+    :return: (str - 输出路径, str - 导出格式)
+    """
+    if fmt is None:
+        fmt = "csv"
+        if output and output != "-":
+            for candidate in sorted(EXPORT_FORMATS, key=len, reverse=True):
+                if output.lower().endswith("." + candidate):
+                    fmt = candidate
+                    break
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        print(f"❌ 不支持的导出格式: {fmt}，可选 {' / '.join(EXPORT_FORMATS)}")
+        sys.exit(1)
+    if fmt in ("parquet", "arrow"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print(f"❌ 导出 {fmt} 需要安装 pyarrow：pip install pyarrow")
+            sys.exit(1)
+    return output or f"{default_name}.{fmt}", fmt
+
+
+# 流式导出：逐行写出，同时累计行数与总大小，用于结尾的 “总计” 行
+class ExportWriter:
+    BATCH_ROWS = 10000  # parquet / arrow 每批写出的行数
+
+    def __init__(self, output, fmt, columns, summary=True):
+        """
+        :param output: 输出路径，"-" 表示标准输出
+        :param fmt: 导出格式，见 EXPORT_FORMATS
+        :param columns: list - (字段名, CSV 表头)
+        :param summary: CSV 结尾是否写入 “总计” 行
+        """
+        self.output = output
+        self.fmt = fmt
+        self.columns = columns
+        self.summary = summary
+        self.count = 0
+        self.total_size = 0
+        self.target = "标准输出" if output == "-" else output
+        self._sink = None
+        self._gzip = None
+        self._text = None
+        self._csv = None
+        self._batch = []
+        self._arrow = None
+
+    def __enter__(self):
+        import gzip
+        import io
+
+        self._sink = sys.__stdout__.buffer if self.output == "-" else open(self.output, "wb")
+        if self.fmt in ("parquet", "arrow"):
+            return self
+        stream = self._sink
+        if self.fmt.endswith(".gz"):
+            self._gzip = stream = gzip.GzipFile(fileobj=self._sink, mode="wb")
+        # 与原来一样，普通 CSV 文件带 BOM，方便 Excel 打开
+        encoding = "utf-8-sig" if self.fmt == "csv" and self.output != "-" else "utf-8"
+        self._text = io.TextIOWrapper(stream, encoding=encoding, newline="")
+        if self.fmt.startswith("csv"):
+            self._csv = csv.writer(self._text)
+            self._csv.writerow([header for _, header in self.columns])
+        return self
+
+    def write(self, row):
+        """
+        :param row: dict - 一行数据，list 类型的值在 CSV 中以 ", " 连接
+        """
+        self.count += 1
+        self.total_size += row.get("size", 0)
+        values = {key: row.get(key) for key, _ in self.columns}
+        if self._csv is not None:
+            self._csv.writerow([", ".join(v) if isinstance(v, list) else v for v in values.values()])
+        elif self._text is not None:
+            self._text.write(json.dumps(values, ensure_ascii=False) + "\n")
+        else:
+            self._batch.append(values)
+            if len(self._batch) >= self.BATCH_ROWS:
+                self._flush_batch()
+
+    def _flush_batch(self):
+        import pyarrow as pa
+
+        if not self._batch:
+            return
+        table = pa.Table.from_pylist(self._batch)
+        self._batch = []
+        if self._arrow is None:
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+
+                self._arrow = pq.ParquetWriter(self._sink, table.schema)
+            else:
+                self._arrow = pa.ipc.new_file(self._sink, table.schema)
+        self._arrow.write_table(table)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._close(exc_type)
+        except BrokenPipeError:
+            if self.output != "-":
+                raise
+            exc_type = BrokenPipeError
+        if self.output == "-" and exc_type is not None and issubclass(exc_type, BrokenPipeError):
+            # 下游（如 head）提前关闭了管道：与常见命令行工具一样静默退出（退出码 128 + SIGPIPE），
+            # 标准输出改指向 /dev/null，解释器退出时刷新剩余的缓冲区不会再次报错
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, self._sink.fileno())
+            os.close(devnull)
+            raise SystemExit(141)
+        return False
+
+    def _close(self, exc_type):
+        # 中途失败时保留已写出的行，但不写 “总计”
+        if exc_type is None and self._csv is not None and self.summary:
+            self._csv.writerow([])
+            self._csv.writerow(["总计", f"{self.total_size} 字节", f"({convert_size(self.total_size)})", ""])
+        if self._text is not None:
+            self._text.flush()
+            self._text.detach()
+        if self._gzip is not None:
+            self._gzip.close()
+        if self.fmt in ("parquet", "arrow"):
+            self._flush_batch()
+            if self._arrow is not None:
+                self._arrow.close()
+        if self.output == "-":
+            self._sink.flush()
+        else:
+            self._sink.close()
+
+
+# 导出
+def export_columns(columns):
+    """
+    多实例时在种子名称后加入“实例”列，单实例时导出内容保持不变
+    :param columns: [(键, 表头)]
+    :return: list
+    """
+    if not fleet.multi:
+        return columns
+    return columns[:1] + [("instance", "实例")] + columns[1:]
+
+
+def export_missing_trackers(output=None, fmt=None):
+    output, fmt = resolve_export_target("missing_trackers", output, fmt)
+    columns = export_columns([("name", "种子名称"), ("size", "大小（字节）"), ("trackers", "所有 Tracker"), ("comment", "种子注释")])
+    items = check_missing_trackers()
+    with profiler.phase("write"), ExportWriter(output, fmt, columns) as writer:
+        for item in items:
+            writer.write(item)
+    
+    print(f"✅ 导出完成，共 {writer.count} 项，总大小 {convert_size(writer.total_size)} → {writer.target}")
+
+
+# 删除
+def run_deletion(command, torrents, dry_run=False):
+    """
+    把删除计划写入执行日志后分批删除
+    :param command: 命令名（del / reclaim），对应各自的执行日志
+    :param dry_run: 演练模式，只写计划不删除
+    :return: (list - 已删除的种子, list - (删除失败的种子, 异常))；演练模式时为 None
+    """
+    journal = Journal(command, fleet.instances)
+    journal.start(
+        [{"instance": t.instance.name, "hash": t.hash, "name": t.name, "action": "delete"} for t in torrents],
+        dry_run,
+    )
+    if dry_run:
+        journal.close()
+        print(
+            f"📝 演练模式：{len(torrents)} 个种子的删除计划已写入 {journal.path}，未删除任何种子；"
+            f"确认无误后可用 --resume 按此计划执行"
+        )
+        return None
+    with profiler.phase("act"):
+        deleted, errors = fleet.delete(torrents, journal)
+    journal.finish()
+    return deleted, errors
+
+
+def report_deletion(deleted, errors):
+    for t in deleted:
+        print(f"{t.instance.label}已删除：{t.name} - {t.hash}")
+    for t, e in errors:
+        print(f"{t.instance.label}删除失败：{t.name} - {t.hash}，原因：{e}")
+    print(f"✅ 共删除 {len(deleted)} 个种子")
+
+
+def delete_missing_trackers(dry_run=False):
+    result = check_missing_trackers(details=False)
+    torrents = [t for item in result for t in item["torrents"]]
+    outcome = run_deletion("del", torrents, dry_run)
+    if outcome is not None:
+        report_deletion(*outcome)
+
+
+def delete_specific_torrent(name, size, dry_run=False):
+    # 指定名称删除时不受 query.scope 限制
+    torrents = fleet.fetch_torrents(TorrentQuery())
+    matched = [t for t in torrents if t.name == name and t.total_size == size]
+    if not matched:
+        print("⚠️ 未找到匹配的种子")
+        return
+    outcome = run_deletion("del", matched, dry_run)
+    if outcome is None:
+        return
+    deleted, errors = outcome
+    for t in deleted:
+        print(f"✅ {t.instance.label}已删除：{name} - {t.hash}")
+    for t, e in errors:
+        print(f"❌ {t.instance.label}删除失败：{name} - {t.hash}，原因：{e}")
+    print(f"✅ 共删除 {len(deleted)} 个种子")
+
+
+# 腾出空间：在候选种子组中选出释放空间达到目标、损失的做种价值最小的删除方案。
+# 同一组的辅种共用一份数据，只有整组删除才会释放空间，因此以组为单位，组内数据只计一次（多实例时每个实例各一份）
+RECLAIM_CANDIDATES = ("all", "flagged")
+RECLAIM_WEIGHTS = {
+    "upload_speed": 1.0,        # 当前上传速度，每 1 MB/s
+    "ratio": 1.0,               # 分享率，每个种子最多计 10
+    "scarcity": 1.0,            # 做种人数越少越有价值：1 / (1 + 做种人数)
+    "freshness": 1.0,           # 越新越有价值：30 / (30 + 添加天数)
+    "required_trackers": 5.0,   # 组内有种子在 required_trackers 站点做种
+}
+
+
+class ReclaimCandidate:
+    __slots__ = ("group", "freed", "value")
+
+    def __init__(self, group, freed, value):
+        """
+        :param group: 种子组
+        :param freed: 整组删除后释放的字节数
+        :param value: 做种价值，越高越应保留
+        """
+        self.group = group
+        self.freed = freed
+        self.value = value
+
+
+def score_torrent(torrent, weights, now):
+    """
+    :return: float - 单个种子的做种价值
+    """
+    age_days = max(0, now - torrent.added_on) / 86400
+    return (
+        weights["upload_speed"] * torrent.upspeed / (1024 * 1024)
+        + weights["ratio"] * min(torrent.ratio, 10)
+        + weights["scarcity"] / (1 + max(torrent.num_complete, 0))
+        + weights["freshness"] * 30 / (30 + age_days)
+    )
+
+
+def find_required_groups(groups, meta, patterns):
+    """
+    找出有种子在 required_trackers 站点做种的种子组：先用种子当前的 tracker 字段判断，
+    只有种子不止一个 tracker（或当前 tracker 为空）而无法确定的组才获取完整的 tracker 列表
+    :param groups: list - 种子组
+    :param patterns: tracker 关键字列表
+    :return: set - 组的下标
+    """
+    matcher = MultiPatternMatcher(patterns, memoize=True)
+    present, pending = set(), {}
+    for i, group in enumerate(groups):
+        if any(t.tracker and matcher.search(t.tracker) for t in group):
+            present.add(i)
+        elif any(not t.tracker or t.trackers_count > 1 for t in group):
+            pending[i] = group
+    if pending:
+        meta.prefetch([t for group in pending.values() for t in group])
+        present.update(
+            i for i, group in pending.items() if any(matcher.search(url) for t in group for url in meta.trackers(t))
+        )
+    return present
+
+
+def plan_reclaim(candidates, target):
+    """
+    选出释放空间不少于 target、做种价值之和尽量小的种子组（覆盖型背包问题的启发式近似，O(n log n)，不保证最优）：
+    1. 按价值密度（价值 / 释放空间）从低到高排序，取刚好达到目标的前缀
+    2. 对前缀的每个截断位置，尝试用剩余组中单独就能补足空间、价值最低的一组收尾，取总价值最低的方案
+    3. 去掉多余的组（prune_reclaim），再把选中的组逐个换成更便宜的未选组（swap_reclaim），直到无法改进
+    :param candidates: list - ReclaimCandidate
+    :param target: 需要释放的字节数
+    :return: list - 选中的候选组；target 不大于 0 时为空列表；全部删除仍不足目标时为 None
+    """
+    import bisect
+
+    if target <= 0:
+        return []
+    # 超出目标的空间没有用处，密度按不超过目标的释放空间计算，否则特别大的组总会排在最前
+    order = sorted(candidates, key=lambda c: (c.value / min(c.freed, target), -c.freed))
+    prefix_freed, prefix_value = [0], [0.0]
+    for candidate in order:
+        if prefix_freed[-1] >= target:
+            break
+        prefix_freed.append(prefix_freed[-1] + candidate.freed)
+        prefix_value.append(prefix_value[-1] + candidate.value)
+    if prefix_freed[-1] < target:
+        return None
+    greedy = len(prefix_freed) - 1
+    best_value, best_cut, best_extra = prefix_value[greedy], greedy, None
+
+    # 从后往前把组加入按释放空间排序的树状数组，查询 “释放空间不小于剩余需求” 的组中价值最低的一个
+    sizes = sorted({c.freed for c in order})
+    tree = [None] * (len(sizes) + 1)  # 下标按释放空间从大到小，节点保存区间内价值最低的组
+
+    def insert(candidate):
+        i = len(sizes) - bisect.bisect_left(sizes, candidate.freed)
+        while i < len(tree):
+            if tree[i] is None or candidate.value < tree[i].value:
+                tree[i] = candidate
+            i += i & -i
+
+    def cheapest(min_freed):
+        i, found = len(sizes) - bisect.bisect_left(sizes, min_freed), None
+        while i > 0:
+            if tree[i] is not None and (found is None or tree[i].value < found.value):
+                found = tree[i]
+            i -= i & -i
+        return found
+
+    for cut in range(len(order) - 1, -1, -1):
+        insert(order[cut])
+        if cut >= greedy:
+            continue
+        extra = cheapest(target - prefix_freed[cut])
+        if extra is not None and prefix_value[cut] + extra.value < best_value:
+            best_value, best_cut, best_extra = prefix_value[cut] + extra.value, cut, extra
+
+    chosen = order[:best_cut] + ([best_extra] if best_extra is not None else [])
+    while True:
+        chosen = prune_reclaim(chosen, target)
+        if not swap_reclaim(chosen, candidates, target):
+            return chosen
+
+
+def prune_reclaim(chosen, target):
+    """
+    按价值从高到低检查选中的组，去掉后仍能达到目标的不再删除
+    :return: list - 剩下的候选组
     """
-    将字节大小转换为合适的单位
-    :param size_bytes: 字节大小
-    :return: 转换后的字符串，如 "1.23 GB"
+    freed = sum(c.freed for c in chosen)
+    dropped = set()
+    for candidate in sorted(chosen, key=lambda c: c.value, reverse=True):
+        if freed - candidate.freed >= target:
+            dropped.add(id(candidate))
+            freed -= candidate.freed
+    return [c for c in chosen if id(c) not in dropped]
+
+
+def swap_reclaim(chosen, candidates, target):
     """
-    if size_bytes == 0:
-        return "0 B"
-    units = ("B", "KB", "MB", "GB", "TB", "PB")
-    i = min(int(math.log(size_bytes, 1024)), len(units) - 1)
-    size = round(size_bytes / (1024 ** i), 2)
-    return f"{size} {units[i]}"
+    一换一修正：按价值从高到低，把选中的组换成未选中组里释放空间足以替代它、价值更低的一组
+    :param chosen: list - 选中的候选组，原地修改
+    :return: bool - 是否有替换
+    """
+    import bisect
 
+    selected = {id(c) for c in chosen}
+    rest = sorted((c for c in candidates if id(c) not in selected), key=lambda c: c.freed)
+    if not rest:
+        return False
+    sizes = [c.freed for c in rest]
+    # cheapest[i]：rest[i:] 中价值最低的组
+    cheapest = rest[:]
+    for i in range(len(rest) - 2, -1, -1):
+        if cheapest[i + 1].value < cheapest[i].value:
+            cheapest[i] = cheapest[i + 1]
+    freed = sum(c.freed for c in chosen)
+    for index, candidate in sorted(enumerate(chosen), key=lambda item: item[1].value, reverse=True):
+        i = bisect.bisect_left(sizes, target - (freed - candidate.freed))
+        if i < len(rest) and cheapest[i].value < candidate.value:
+            chosen[index] = cheapest[i]
+            return True
+    return False
 
-# 检查策略基类
-class CheckStrategy:
-    def check(self, torrent_group, client):
-        """
-        检查一组种子是否符合策略
-        :param torrent_group: 按 (name, size) 分组的种子列表
-        :param client: qBittorrent 客户端
-        :return: dict - 种子信息（如果需要处理），否则返回 None
-        """
-        raise NotImplementedError("子类必须实现 check 方法")
-
-# 策略：检查缺失特定Tracker
-class MissingTrackersStrategy(CheckStrategy):
-    def __init__(self, required_trackers):
-        self.required_trackers = required_trackers
-
-    def check(self, torrent_group, client):
-        all_trackers = set()
-        tracker_comment_pairs = set()
-        hashes = [t.hash for t in torrent_group]
-        name, size = torrent_group[0].name, torrent_group[0].total_size
-
-        for t in torrent_group:
-            trackers = client.torrents_trackers(t.hash)
-            valid_trackers = [
-                tracker.url
-                for tracker in trackers
-                if not any(x in tracker.url for x in ["[DHT]", "[PeX]", "[LSD]"])
-            ]
-            for tracker_url in valid_trackers:
-                all_trackers.add(tracker_url)
-            try:
-                properties = client.torrents_properties(t.hash)
-                comment = properties.comment or ""
-                if comment:
-                    for tracker_url in valid_trackers:
-                        pair = f"站点tracker：{tracker_url}-->>>注释：{comment}"
-                        tracker_comment_pairs.add(pair)
-            except Exception as e:
-                print(f"警告: 无法获取种子 {name} 的评论: {e}")
-
-        # 如果没有任何必需的Tracker匹配，则需要处理
-        if not any(any(req in url for req in self.required_trackers) for url in all_trackers):
-            return {
-                "name": name,
-                "size": size,
-                "trackers": list(all_trackers),
-                "hashes": hashes,
-                "comment": "\n".join(sorted(tracker_comment_pairs))
-            }
-        return None
-        
-# 策略：检查种子名称是否包含官组名称
-class OfficialGroupStrategy(CheckStrategy):
-    def __init__(self, group_names):
-        self.group_names = [name.lower() for name in group_names]  # 转换为小写以不区分大小写
-
-    def check(self, torrent_group, client):
-        name, size = torrent_group[0].name, torrent_group[0].total_size
-        hashes = [t.hash for t in torrent_group]
-        # 检查种子名称是否包含任一官组名称（不区分大小写）
-        if not any(group_name in name.lower() for group_name in self.group_names):
-            all_trackers = set()
-            tracker_comment_pairs = set()
-            for t in torrent_group:
-                trackers = client.torrents_trackers(t.hash)
-                valid_trackers = [
-                    tracker.url
-                    for tracker in trackers
-                    if not any(x in tracker.url for x in ["[DHT]", "[PeX]", "[LSD]"])
-                ]
-                all_trackers.update(valid_trackers)
-                try:
-                    properties = client.torrents_properties(t.hash)
-                    comment = properties.comment or ""
-                    if comment:
-                        for tracker_url in valid_trackers:
-                            pair = f"站点tracker：{tracker_url}-->>>注释：{comment}"
-                            tracker_comment_pairs.add(pair)
-                except Exception as e:
-                    print(f"警告: 无法获取种子 {name} 的评论: {e}")
-            return {
-                "name": name,
-                "size": size,
-                "trackers": list(all_trackers),
-                "hashes": hashes,
-                "comment": f"Does not belong to official group: {', '.join(self.group_names)}"
-            }
-        return None
-        
-# 策略：根据tracker标签过滤
-class TrackerTagFilterStrategy(CheckStrategy):
-    def __init__(self, forbidden_tags):
-        self.forbidden_tags = [tag.lower() for tag in forbidden_tags]
-
-    def check(self, torrent_group, client):
-        name, size = torrent_group[0].name, torrent_group[0].total_size
-        hashes = [t.hash for t in torrent_group]
-        all_trackers = set()
-        tracker_comment_pairs = set()
-        has_forbidden_tag = False
-
-        for t in torrent_group:
-            trackers = client.torrents_trackers(t.hash)
-            valid_trackers = [
-                tracker.url
-                for tracker in trackers
-                if not any(x in tracker.url for x in ["[DHT]", "[PeX]", "[LSD]"])
-            ]
-            all_trackers.update(valid_trackers)
-            try:
-                properties = client.torrents_properties(t.hash)
-                comment = properties.comment or ""
-                if comment:
-                    for tracker_url in valid_trackers:
-                        pair = f"站点tracker：{tracker_url}-->>>注释：{comment}"
-                        tracker_comment_pairs.add(pair)
-                # 检查标签
-                tags = t.tags.split(",") if t.tags else []
-                tags = [tag.strip().lower() for tag in tags]
-                if any(tag in self.forbidden_tags for tag in tags):
-                    has_forbidden_tag = True
-            except Exception as e:
-                print(f"警告: 无法获取种子 {name} 的属性: {e}")
-
-        # 反转逻辑：如果没有禁止标签，则需要处理（返回种子信息）
-        if not has_forbidden_tag:
-            return {
-                "name": name,
-                "size": size,
-                "trackers": list(all_trackers),
-                "hashes": hashes,
-                "comment": f"Does not contain protected tags: {', '.join(self.forbidden_tags)}"
-            }
-        return None
 
-# 策略工厂：根据配置动态创建策略
-class StrategyFactory:
-    @staticmethod
-    def create_strategy(strategy_name, config):
-        if strategy_name == "missing_trackers":
-            return MissingTrackersStrategy(config.get("required_trackers", []))
-        elif strategy_name == "official_group":
-            groups = config.get("groups", {})
-            selected_group = config.get("selected_group", "")
-            if selected_group not in groups:
-                raise ValueError(f"未找到指定的官组: {selected_group}")
-            return OfficialGroupStrategy(groups[selected_group])
-        elif strategy_name == "tracker_tag_filter":
-            return TrackerTagFilterStrategy(config.get("forbidden_tags", []))
-        else:
-            raise ValueError(f"未知策略: {strategy_name}")
+def reclaim_space(target, output=None, fmt=None, dry_run=False):
+    """
+    腾出指定大小的空间：为候选种子组评分并生成删除方案，导出方案后分批删除
+    :param target: 需要释放的字节数
+    :param dry_run: 演练模式，只导出方案、写入执行日志，不删除
+    """
+    settings = fleet.primary.config.get("reclaim", {})
+    mode = settings.get("candidates", "all")
+    if mode not in RECLAIM_CANDIDATES:
+        print(f"❌ reclaim.candidates 只能是 {' / '.join(RECLAIM_CANDIDATES)}")
+        return
+    weights = dict(RECLAIM_WEIGHTS, **settings.get("weights", {}))
+    if not any(inst.delete_files_on_remove for inst in fleet.instances):
+        print("❌ delete_files_on_remove 为 false，删除种子不会释放磁盘空间")
+        return
+    output, fmt = resolve_export_target("reclaim_plan", output, fmt)
 
-def check_missing_trackers():
-    # 创建所有启用的策略实例
-    strategies = []
-    for strategy_name in active_strategies:
-        strategy_config = check_strategies.get(strategy_name, {})
-        try:
-            strategy = StrategyFactory.create_strategy(strategy_name, strategy_config)
-            strategies.append(strategy)
-        except ValueError as e:
-            print(f"⚠️ 跳过无效策略 {strategy_name}: {e}")
-            continue
-    
-    if not strategies:
-        print("❌ 无有效策略配置")
-        return []
-    
-    # 获取所有种子并按 (name, size) 分组
-    torrents = client.torrents_info()
-    grouped = defaultdict(list)
-    for torrent in torrents:
-        key = (torrent.name, torrent.total_size)
-        grouped[key].append(torrent)
-    
-    # 初始化待处理的种子组
-    current_groups = grouped
-    
-    # 按策略顺序逐层过滤
-    for idx, strategy in enumerate(strategies, 1):
-        next_groups = defaultdict(list)
-        results = []
-        seen_hashes = set()  # 用于去重
-        
-        for key, torrent_group in current_groups.items():
-            result = strategy.check(torrent_group, client)
-            if result and not any(h in seen_hashes for h in result["hashes"]):
-                results.append(result)
-                seen_hashes.update(result["hashes"])
-                next_groups[key] = torrent_group  # 保留满足条件的种子组
-        
-        print(f"✅ 策略 {idx}: {type(strategy).__name__} 过滤后剩余 {len(next_groups)} 个种子组")
-        current_groups = next_groups  # 更新为下一轮的输入
-    
-    # 返回最终结果
-    return results
+    groups = fetch_scoped_groups()
+    if mode == "flagged":
+        # 只在命中检查策略的种子组中挑选
+        _, rule = build_strategies()
+        if rule is None:
+            return
+        groups = filter_groups(rule, groups, fleet)
+    groups = list(groups.values())
 
-# 导出
-def export_missing_trackers(filename="missing_trackers.csv"):
-    result = check_missing_trackers()
-    total_size = sum(item["size"] for item in result)
-    
-    with open(filename, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.writer(f)
-        writer.writerow(["种子名称", "大小（字节）", "所有 Tracker", "种子注释"])
-        for item in result:
-            writer.writerow([item["name"], item["size"], ", ".join(item["trackers"]), item["comment"]])
-        writer.writerow([])
-        writer.writerow(["总计", f"{total_size} 字节", f"({convert_size(total_size)})", ""])
-    
-    print(f"✅ 导出完成，共 {len(result)} 项，总大小 {convert_size(total_size)} → {filename}")
+    with profiler.phase("score"):
+        required = fleet.primary.check_strategies.get("missing_trackers", {}).get("required_trackers", [])
+        present = find_required_groups(groups, fleet, required) if required and weights["required_trackers"] else set()
+        now = time.time()
+        candidates = []
+        for i, group in enumerate(groups):
+            # 每个实例上各有一份数据；不删除文件的实例不会释放空间
+            copies = len({t.instance for t in group if t.instance.delete_files_on_remove})
+            freed = group[0].total_size * copies
+            if freed <= 0:
+                continue
+            value = sum(score_torrent(t, weights, now) for t in group)
+            if i in present:
+                value += weights["required_trackers"]
+            candidates.append(ReclaimCandidate(group, freed, value))
+    with profiler.phase("plan"):
+        plan = plan_reclaim(candidates, target)
+    if plan is None:
+        available = sum(c.freed for c in candidates)
+        print(
+            f"❌ {len(candidates)} 个候选种子组全部删除也只能释放 {convert_size(available)}，"
+            f"不足 {convert_size(target)}，未删除任何种子"
+        )
+        return
 
-# 删除
-def delete_missing_trackers():
-    result = check_missing_trackers()
-    total = 0
-    for item in result:
-        for h in item["hashes"]:
-            try:
-                client.torrents_delete(
-                    delete_files=delete_files_on_remove, torrent_hashes=h
-                )
-                print(f"已删除：{item['name']} - {h}")
-                total += 1
-            except Exception as e:
-                print(f"删除失败：{item['name']} - {h}，原因：{e}")
-    print(f"✅ 共删除 {total} 个种子")
+    columns = export_columns([
+        ("name", "种子名称"), ("size", "释放空间（字节）"), ("value", "做种价值"),
+        ("torrents", "种子数"), ("hashes", "种子 hash"),
+    ])
+    with profiler.phase("write"), ExportWriter(output, fmt, columns) as writer:
+        for candidate in plan:
+            group = candidate.group
+            writer.write({
+                "name": group[0].name,
+                "size": candidate.freed,
+                "instance": fleet.instance_names(group),
+                "value": round(candidate.value, 3),
+                "torrents": len(group),
+                "hashes": [t.hash for t in group],
+            })
+    print(
+        f"📋 删除方案：{len(candidates)} 个候选种子组中选出 {writer.count} 组"
+        f"（{sum(len(c.group) for c in plan)} 个种子），释放 {convert_size(writer.total_size)}"
+        f"（目标 {convert_size(target)}），损失做种价值 {sum(c.value for c in plan):.2f} → {writer.target}"
+    )
 
+    outcome = run_deletion("reclaim", [t for c in plan for t in c.group], dry_run)
+    if outcome is None:
+        return
+    deleted, errors = outcome
+    report_deletion(deleted, errors)
+    # 组内有种子删除失败时，该组的数据仍被占用
+    deleted_hashes = {t.hash for t in deleted}
+    freed = sum(c.freed for c in plan if all(t.hash in deleted_hashes for t in c.group))
+    print(f"🧹 释放约 {convert_size(freed)}")
 
-def delete_specific_torrent(name, size):
-    torrents = client.torrents.info()
-    deleted = 0
+
+def match_upload_limit(inst, trackers):
+    """
+    按实例的 upload_speed_limits_by_tracker 查找种子应设置的上传速度：所有 tracker 匹配到的规则中
+    最具体的一条优先（见 DomainIndex.best），结果与 tracker 的顺序和当前工作的 tracker 无关，
+    多个 tracker 对应不同速度时每次运行都得到同一个速度
+    :param inst: 种子所在的实例
+    :param trackers: 种子的有效 tracker 列表
+    :return: (速度 KB/s, 匹配的 tracker)，未匹配时为 (None, None)
+    """
+    found = inst.upload_limit_index.best(trackers)
+    if found is None:
+        return None, None
+    return found[1], found[2]
+
+
+def apply_upload_limit(inst, speed_kb, torrents, journal=None, paused_before=()):
+    """
+    对同一速度档位的种子批量限速：暂停 → 设置上传限制 → 恢复（原本已暂停的种子不恢复）
+    :param inst: 种子所在的实例
+    :param speed_kb: 目标速度（KB/s）
+    :param torrents: 种子列表
+    :param journal: 执行日志，None 表示不记录
+    :param paused_before: 上次中断前由本脚本暂停、尚未恢复的 hash，限速后一并恢复
+    :return: (set - 限速成功的 hash, dict - 失败的 hash -> 异常)
+    """
+    to_pause = [t.hash for t in torrents if t.state != "pausedUP"]
+    paused, errors = inst.batch_executor.run(
+        "暂停", to_pause, inst.client.torrents_pause, record=journal and journal.recorder(inst, "pause")
+    )
+    # 上次暂停过的种子本次可能又被暂停了一次，只恢复一次
+    resumed = set(paused)
+    paused += [t.hash for t in torrents if t.hash in paused_before and t.hash not in resumed]
+    ready = [t.hash for t in torrents if t.hash not in errors]
+    limited, limit_errors = inst.batch_executor.run(
+        f"限速 {speed_kb} KB/s",
+        ready,
+        lambda chunk: inst.client.torrents_set_upload_limit(limit=speed_kb * 1024, torrent_hashes=chunk),
+        record=journal and journal.recorder(inst, "limit"),
+    )
+    errors.update(limit_errors)
+    # 恢复失败不影响限速结果，批量执行器会输出失败信息
+    inst.batch_executor.run(
+        "恢复", paused, inst.client.torrents_resume, record=journal and journal.recorder(inst, "resume")
+    )
+    return set(limited), errors
+
+
+def plan_upload_limits(inst, torrents):
+    """
+    按 tracker 确定同一实例的一批种子需要设置的上传速度
+    :param inst: 种子所在的实例
+    :param torrents: 种子列表
+    :return: (dict - 目标速度 KB/s -> [(种子, 匹配的 tracker)], int - 跳过数, int - 失败数)
+    """
+    # 种子只有一个 tracker 时，当前 tracker 就是它的全部 tracker，不需要获取 tracker 列表；
+    # 有多个 tracker 时当前 tracker 只是正在工作的那个，必须按完整列表匹配，否则结果随工作的 tracker 变化
+    decided = {}  # hash -> (速度 KB/s, 匹配的 tracker)
     for torrent in torrents:
-        if torrent.name == name and torrent.total_size == size:
+        if torrent.trackers_count == 1 and torrent.tracker:
+            decided[torrent.hash] = match_upload_limit(inst, [torrent.tracker])
+    inst.meta_cache.prefetch([t for t in torrents if t.hash not in decided])
+    skipped = 0
+    failed = 0
+    with profiler.phase("group"):
+        tiers = defaultdict(list)  # 目标速度 KB/s -> [(种子, 匹配的 tracker)]
+        for torrent in torrents:
             try:
-                client.torrents_delete(
-                    delete_files=delete_files_on_remove, torrent_hashes=torrent.hash
+                matched_speed, matched_tracker = (
+                    decided.get(torrent.hash) or match_upload_limit(inst, inst.meta_cache.trackers(torrent))
                 )
-                print(f"✅ 已删除：{torrent.name} - {torrent.hash}")
-                deleted += 1
             except Exception as e:
-                print(f"❌ 删除失败：{torrent.name} - {torrent.hash}，原因：{e}")
-    if deleted == 0:
-        print("⚠️ 未找到匹配的种子")
-    else:
-        print(f"✅ 共删除 {deleted} 个种子")
+                print(f"❌ {inst.label}处理失败：{torrent.name} → {str(e)}")
+                failed += 1
+                continue
+            if matched_speed is None or torrent.up_limit == matched_speed * 1024:
+                # 已符合要求或未匹配到限速 tracker
+                skipped += 1
+                continue
+            tiers[matched_speed].append((torrent, matched_tracker))
+    return tiers, skipped, failed
 
 
-def limit_upload_speed_by_tracker():
-    torrents = client.torrents_info()
-    modified = 0
-    skipped = 0
-    failed = 0
-    for torrent in torrents:
-        try:
-            trackers = client.torrents_trackers(torrent.hash)
-            matched_speed = None
-            matched_tracker = None
-            current_limit = torrent.up_limit
-            needs_update = False
-            for tracker in trackers:
-                url = tracker.url
-                if any(proto in url for proto in ["[DHT]", "[PeX]", "[LSD]"]):
-                    continue
-                for domain, speed_kb in upload_speed_limits_by_tracker.items():
-                    if domain in url:
-                        desired_limit = speed_kb * 1024
-                        if current_limit != desired_limit:
-                            matched_speed = speed_kb
-                            matched_tracker = url
-                            needs_update = True
-                        break
-                if matched_speed is not None:
-                    break
-            if needs_update and matched_speed is not None:
-                upload_limit = matched_speed * 1024
-                try:
-                    was_paused = torrent.state == "pausedUP"
-                    if not was_paused:
-                        client.torrents_pause(torrent.hash)
-                    client.torrents_set_upload_limit(
-                        limit=upload_limit, torrent_hashes=torrent.hash
-                    )
-                    if not was_paused:
-                        client.torrents_resume(torrent.hash)
-                    print(
-                        f"✅ 限速：{torrent.name} → {matched_speed} KB/s（tracker: {matched_tracker}）"
-                    )
-                    modified += 1
-                except Exception as e:
+def apply_upload_limits(inst, tiers, journal=None, paused_before=()):
+    """
+    按档位批量限速并逐个输出结果
+    :param tiers: dict - 目标速度 KB/s -> [(种子, 匹配的 tracker)]
+    :param journal: 执行日志，None 表示不记录
+    :param paused_before: 见 apply_upload_limit
+    :return: (int - 限速成功数, int - 失败数)
+    """
+    with profiler.phase("act"):
+        modified = 0
+        failed = 0
+        for speed_kb, items in tiers.items():
+            limited, errors = apply_upload_limit(inst, speed_kb, [torrent for torrent, _ in items], journal, paused_before)
+            for torrent, matched_tracker in items:
+                if torrent.hash in limited:
+                    print(f"✅ {inst.label}限速：{torrent.name} → {speed_kb} KB/s（tracker: {matched_tracker}）")
+                else:
                     print(
-                        f"❌ 限速失败：{torrent.name}（{matched_tracker} → {matched_speed} KB/s）→ {str(e)}"
+                        f"❌ {inst.label}限速失败：{torrent.name}（{matched_tracker} → {speed_kb} KB/s）→ {errors.get(torrent.hash)}"
                     )
-                    failed += 1
-            else:
-                reason = "已符合要求" if matched_speed else "未匹配到限速 tracker"
-                # print(f"⚠️ 跳过：{torrent.name}（{reason}）")
+            modified += len(limited)
+            failed += len(errors)
+    return modified, failed
 
-                skipped += 1
-        except Exception as e:
-            print(f"❌ 处理失败：{torrent.name} → {str(e)}")
-            failed += 1
+
+def limit_torrents(inst, torrents):
+    """
+    按 tracker 为同一实例的一批种子限速，同一速度档位的种子批量处理
+    :param inst: 种子所在的实例
+    :param torrents: 种子列表
+    :return: (int - 限速成功数, int - 跳过数, int - 失败数)
+    """
+    tiers, skipped, failed = plan_upload_limits(inst, torrents)
+    modified, apply_failed = apply_upload_limits(inst, tiers)
+    return modified, skipped, failed + apply_failed
+
+
+def limit_upload_speed_by_tracker(dry_run=False):
+    """
+    各实例按自己的限速配置并发处理：先确定全部种子的目标速度并写入执行日志，再分批限速
+    :param dry_run: 演练模式，只写计划不限速
+    """
+    plans = fleet.map_torrents(lambda inst, items: (inst,) + plan_upload_limits(inst, items), fleet.fetch_torrents())
+    skipped = sum(plan[2] for plan in plans)
+    failed = sum(plan[3] for plan in plans)
+    journal = Journal("limit", fleet.instances)
+    journal.start(
+        [
+            {"instance": inst.name, "hash": t.hash, "name": t.name, "action": "limit",
+             "speed_kb": speed_kb, "tracker": tracker}
+            for inst, tiers, _, _ in plans
+            for speed_kb, items in tiers.items()
+            for t, tracker in items
+        ],
+        dry_run,
+    )
+    if dry_run:
+        journal.close()
+        planned = sum(len(items) for _, tiers, _, _ in plans for items in tiers.values())
+        print(
+            f"📝 演练模式：{planned} 个种子的限速计划已写入 {journal.path}，未修改任何种子；"
+            f"确认无误后可用 --resume 按此计划执行"
+        )
+        return
+    tiers_by_instance = {inst: tiers for inst, tiers, _, _ in plans}
+    results = fleet.map(lambda inst: apply_upload_limits(inst, tiers_by_instance[inst], journal), list(tiers_by_instance))
+    journal.finish()
+    modified = sum(done for done, _ in results)
+    failed += sum(errors for _, errors in results)
     print(
         f"\n✅ 完成：共限制 {modified} 个种子上传速度，跳过 {skipped} 个种子，失败 {failed} 个"
     )
 
 
-def export_tracker_summary(filename="tracker_summary.csv"):
-    torrents = client.torrents_info()
-    results = []
-    total_size = 0
+def resume_journal(command):
+    """
+    按执行日志继续上次未完成的 del / limit / reclaim（也可以执行 --dry-run 生成的计划）
+    :param command: 命令名
+    """
+    journal = Journal(command, fleet.instances)
+    state = journal.load()
+    if state is None or not state.planned:
+        print(f"ℹ️ 没有可继续的 {command} 任务（{journal.path}）")
+        return
+    if state.finished:
+        print(f"ℹ️ 上次的 {command} 任务已全部完成")
+        return
+    instances = {inst.name: inst for inst in fleet.instances}
+    missing = [name for name in state.plan if name not in instances]
+    if missing:
+        print(f"❌ 执行日志中的实例 {', '.join(missing)} 不在本次操作的实例中")
+        return
+    total = sum(len(plan) for plan in state.plan.values())
+    source = "演练生成的计划" if state.dry_run else "上次中断的任务"
+    failures = state.failures()
+    retry = f"，上次有 {failures} 个种子的请求失败，将重试" if failures else ""
+    print(f"📖 继续{source}：计划 {total} 个种子，剩余 {state.pending()} 个{retry} ← {journal.path}")
+    journal.reopen()
+    if command == "limit":
+        resume_limit(journal, state, instances)
+    else:
+        resume_deletion(journal, state, instances)
+    journal.finish()
+
+
+def resume_deletion(journal, state, instances):
+    """继续删除：请求已发出但结果未知的种子先确认是否还存在，其余未完成的直接删除"""
+    torrents = []
+    for name, plan in state.plan.items():
+        inst = instances[name]
+        remaining = state.remaining(name, "delete")
+        uncertain = state.uncertain(name, "delete", remaining)
+        if uncertain:
+            existing = inst.lookup_torrents(uncertain)
+            gone = [h for h in uncertain if h not in existing]
+            if gone:
+                journal.record(name, "delete", "done", gone)
+            print(f"🔍 {inst.label}确认中断时结果未知的 {len(uncertain)} 个种子：{len(gone)} 个已删除")
+            gone = set(gone)
+            remaining = [h for h in remaining if h not in gone]
+        for h in remaining:
+            record = TorrentRecord({"hash": h, "name": plan[h]["name"]})
+            record.instance = inst
+            torrents.append(record)
+    with profiler.phase("act"):
+        deleted, errors = fleet.delete(torrents, journal)
+    report_deletion(deleted, errors)
+
+
+def resume_limit(journal, state, instances):
+    """
+    继续限速：按计划中的目标速度处理未完成的种子，不再获取 tracker。
+    先查询这些种子的当前状态，已达到目标速度的（中断时请求已生效）直接记为完成；
+    中断前被暂停但还没恢复的种子在限速后恢复
+    """
+    def run(inst):
+        plan = state.plan[inst.name]
+        remaining = state.remaining(inst.name, "limit")
+        paused_before = state.paused_before(inst.name)
+        current = inst.lookup_torrents(remaining)
+        tiers, verified = defaultdict(list), []
+        for h in remaining:
+            record = current.get(h)
+            if record is None:
+                continue  # 种子已被删除
+            entry = plan[h]
+            if record.up_limit == entry["speed_kb"] * 1024:
+                verified.append(h)
+            else:
+                tiers[entry["speed_kb"]].append((record, entry.get("tracker")))
+        if verified:
+            journal.record(inst.name, "limit", "done", verified)
+            print(f"🔍 {inst.label}{len(verified)} 个种子已是目标速度，记为完成")
+        # 限速已完成、但中断前没来得及恢复的种子
+        pending = {t.hash for items in tiers.values() for t, _ in items}
+        leftover = [h for h in paused_before if h not in pending]
+        if leftover:
+            inst.batch_executor.run("恢复", leftover, inst.client.torrents_resume, record=journal.recorder(inst, "resume"))
+        return apply_upload_limits(inst, tiers, journal, paused_before)
+
+    results = fleet.map(run, [instances[name] for name in state.plan])
+    modified = sum(done for done, _ in results)
+    failed = sum(errors for _, errors in results)
+    print(f"\n✅ 完成：共限制 {modified} 个种子上传速度，失败 {failed} 个")
+
+
+def iter_tracker_summary(torrents):
+    """
+    :return: generator - 逐个产出包含 required_summer 中 tracker 的种子
+    """
     for torrent in torrents:
-        trackers = client.torrents_trackers(torrent.hash)
-        valid_trackers = [
-            t.url
-            for t in trackers
-            if not any(proto in t.url for proto in ["[DHT]", "[PeX]", "[LSD]"])
-        ]
+        valid_trackers = fleet.trackers(torrent)
         matched = [
-            trk for trk in valid_trackers if any(req in trk for req in required_summer)
+            trk for trk in valid_trackers if any(req in trk for req in torrent.instance.required_summer)
         ]
         if matched:
-            created_on = datetime.datetime.fromtimestamp(torrent.added_on).strftime("%Y-%m-%d %H:%M:%S")
-            results.append({
+            yield {
                 "name": torrent.name,
                 "size": torrent.total_size,
-                "created_on": created_on,
-                "matched_trackers": ", ".join(matched),
-            })
-            total_size += torrent.total_size
-    
-    with open(filename, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.writer(f)
-        writer.writerow(["种子名称", "大小（字节）", "创建时间", "匹配的 Tracker"])
-        for item in results:
-            writer.writerow([
-                item["name"],
-                item["size"],
-                item["created_on"],
-                item["matched_trackers"],
-            ])
-        # 新增统计行
-        writer.writerow([])
-        writer.writerow(["总计", f"{total_size} 字节", f"({convert_size(total_size)})", ""])
-    
-    print(f"✅ 导出完成：{len(results)} 个种子，总大小 {convert_size(total_size)} → {filename}")
-    print(f"📦 总大小：{total_size} 字节（{convert_size(total_size)}）")
-
-
-def export_torrents_by_filter(
-    keyword=None, 
-    min_size=None, 
-    max_size=None, 
-    filename="filtered_torrents.csv"
-):
-    print(f"DEBUG: export_deduplicate = {export_deduplicate}")
-    torrents = client.torrents_info()
-    results = []
-    total_size = 0  # Initialize total_size here
+                "instance": torrent.instance.name,
+                "created_on": datetime.datetime.fromtimestamp(torrent.added_on).strftime("%Y-%m-%d %H:%M:%S"),
+                "matched_trackers": matched,
+            }
+
+
+def export_tracker_summary(output=None, fmt=None):
+    output, fmt = resolve_export_target("tracker_summary", output, fmt)
+    torrents = fleet.fetch_torrents()
+    fleet.prefetch(torrents)
+    columns = export_columns(
+        [("name", "种子名称"), ("size", "大小（字节）"), ("created_on", "创建时间"), ("matched_trackers", "匹配的 Tracker")]
+    )
+    with profiler.phase("write"), ExportWriter(output, fmt, columns) as writer:
+        for item in iter_tracker_summary(torrents):
+            writer.write(item)
     
-    if export_deduplicate:
-        grouped = defaultdict(list)
-        for torrent in torrents:
-            if keyword and keyword.lower() not in torrent.name.lower():
-                continue
-            if min_size and torrent.total_size < min_size:
-                continue
-            if max_size and torrent.total_size > max_size:
-                continue
-            key = (torrent.name, torrent.total_size)
-            grouped[key].append(torrent)
+    print(f"✅ 导出完成：{writer.count} 个种子，总大小 {convert_size(writer.total_size)} → {writer.target}")
+    print(f"📦 总大小：{writer.total_size} 字节（{convert_size(writer.total_size)}）")
+
+
+# 分组统计：种子列表转成 NumPy 列数组后，每个维度只排序一次，再按分组边界用 reduceat 一次算出
+# 所有分组的数量、大小、上传量和分享率分位数，不逐个种子累加
+STATS_DIMENSIONS = {"tracker": "Tracker 域名", "tag": "标签", "category": "分类", "age": "添加时间", "instance": "实例"}
+# 添加时间段：(不超过的天数, 名称)，更早的归入最后一段
+STATS_AGE_BUCKETS = ((7, "7 天内"), (30, "7-30 天"), (90, "30-90 天"), (180, "90-180 天"), (365, "180 天-1 年"))
+STATS_AGE_OLDEST = "1 年以上"
+STATS_RATIO_QUANTILES = {"ratio_p25": 0.25, "ratio_p50": 0.5, "ratio_p75": 0.75}
+
+
+def factorize(values):
+    """
+    :param values: 可迭代的分组名称
+    :return: (list - 每个值的分组编号, list - 分组编号 -> 名称)
+    """
+    index = {}
+    codes = [index.setdefault(value, len(index)) for value in values]
+    return codes, list(index)
+
+
+def aggregate_stats(np, codes, labels, columns):
+    """
+    汇总一个维度的所有分组：按 (分组, 分享率) 排序一次，各项合计和分享率分位数都按分组边界整体计算
+    :param codes: ndarray - 每行的分组编号
+    :param labels: list - 分组编号 -> 名称
+    :param columns: dict - 与 codes 等长的列：size / uploaded / ratio / upspeed / group（种子组编号）
+    :return: list - dict，每个分组一行
+    """
+    if not len(codes):
+        return []
+    order = np.lexsort((columns["ratio"], codes))
+    codes = codes[order]
+    columns = {key: values[order] for key, values in columns.items()}
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, len(codes)])
+    sums = {key: np.add.reduceat(columns[key], starts) for key in ("size", "uploaded", "ratio", "upspeed")}
+
+    # 分位数与 numpy.percentile 默认的线性插值一致
+    quantiles = {}
+    for key, q in STATS_RATIO_QUANTILES.items():
+        position = q * (counts - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, counts - 1)
+        fraction = position - low
+        quantiles[key] = columns["ratio"][starts + low] * (1 - fraction) + columns["ratio"][starts + high] * fraction
+
+    # 去重后的大小：同一分组内，同一种子组（辅种）的数据只计一次
+    keys = codes.astype(np.int64) * (int(columns["group"].max()) + 1) + columns["group"]
+    _, first = np.unique(keys, return_index=True)
+    unique_codes = codes[first]
+    unique_starts = np.flatnonzero(np.r_[True, unique_codes[1:] != unique_codes[:-1]])
+    unique_size = np.add.reduceat(columns["size"][first], unique_starts)
+
+    rows = []
+    for i, code in enumerate(codes[starts].tolist()):
+        count = int(counts[i])
+        row = {
+            "key": labels[code],
+            "count": count,
+            "total_size": int(sums["size"][i]),
+            "unique_size": int(unique_size[i]),
+            "uploaded": int(sums["uploaded"][i]),
+            "ratio_mean": round(float(sums["ratio"][i]) / count, 3),
+            "avg_upspeed": round(float(sums["upspeed"][i]) / count),
+        }
+        row.update({key: round(float(values[i]), 3) for key, values in quantiles.items()})
+        rows.append(row)
+    return rows
+
+
+def compute_stats(np, torrents, groups):
+    """
+    :param torrents: TorrentRecord 列表
+    :param groups: dict - 分组键 -> 种子组（见 group_torrents）
+    :return: dict - 维度 -> 各分组的统计行
+    """
+    with profiler.phase("columns"):
+        group_of = {id(t): gid for gid, group in enumerate(groups.values()) for t in group}
+        group_ids = np.fromiter((group_of[id(t)] for t in torrents), dtype=np.int64, count=len(torrents))
+        columns = {
+            "size": np.fromiter((t.total_size for t in torrents), dtype=np.int64, count=len(torrents)),
+            "uploaded": np.fromiter((t.uploaded for t in torrents), dtype=np.int64, count=len(torrents)),
+            "ratio": np.fromiter((t.ratio for t in torrents), dtype=np.float64, count=len(torrents)),
+            "upspeed": np.fromiter((t.upspeed for t in torrents), dtype=np.int64, count=len(torrents)),
+            "group": group_ids,
+        }
+        added_on = np.fromiter((t.added_on for t in torrents), dtype=np.float64, count=len(torrents))
+
+        # 按种子的全部 tracker 归类：多 tracker 的种子在每个域名下各计一次，与当前正在工作的 tracker 无关；
+        # 只有一个 tracker 的种子直接使用当前 tracker
+        def domains(torrent):
+            urls = [torrent.tracker] if torrent.trackers_count == 1 and torrent.tracker else fleet.trackers(torrent)
+            return list(dict.fromkeys(host for host in map(tracker_host, urls) if host)) or ["（未知）"]
+
+        domain_lists = [domains(t) for t in torrents]
+        tag_lists = [[tag.strip() for tag in t.tags.split(",") if tag.strip()] or ["（无标签）"] for t in torrents]
+        dimensions = {
+            "tracker": (
+                factorize(domain for names in domain_lists for domain in names), [len(names) for names in domain_lists]
+            ),
+            "tag": (factorize(tag for tags in tag_lists for tag in tags), [len(tags) for tags in tag_lists]),
+            "category": (factorize(t.category or "（未分类）" for t in torrents), None),
+        }
+        if fleet.multi:
+            dimensions["instance"] = (factorize(t.instance.name for t in torrents), None)
+
+    stats = {}
+    with profiler.phase("aggregate"):
+        for name, ((codes, labels), repeats) in dimensions.items():
+            if repeats is None:
+                stats[name] = aggregate_stats(np, np.asarray(codes, dtype=np.int64), labels, columns)
+            else:
+                # 一个种子有多个标签（或多个 tracker 域名）时在每个分组下各计一次
+                rows = np.repeat(np.arange(len(torrents)), repeats)
+                stats[name] = aggregate_stats(
+                    np, np.asarray(codes, dtype=np.int64), labels, {k: v[rows] for k, v in columns.items()}
+                )
+            stats[name].sort(key=lambda row: row["total_size"], reverse=True)
+
+        bounds = np.array([days for days, _ in STATS_AGE_BUCKETS], dtype=np.float64)
+        ages = (time.time() - added_on) / 86400
+        age_labels = [label for _, label in STATS_AGE_BUCKETS] + [STATS_AGE_OLDEST]
+        # 添加时间段保持从新到旧的顺序
+        stats["age"] = aggregate_stats(np, np.searchsorted(bounds, ages, side="left"), age_labels, columns)
+    return stats
+
+
+def export_stats(output=None, fmt=None):
+    """
+    按 tracker 域名、标签、分类、添加时间段（多实例时还有实例）统计种子数、总大小、去重后大小、上传量、
+    分享率分布和平均上传速度，并导出
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        print("❌ stats 命令需要安装 numpy：pip install numpy")
+        return
+    output, fmt = resolve_export_target("torrent_stats", output, fmt)
+    torrents = fleet.fetch_torrents()
+    # 只有一个 tracker 的种子不需要 tracker 列表
+    fleet.prefetch([t for t in torrents if not (t.trackers_count == 1 and t.tracker)])
+    groups = group_torrents(torrents, fleet)
+    stats = compute_stats(np, torrents, groups)
+
+    for name, rows in stats.items():
+        print(f"📊 {STATS_DIMENSIONS[name]}（{len(rows)} 组）")
+        for row in rows[:5] if name != "age" else rows:
+            print(
+                f"   {row['key']}：{row['count']} 个，{convert_size(row['total_size'])}"
+                f"（去重 {convert_size(row['unique_size'])}），上传 {convert_size(row['uploaded'])}，"
+                f"分享率中位数 {row['ratio_p50']}"
+            )
+
+    columns = [
+        ("dimension", "维度"), ("key", "分组"), ("count", "种子数"), ("total_size", "总大小（字节）"),
+        ("unique_size", "去重后大小（字节）"), ("uploaded", "上传量（字节）"), ("ratio_mean", "平均分享率"),
+        ("ratio_p25", "分享率 P25"), ("ratio_p50", "分享率中位数"), ("ratio_p75", "分享率 P75"),
+        ("avg_upspeed", "平均上传速度（字节/秒）"),
+    ]
+    with profiler.phase("write"), ExportWriter(output, fmt, columns, summary=False) as writer:
+        for name, rows in stats.items():
+            for row in rows:
+                writer.write(dict(row, dimension=STATS_DIMENSIONS[name]))
+    total_size = sum(t.total_size for t in torrents)
+    unique_size = sum(group[0].total_size for group in groups.values())
+    print(
+        f"✅ 统计完成：{len(torrents)} 个种子，总大小 {convert_size(total_size)}，"
+        f"去重后 {convert_size(unique_size)}，共 {writer.count} 行 → {writer.target}"
+    )
+
+
+def iter_filtered_torrents(torrents):
+    """
+    :return: generator - 逐个产出种子（开启去重时为合并后的种子组，多实例时跨实例合并）
+    """
+    if fleet.primary.export_deduplicate:
+        grouped = group_torrents(torrents, fleet)
         
-        for (name, size), torrent_group in grouped.items():
-            # 合并所有tracker（去重）
-            all_trackers = set()
+        for torrent_group in grouped.values():
             created_on = None
             for t in torrent_group:
-                trackers = client.torrents_trackers(t.hash)
-                for tracker in trackers:
-                    url = tracker.url
-                    if not any(x in url for x in ["[DHT]", "[PeX]", "[LSD]"]):
-                        all_trackers.add(url)
                 # 取最早的创建时间
                 added_on = datetime.datetime.fromtimestamp(t.added_on)
                 if created_on is None or added_on < created_on:
                     created_on = added_on
             
-            results.append({
-                "name": name,
-                "size": size,
+            yield {
+                "name": torrent_group[0].name,
+                "size": torrent_group[0].total_size,
+                "instance": fleet.instance_names(torrent_group),
                 "created_on": created_on.strftime("%Y-%m-%d %H:%M:%S"),
-                "trackers": ", ".join(all_trackers),
-            })
-            total_size += size  # Add size after deduplication
+                # 合并所有tracker（去重）
+                "trackers": fleet.group_trackers(torrent_group),
+            }
     else:
         for torrent in torrents:
-            if keyword and keyword.lower() not in torrent.name.lower():
-                continue
-            if min_size and torrent.total_size < min_size:
-                continue
-            if max_size and torrent.total_size > max_size:
-                continue
-                
-            created_on = datetime.datetime.fromtimestamp(torrent.added_on).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-            trackers = client.torrents_trackers(torrent.hash)
-            all_trackers = [
-                t.url
-                for t in trackers
-                if not any(proto in t.url for proto in ["[DHT]", "[PeX]", "[LSD]"])
-            ]
-            results.append({
+            yield {
                 "name": torrent.name,
                 "size": torrent.total_size,
-                "created_on": created_on,
-                "trackers": ", ".join(all_trackers),
-            })
-            total_size += torrent.total_size  # Add size for non-deduplicated case
-
-    # 写入CSV文件
-    with open(filename, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.writer(f)
-        writer.writerow(["种子名称", "大小（字节）", "创建时间", "所有 Tracker"])
-        for item in results:
-            writer.writerow(
-                [item["name"], item["size"], item["created_on"], item["trackers"]]
-            )
-        # 新增一行统计信息
-        writer.writerow([])  # 空行分隔
-        writer.writerow(["总计", f"{total_size} 字节", f"({convert_size(total_size)})", ""])
+                "instance": torrent.instance.name,
+                "created_on": datetime.datetime.fromtimestamp(torrent.added_on).strftime("%Y-%m-%d %H:%M:%S"),
+                "trackers": list(fleet.trackers(torrent)),
+            }
+
+
+def parse_date(value):
+    """
+    :param value: YYYY-MM-DD
+    :return: int - 当天 0 点（本地时间）的时间戳
+    """
+    try:
+        return int(datetime.datetime.strptime(value, "%Y-%m-%d").timestamp())
+    except ValueError:
+        raise ValueError(f"日期格式应为 YYYY-MM-DD：{value}")
+
+
+# 搜索条件：多个关键词（空格分隔，需全部包含，忽略大小写）、正则、大小范围、添加日期范围和 tracker
+class SearchQuery:
+    def __init__(self, keyword=None, min_size=None, max_size=None, regex=None, trackers=None,
+                 added_after=None, added_before=None, match_files=False, status=None, category=None, tag=None):
+        """
+        :param keyword: 关键词，多个用空格分隔
+        :param regex: 正则表达式（忽略大小写），匹配种子名称
+        :param trackers: tracker 关键字，多个用逗号分隔，种子包含任一即可
+        :param added_after: 添加日期不早于 YYYY-MM-DD
+        :param added_before: 添加日期早于 YYYY-MM-DD
+        :param match_files: 关键词和正则同时匹配种子内的文件路径（需要搜索索引）
+        :param status / category / tag: 状态、分类、标签，优先于配置中的 query.scope
+        :raises ValueError: 条件格式错误
+        """
+        import re
+
+        self.keywords = keyword.lower().split() if keyword else []
+        self.min_size = min_size
+        self.max_size = max_size
+        try:
+            self.regex = re.compile(regex, re.IGNORECASE | re.MULTILINE) if regex else None
+        except re.error as e:
+            raise ValueError(f"正则表达式无效：{e}")
+        patterns = [p.strip() for p in (trackers or "").split(",") if p.strip()]
+        self.tracker_matcher = MultiPatternMatcher(patterns, ignore_case=True, memoize=True) if patterns else None
+        self.added_after = parse_date(added_after) if added_after else None
+        self.added_before = parse_date(added_before) if added_before else None
+        self.match_files = match_files
+        self.scope = TorrentQuery(status, category, tag)
+
+    def matches(self, torrent):
+        """
+        逐个匹配（未启用搜索索引时使用），不含 tracker 条件和文件路径
+        :return: bool
+        """
+        name = torrent.name.lower()
+        if any(keyword not in name for keyword in self.keywords):
+            return False
+        if self.min_size and torrent.total_size < self.min_size:
+            return False
+        if self.max_size and torrent.total_size > self.max_size:
+            return False
+        if self.added_after is not None and torrent.added_on < self.added_after:
+            return False
+        if self.added_before is not None and torrent.added_on >= self.added_before:
+            return False
+        if self.regex is not None and not self.regex.search(torrent.name):
+            return False
+        return True
+
+    def matches_trackers(self, trackers):
+        """
+        :param trackers: tracker URL 列表
+        :return: bool
+        """
+        return self.tracker_matcher is None or any(self.tracker_matcher.search(url) for url in trackers)
+
+
+def search_instance(inst, query):
+    """
+    在一个实例中搜索：启用搜索索引时查询本地索引（非离线模式先增量同步快照并刷新索引），
+    否则按状态、分类、标签条件向 WebUI 分页获取种子逐个匹配
+    :return: list - 匹配的种子（尚未应用 tracker 条件）
+    """
+    scope = inst.scope.override(query.scope)
+    index = inst.search_index
+    if index is None:
+        if inst.offline:
+            print(f"❌ {inst.label}离线搜索需要开启快照（snapshot）和搜索索引（search.index）")
+            return []
+        if query.match_files:
+            print(f"⚠️ {inst.label}未开启搜索索引，--files 无效，只匹配种子名称")
+        return [t for t in inst.fetch_torrents(scope) if query.matches(t)]
+
+    if inst.offline:
+        if not index.count():
+            print(f"⚠️ {inst.label}本地搜索索引为空，请先不带 --offline 运行一次 search")
+    else:
+        # 索引覆盖全部种子，状态等条件在检索后筛选
+        inst.fetch_torrents(TorrentQuery())
+        with profiler.phase("index"):
+            index.refresh(inst.snapshot.torrents, inst.fetch_files if inst.search_config.get("index_files") else None)
+    with profiler.phase("query"):
+        start = time.perf_counter()
+        hashes = index.query(query)
+        torrents = scope.filter(inst.snapshot.get(hashes))
+    print(f"🔎 {inst.label}索引检索：匹配 {len(torrents)} 个种子，用时 {(time.perf_counter() - start) * 1000:.1f} ms")
+    if query.match_files and index.count() and not inst.search_config.get("index_files"):
+        print(f"⚠️ {inst.label}未开启 search.index_files，--files 只能匹配已索引过文件列表的种子")
+    return torrents
+
+
+def export_torrents_by_filter(query, output=None, fmt=None):
+    """
+    :param query: SearchQuery
+    """
+    print(f"DEBUG: export_deduplicate = {fleet.primary.export_deduplicate}")
+    output, fmt = resolve_export_target("filtered_torrents", output, fmt)
+
+    def search(inst):
+        torrents = search_instance(inst, query)
+        for torrent in torrents:
+            torrent.instance = inst
+        return torrents
+
+    torrents = [torrent for torrents in fleet.map(search) for torrent in torrents]
+    if query.tracker_matcher is not None:
+        # 当前 tracker 已满足条件的不再获取完整 tracker 列表
+        unresolved = [t for t in torrents if not query.matches_trackers([t.tracker])]
+        fleet.prefetch(unresolved)
+        unresolved = {id(t) for t in unresolved if not query.matches_trackers(fleet.trackers(t))}
+        torrents = [t for t in torrents if id(t) not in unresolved]
+    fleet.prefetch(torrents)
+
+    columns = export_columns([("name", "种子名称"), ("size", "大小（字节）"), ("created_on", "创建时间"), ("trackers", "所有 Tracker")])
+    with profiler.phase("write"), ExportWriter(output, fmt, columns) as writer:
+        for item in iter_filtered_torrents(torrents):
+            writer.write(item)
     
-    print(f"✅ 导出完成，共 {len(results)} 项，总大小 {convert_size(total_size)} → {filename}")
+    print(f"✅ 导出完成，共 {writer.count} 项，总大小 {convert_size(writer.total_size)} → {writer.target}")
     
 
+# 守护模式关注的字段：种子新增或这些字段变化时才重新检查，上传速度、分享率等频繁变化的字段不触发
+# 分组和限速读取的字段；检查策略和 query.scope 读取的字段（如 state、ratio）在此基础上按配置加入
+WATCH_FIELDS = frozenset(("name", "total_size", "tracker", "trackers_count", "up_limit", "tags", "category"))
+# 不变化也会随时间改变结果的字段：age_days 由 added_on 和当前时间计算
+WATCH_TIME_FIELDS = frozenset(("added_on",))
+WATCH_ACTIONS = ("report", "delete", "none")
+
+
+# 守护模式：保持同一会话增量拉取 sync/maindata，只对新增或变化的种子执行限速和检查策略，
+# 每轮的开销只与变化的种子数量有关
+class Watcher:
+    def __init__(self, instance, interval=30, debounce=10, action="report", stop_event=None, recheck=3600):
+        """
+        :param instance: 监控的实例，检查策略取自该实例的配置
+        :param interval: 轮询间隔（秒）
+        :param debounce: 种子变化后等待多久没有新变化再处理（秒），避免新种子的 tracker 尚未就绪
+        :param action: 种子组命中检查策略时的操作：report 仅输出 / delete 删除 / none 不检查
+        :param stop_event: 退出信号，多个实例共用
+        :param recheck: 检查策略含 age_days 时，每隔多少秒重新检查全部种子（添加时间不变，种子的天数仍在增长）
+        """
+        self.instance = instance
+        self.interval = interval
+        self.debounce = debounce
+        self.action = action
+        # 未启用快照时使用内存数据库，同样只做增量同步
+        self.snapshot = instance.snapshot or SnapshotStore(open_cache_db(":memory:"))
+        self.rule = None
+        if action != "none":
+            _, self.rule = build_strategies(instance)
+        # 这些字段变化时种子需要重新检查：分组、限速、检查策略和 query.scope 读取的字段
+        self.fields = WATCH_FIELDS | instance.scope.fields | (self.rule.fields if self.rule is not None else frozenset())
+        self.recheck = recheck if not self.fields.isdisjoint(WATCH_TIME_FIELDS) else None
+        self.checked_at = None  # 上次检查全部种子的时间
+        self.indexed = False  # 是否已为快照中的全部种子建立分组索引
+        self.pending = {}  # hash -> 最近一次变化的时间
+        self.keys = {}  # hash -> 分组键（见 group_key）
+        self.groups = defaultdict(set)  # 分组键 -> hash 集合
+        self.reported = set()  # 已输出过的命中种子组，组成员变化后会重新输出
+        self.stop_event = stop_event or threading.Event()
+
+    def _index(self, h, record):
+        key = group_key(record, self.instance.meta_cache, self.instance.grouping_mode)
+        if self.keys.get(h) == key:
+            return
+        self._unindex(h)
+        self.keys[h] = key
+        self.groups[key].add(h)
+        self.reported.discard(key)
+
+    def _unindex(self, h):
+        key = self.keys.pop(h, None)
+        if key is None:
+            return
+        members = self.groups[key]
+        members.discard(h)
+        if not members:
+            del self.groups[key]
+        self.reported.discard(key)
+
+    def poll(self):
+        """拉取一次变更，记录需要处理的种子"""
+        changed, removed, full_update = self.snapshot.apply(self.instance.client)
+        torrents = self.snapshot.torrents
+        now = time.monotonic()
+        if self.recheck is not None and self.checked_at is not None and now - self.checked_at >= self.recheck:
+            # 检查策略与种子的天数有关：定时重新检查全部种子，已输出过的组不重复输出
+            self.checked_at = now
+            self.pending.update(dict.fromkeys(torrents, now - self.debounce))
+            print(f"🔄 {self.instance.label}检查策略包含添加时间，重新检查全部 {len(torrents)} 个种子")
+        if full_update or not self.indexed:
+            # 全量同步或本次运行的首轮（沿用上次的快照和会话时首轮也是增量同步）：
+            # 为全部种子重建索引，所有种子立即检查一次，种子组不会只包含启动后变化的种子
+            self.indexed = True
+            self.checked_at = now
+            self.keys.clear()
+            self.groups.clear()
+            self.reported.clear()
+            self._prefetch_fingerprints(torrents.values())
+            for h, entry in torrents.items():
+                self._index(h, entry)
+            self.pending = dict.fromkeys(torrents, now - self.debounce)
+            self.instance.meta_cache.retain(list(torrents.values()))
+            mode = "全量同步" if full_update else f"增量同步（更新 {len(changed)} 个，移除 {len(removed)} 个）"
+            print(f"🔄 {self.instance.label}{mode}：共 {len(torrents)} 个种子，全部检查一次")
+            return
+        for h in removed:
+            self._unindex(h)
+            self.pending.pop(h, None)
+        if removed:
+            self.instance.meta_cache.forget(removed)
+        relevant = [h for h, fields in changed.items() if h not in self.keys or not self.fields.isdisjoint(fields)]
+        self._prefetch_fingerprints(torrents[h] for h in relevant if h not in self.keys)
+        for h in relevant:
+            self._index(h, torrents[h])
+            self.pending[h] = now
+        if relevant or removed:
+            print(
+                f"🔄 {self.instance.label}增量同步：新增或变化 {len(relevant)} 个，移除 {len(removed)} 个，"
+                f"共 {len(torrents)} 个种子"
+            )
+
+    def _prefetch_fingerprints(self, records):
+        """按内容分组时，先获取新种子的内容指纹再建立分组索引"""
+        if self.instance.grouping_mode == "content":
+            self.instance.meta_cache.prefetch(list(records), trackers=False, fingerprints=True)
+
+    def process(self):
+        """处理防抖时间已过的种子：按 tracker 限速，并对其所在的种子组执行检查策略"""
+        now = time.monotonic()
+        due = [h for h, changed_at in self.pending.items() if now - changed_at >= self.debounce]
+        if not due:
+            return
+        for h in due:
+            del self.pending[h]
+        torrents = self.snapshot.torrents
+        scope = self.instance.scope
+        due = [h for h in due if h in torrents]
+        # 限速只处理 query.scope 范围内的种子；种子组内任一种子在范围内即检查整组
+        limited = [torrents[h] for h in due if scope.matches(torrents[h])]
+        keys = set()
+        if self.rule is not None:
+            keys = {key for key in {self.keys[h] for h in due} if any(scope.matches(torrents[h]) for h in self.groups[key])}
+        if not limited and not keys:
+            return
+        print(f"👀 {self.instance.label}处理 {len(due)} 个种子")
+        if self.instance.upload_speed_limits_by_tracker and limited:
+            modified, _, failed = limit_torrents(self.instance, limited)
+            if modified or failed:
+                print(f"✅ {self.instance.label}限速 {modified} 个种子，失败 {failed} 个")
+        if not keys:
+            return
+
+        groups = {key: [torrents[h] for h in self.groups[key]] for key in keys}
+        matched = filter_groups(self.rule, groups, self.instance.meta_cache)
+        self.reported.difference_update(keys - set(matched))
+        new = {key: group for key, group in matched.items() if key not in self.reported}
+        if not new:
+            return
+        if self.action == "delete":
+            deleted, errors = self.instance.batch_executor.run(
+                "删除",
+                [t.hash for group in new.values() for t in group],
+                lambda chunk: self.instance.client.torrents_delete(
+                    delete_files=self.instance.delete_files_on_remove, torrent_hashes=chunk
+                ),
+            )
+            print(f"🗑️ {self.instance.label}删除命中检查策略的种子 {len(deleted)} 个，失败 {len(errors)} 个")
+        else:
+            for group in new.values():
+                print(
+                    f"📋 {self.instance.label}命中检查策略：{group[0].name}"
+                    f"（{convert_size(group[0].total_size)}，{len(group)} 个种子）"
+                )
+            self.reported.update(new)
+
+    def _next_wait(self):
+        """下一轮前的等待时间：有待处理的种子时在其防抖结束时提前醒来"""
+        if not self.pending:
+            return self.interval
+        due_in = min(self.pending.values()) + self.debounce - time.monotonic()
+        return max(0.5, min(self.interval, due_in))
+
+    def run(self):
+        """循环同步和处理，直到收到退出信号"""
+        print(
+            f"👀 {self.instance.label}开始监控：每 {self.interval:g} 秒同步一次，种子变化 {self.debounce:g} 秒后处理，"
+            f"命中检查策略时：{self.action}"
+        )
+        while not self.stop_event.is_set():
+            try:
+                self.poll()
+                self.process()
+                self.instance.meta_cache.save()
+            except Exception as e:
+                # WebUI 暂时不可用等错误不退出，下一轮重试
+                print(f"⚠️ {self.instance.label}本轮处理失败：{e}")
+            self.stop_event.wait(self._next_wait())
+        print(f"👋 {self.instance.label}已停止监控")
+
+
+def watch_torrents(interval=None):
+    """监控所有实例：每个实例按自己的 watch 配置独立轮询，多实例时各占一个线程"""
+    import signal
+
+    stop_event = threading.Event()
+    watchers = []
+    for inst in fleet.instances:
+        settings = inst.config.get("watch", {})
+        action = settings.get("strategy_action", "report")
+        if action not in WATCH_ACTIONS:
+            print(f"❌ {inst.label}watch.strategy_action 只能是 {' / '.join(WATCH_ACTIONS)}")
+            return
+        watchers.append(Watcher(
+            inst,
+            interval=float(interval or settings.get("interval", 30)),
+            debounce=float(settings.get("debounce", 10)),
+            action=action,
+            stop_event=stop_event,
+            recheck=float(settings.get("recheck_interval", 3600)),
+        ))
+
+    def request_stop(signum, frame):
+        print("\n🛑 收到退出信号，处理完当前轮次后退出")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, request_stop)
+    if len(watchers) == 1:
+        watchers[0].run()
+        return
+    threads = [threading.Thread(target=watcher.run, name=watcher.instance.name) for watcher in watchers]
+    for thread in threads:
+        thread.start()
+    # 信号只在主线程处理，定时醒来以便及时响应
+    for thread in threads:
+        while thread.is_alive():
+            thread.join(0.5)
+
+
 # ========== 主函数，根据命令行参数执行 ==========
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
+    if not cli_args:
         print(
-            "❗用法:\n  python qbt.py export\n  python qbt.py del\n  python qbt.py del <种子名称> <大小>\n  python qbt.py limit\n  python qbt.py total\n  python qbt.py search <关键词> [最小大小 单位字节] [最大大小 单位字节]"
+            "❗用法:\n  python qbt.py export\n  python qbt.py del\n  python qbt.py del <种子名称> <大小>\n  python qbt.py limit\n  python qbt.py total\n  python qbt.py stats\n  python qbt.py search <关键词> [最小大小 单位字节] [最大大小 单位字节] [--regex 正则] [--tracker 域名] [--after/--before YYYY-MM-DD] [--state 状态] [--category 分类] [--tag 标签] [--files] [--offline]\n  python qbt.py watch [--interval 秒]\n  python qbt.py reclaim <需要释放的大小，如 5TB>\n"
+            "导出命令（export / total / stats / search / reclaim）可选：--format csv|csv.gz|jsonl|jsonl.gz|parquet|arrow  --output <路径，- 为标准输出>\n"
+            "del / limit / reclaim 可选：--dry-run 只生成计划不执行  --resume 继续上次中断的任务（或执行演练生成的计划）\n"
+            "所有命令可选：--env <环境1,环境2> 指定实例  --profile 输出性能分析  --profile-json <路径> 同时写入 JSON 报告"
         )
         sys.exit(1)
-    cmd = sys.argv[1].lower()
-
-    if cmd == "export":
-        export_missing_trackers()
-    elif cmd == "del":
-        if len(sys.argv) == 2:
-            delete_missing_trackers()
-        elif len(sys.argv) == 4:
-            name = sys.argv[2]
+    cmd = cli_args[0].lower()
+    # 先校验命令，未知命令不读取配置、不登录
+    if cmd not in ("export", "del", "limit", "total", "stats", "search", "watch", "reclaim"):
+        print(f"❗未知指令: {cmd}，请用 export / del / limit / total / stats / search / watch / reclaim")
+        sys.exit(1)
+    output = cli_options.get("output")
+    fmt = cli_options.get("format")
+    if cli_options.get("offline") and cmd != "search":
+        print("❗--offline 仅用于 search 命令")
+        sys.exit(1)
+    dry_run = bool(cli_options.get("dry-run"))
+    resume = bool(cli_options.get("resume"))
+    if (dry_run or resume) and cmd not in ("del", "limit", "reclaim"):
+        print("❗--dry-run / --resume 仅用于 del、limit、reclaim 命令")
+        sys.exit(1)
+    if dry_run and resume:
+        print("❗--dry-run 与 --resume 不能同时使用")
+        sys.exit(1)
+    fleet = Fleet([Instance(name) for name in read_env_names(cli_options.get("env"))])
+    for inst in fleet.instances:
+        inst.offline = bool(cli_options.get("offline"))
+
+    try:
+        if resume:
+            resume_journal(cmd)
+        elif cmd == "export":
+            export_missing_trackers(output, fmt)
+        elif cmd == "del":
+            if len(cli_args) == 1:
+                delete_missing_trackers(dry_run)
+            elif len(cli_args) == 3:
+                name = cli_args[1]
+                try:
+                    size = int(cli_args[2])
+                    delete_specific_torrent(name, size, dry_run)
+                except ValueError:
+                    print("❌ 第三个参数必须是整数大小（字节）")
+            else:
+                print("❗用法: python qbt.py del 或 python qbt.py del <种子名称> <大小（字节）>")
+        elif cmd == "limit":
+            limit_upload_speed_by_tracker(dry_run)
+        elif cmd == "total":
+            export_tracker_summary(output, fmt)
+        elif cmd == "stats":
+            export_stats(output, fmt)
+        elif cmd == "search":
+            keyword = cli_args[1] if len(cli_args) > 1 else None
+            min_size = int(cli_args[2]) if len(cli_args) > 2 else None
+            max_size = int(cli_args[3]) if len(cli_args) > 3 else None
             try:
-                size = int(sys.argv[3])
-                delete_specific_torrent(name, size)
-            except ValueError:
-                print("❌ 第三个参数必须是整数大小（字节）")
-        else:
-            print("❗用法: python qbt.py del 或 python qbt.py del <种子名称> <大小（字节）>")
-    elif cmd == "limit":
-        limit_upload_speed_by_tracker()
-    elif cmd == "total":
-        export_tracker_summary()
-    elif cmd == "search":
-        keyword = sys.argv[2] if len(sys.argv) > 2 else None
-        min_size = int(sys.argv[3]) if len(sys.argv) > 3 else None
-        max_size = int(sys.argv[4]) if len(sys.argv) > 4 else None
-        export_torrents_by_filter(keyword, min_size, max_size)
-    else:
-        print(f"❗未知指令: {cmd}，请用 export / del / limit / total / search")
\ No newline at end of file
+                query = SearchQuery(
+                    keyword, min_size, max_size,
+                    regex=cli_options.get("regex"),
+                    trackers=cli_options.get("tracker"),
+                    added_after=cli_options.get("after"),
+                    added_before=cli_options.get("before"),
+                    match_files=bool(cli_options.get("files")),
+                    status=cli_options.get("state"),
+                    category=cli_options.get("category"),
+                    tag=cli_options.get("tag"),
+                )
+            except ValueError as e:
+                print(f"❌ 搜索条件无效：{e}")
+            else:
+                export_torrents_by_filter(query, output, fmt)
+        elif cmd == "watch":
+            watch_torrents(cli_options.get("interval"))
+        elif cmd == "reclaim":
+            if len(cli_args) != 2:
+                print("❗用法: python qbt.py reclaim <需要释放的大小，如 5TB 或字节数>")
+            else:
+                try:
+                    target = parse_size(cli_args[1])
+                except ValueError as e:
+                    print(f"❌ {e}")
+                else:
+                    if target <= 0:
+                        print("❌ 需要释放的大小必须大于 0")
+                    else:
+                        reclaim_space(target, output, fmt, dry_run)
+    finally:
+        fleet.close()
+    profiler.report(cli_options.get("profile-json"))
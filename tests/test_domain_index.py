@@ -0,0 +1,37 @@
+"""DomainIndex：最具体的规则优先，多个 tracker 时结果与 tracker 顺序无关"""
+import itertools
+
+import qbt
+
+RULES = {"your.cc": 100, "pt.your.cc": 600, "ptl.your": 300, "m-your": 50}
+
+
+def test_most_specific_rule_for_host():
+    index = qbt.DomainIndex(RULES)
+    assert index.match("https://tracker.pt.your.cc/announce?passkey=m-your")[1] == 600
+    assert index.match("https://other.your.cc/announce")[1] == 100
+    # 部分匹配只在没有完整域名匹配时使用
+    assert index.match("https://ptl.your.org/announce")[1] == 300
+    assert index.match("https://example.org/announce/your.cc") is None
+
+
+def test_best_is_order_independent():
+    index = qbt.DomainIndex(RULES)
+    urls = [
+        "https://ptl.your.org/announce",
+        "https://tracker.pt.your.cc/announce",
+        "https://a.your.cc/announce",
+        "udp://tracker.m-your.net:6969/announce",
+        "https://example.org/announce",
+    ]
+    results = {index.best(list(order)) for order in itertools.permutations(urls)}
+    assert results == {("pt.your.cc", 600, "https://tracker.pt.your.cc/announce")}
+
+
+def test_best_prefers_full_domain_over_fragment():
+    index = qbt.DomainIndex({"tracker.pt.your": 300, "a.cc": 100})
+    urls = ["https://tracker.pt.your.org/announce", "https://x.a.cc/announce"]
+    assert index.best(urls)[1] == 100
+    assert index.best(urls[::-1])[1] == 100
+    assert index.best(["https://example.org/announce"]) is None
+    assert index.best([]) is None
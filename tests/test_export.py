@@ -0,0 +1,28 @@
+"""ExportWriter 导出到标准输出时，下游提前关闭管道（如 | head）静默退出"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import qbt
+with qbt.ExportWriter("-", {fmt!r}, [("name", "种子名称"), ("size", "大小（字节）")]) as writer:
+    for i in range(200000):
+        writer.write({{"name": "torrent-%d" % i, "size": i}})
+"""
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "csv.gz"])
+def test_broken_pipe_exits_quietly(fmt):
+    process = subprocess.Popen(
+        [sys.executable, "-c", SCRIPT.format(fmt=fmt)],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    process.stdout.read(100)
+    process.stdout.close()
+    stderr = process.stderr.read().decode()
+    assert process.wait() == 141
+    assert "Traceback" not in stderr
@@ -0,0 +1,31 @@
+"""content_fingerprint：只去掉与种子名相同的顶层目录"""
+import qbt
+
+
+def files(*items):
+    return [{"name": name, "size": size} for name, size in items]
+
+
+def test_renamed_root_matches():
+    a = qbt.content_fingerprint(files(("Show.S01/e01.mkv", 10), ("Show.S01/e02.mkv", 20)), "Show.S01")
+    b = qbt.content_fingerprint(files(("Show.S01.REPACK/e01.mkv", 10), ("Show.S01.REPACK/e02.mkv", 20)), "Show.S01.REPACK")
+    assert a == b
+
+
+def test_directories_without_root_are_kept():
+    # 没有顶层目录的种子，CD1 / CD2 是内容的一部分
+    a = qbt.content_fingerprint(files(("CD1/track.flac", 10), ("CD2/track.flac", 10)), "Album")
+    b = qbt.content_fingerprint(files(("CD1/track.flac", 10), ("CD3/track.flac", 10)), "Other")
+    c = qbt.content_fingerprint(files(("Disc/track.flac", 10), ("Disc/track.flac", 10)), "Other")
+    assert len({a, b, c}) == 3
+
+
+def test_single_file_keeps_name():
+    a = qbt.content_fingerprint(files(("movie.mkv", 10),), "movie.mkv")
+    b = qbt.content_fingerprint(files(("other.mkv", 10),), "other.mkv")
+    assert a != b
+    assert a.startswith(qbt.FINGERPRINT_VERSION)
+
+
+def test_piece_size_suffix():
+    assert qbt.content_fingerprint(files(("a/b", 1),), "a", 16384).endswith(":16384")
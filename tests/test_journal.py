@@ -0,0 +1,109 @@
+"""执行日志：重放手工构造的日志，检查 remaining / uncertain / paused_before / 失败重试与 finish"""
+import json
+from types import SimpleNamespace
+
+import qbt
+
+
+def write_journal(tmp_path, *entries, tail=""):
+    inst = SimpleNamespace(name="home", cache_path=str(tmp_path / "home.db"))
+    journal = qbt.Journal("limit", [inst])
+    with open(journal.path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+        f.write(tail)
+    return journal
+
+
+def plan(*hashes, action="limit"):
+    return [{"op": "plan", "instance": "home", "hash": h, "action": action} for h in hashes] + [{"op": "planned"}]
+
+
+def step(op, step_name, *hashes):
+    return {"op": op, "instance": "home", "step": step_name, "hashes": list(hashes)}
+
+
+def test_crash_mid_batch(tmp_path):
+    journal = write_journal(
+        tmp_path,
+        {"op": "start", "command": "limit"},
+        *plan("a", "b", "c", "d"),
+        step("begin", "limit", "a", "b"),
+        step("done", "limit", "a", "b"),
+        step("begin", "limit", "c", "d"),
+    )
+    state = journal.load()
+    assert state.planned and not state.finished
+    assert state.remaining("home", "limit") == ["c", "d"]
+    assert state.uncertain("home", "limit", ["c", "d"]) == ["c", "d"]
+    assert state.pending() == 2
+    assert state.failures() == 0
+
+
+def test_truncated_last_line_ignored(tmp_path):
+    journal = write_journal(
+        tmp_path,
+        *plan("a", "b"),
+        step("begin", "limit", "a", "b"),
+        tail='{"op": "done", "instance": "home", "step": "limit", "hash',
+    )
+    assert journal.load().remaining("home", "limit") == ["a", "b"]
+
+
+def test_failed_entries_stay_remaining(tmp_path):
+    journal = write_journal(
+        tmp_path,
+        *plan("a", "b"),
+        step("begin", "limit", "a", "b"),
+        step("done", "limit", "a"),
+        step("fail", "limit", "b"),
+    )
+    state = journal.load()
+    assert state.remaining("home", "limit") == ["b"]
+    assert state.failures() == 1
+
+
+def test_retry_success_clears_failure(tmp_path):
+    journal = write_journal(
+        tmp_path,
+        *plan("a"),
+        step("fail", "limit", "a"),
+        {"op": "resume"},
+        step("begin", "limit", "a"),
+        step("done", "limit", "a"),
+    )
+    state = journal.load()
+    assert state.remaining("home", "limit") == []
+    assert state.failures() == 0
+
+
+def test_paused_before_follows_journal_order(tmp_path):
+    journal = write_journal(
+        tmp_path,
+        *plan("a", "b", "c"),
+        # a：暂停后已恢复；b：恢复后又被暂停；c：暂停请求发出后崩溃
+        step("begin", "pause", "a", "b"),
+        step("done", "pause", "a", "b"),
+        step("begin", "resume", "a", "b"),
+        step("done", "resume", "a", "b"),
+        {"op": "resume"},
+        step("begin", "pause", "b", "c"),
+        step("done", "pause", "b"),
+    )
+    assert journal.load().paused_before("home") == {"b", "c"}
+
+
+def test_finish_only_without_failures(tmp_path):
+    journal = write_journal(tmp_path, *plan("a", "b"))
+    journal.reopen()
+    journal.record("home", "limit", "fail", ["b"])
+    journal.record("home", "limit", "done", ["a"])
+    assert not journal.finish()
+    assert not journal.load().finished
+
+    journal.reopen()
+    journal.record("home", "limit", "done", ["b"])
+    assert journal.finish()
+    state = journal.load()
+    assert state.finished
+    assert state.remaining("home", "limit") == []
@@ -0,0 +1,111 @@
+"""iter_torrent_pages：翻页期间种子增删时不漏、不重复，以及每页 1、2 个种子的边界情况"""
+import json
+import random
+
+import pytest
+
+import qbt
+
+
+class FakeClient:
+    """按 hash 排序、按 limit / offset 返回种子的 torrents/info；before_page 在每次请求前修改种子列表"""
+
+    def __init__(self, hashes, before_page=None, max_calls=10000):
+        self.hashes = set(hashes)
+        self.before_page = before_page
+        self.max_calls = max_calls
+        self.calls = 0
+
+    def _post_cast(self, _name, _method, data, response_class):
+        self.calls += 1
+        if self.calls > self.max_calls:
+            raise AssertionError("翻页没有结束")
+        if self.before_page is not None:
+            self.before_page(self, data.get("offset", 0))
+        ordered = self.ordered()
+        if "limit" in data:
+            ordered = ordered[data["offset"]:data["offset"] + data["limit"]]
+        return json.dumps([{"hash": h, "name": h, "added_on": 0} for h in ordered]).encode()
+
+    def ordered(self):
+        return sorted(self.hashes)
+
+
+def make_hashes(count, seed=0):
+    rng = random.Random(seed)
+    return ["%040x" % rng.getrandbits(160) for _ in range(count)]
+
+
+def listed(client, page_size):
+    return [t.hash for t in qbt.iter_torrent_pages(client, None, page_size)]
+
+
+@pytest.mark.parametrize("page_size", [0, 1, 2, 3, 7, 100, 1000])
+def test_stable_list(page_size):
+    hashes = make_hashes(250)
+    assert listed(FakeClient(hashes), page_size) == sorted(hashes)
+
+
+@pytest.mark.parametrize("page_size", [2, 3, 10, 40])
+@pytest.mark.parametrize("seed", range(5))
+def test_removals_do_not_skip(page_size, seed):
+    rng = random.Random(seed)
+    hashes = make_hashes(300, seed)
+    removed = set()
+
+    def remove(client, offset):
+        # 删除已经列出的位置之前的种子，使后续页面整体前移
+        before = client.ordered()[:offset]
+        victims = rng.sample(before, min(len(before), rng.choice([1, page_size, 3 * page_size])))
+        client.hashes.difference_update(victims)
+        removed.update(victims)
+
+    result = listed(FakeClient(hashes, remove), page_size)
+    assert len(result) == len(set(result))
+    assert set(hashes) - removed <= set(result)
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 10])
+def test_additions_do_not_duplicate(page_size):
+    rng = random.Random(1)
+    hashes = make_hashes(120)
+
+    def add(client, offset):
+        if client.calls % 5 == 0:
+            client.hashes.update(make_hashes(rng.randint(1, 3), rng.random()))
+
+    result = listed(FakeClient(hashes, add), page_size)
+    assert len(result) == len(set(result))
+    assert set(hashes) <= set(result)
+
+
+def test_single_item_pages_terminate_with_removals():
+    hashes = make_hashes(50)
+
+    def remove(client, offset):
+        if offset and client.hashes:
+            client.hashes.discard(client.ordered()[0])
+
+    client = FakeClient(hashes, remove, max_calls=200)
+    result = listed(client, 1)
+    assert len(result) == len(set(result))
+
+
+def test_unstable_server_terminates():
+    hashes = make_hashes(100)
+    rng = random.Random(2)
+
+    class Unstable(FakeClient):
+        # 服务端每次请求都重新排列，且不断删除种子
+        def ordered(self):
+            items = list(self.hashes)
+            rng.shuffle(items)
+            return items
+
+    def remove(client, offset):
+        if client.hashes:
+            client.hashes.discard(rng.choice(sorted(client.hashes)))
+
+    client = Unstable(hashes, remove, max_calls=500)
+    result = listed(client, 10)
+    assert len(result) == len(set(result))
@@ -0,0 +1,78 @@
+"""plan_reclaim：截断位置的单组收尾（树状数组查询）、去掉多余的组、一换一修正，以及与穷举最优解的差距"""
+import itertools
+import random
+
+import qbt
+
+
+def make(*items):
+    return [qbt.ReclaimCandidate([], freed, value) for freed, value in items]
+
+
+def total(plan):
+    return sum(c.freed for c in plan), sum(c.value for c in plan)
+
+
+def optimum(candidates, target):
+    return min(
+        sum(c.value for c in subset)
+        for r in range(1, len(candidates) + 1)
+        for subset in itertools.combinations(candidates, r)
+        if sum(c.freed for c in subset) >= target
+    )
+
+
+def test_not_enough_space():
+    assert qbt.plan_reclaim(make((10, 1), (20, 1)), 31) is None
+
+
+def test_zero_target_needs_nothing():
+    assert qbt.plan_reclaim(make((10, 1), (20, 1)), 0) == []
+    assert qbt.plan_reclaim([], 0) == []
+
+
+def test_single_group_finishes_cut():
+    # 密度最低的两个组凑不够目标，用一个较大的组收尾比继续按密度取更便宜
+    candidates = make((10, 1.0), (10, 1.1), (50, 8.0), (25, 3.0))
+    freed, value = total(qbt.plan_reclaim(candidates, 30))
+    assert freed >= 30
+    assert value == optimum(candidates, 30) == 4.0
+
+
+def test_cheapest_finisher_among_large_groups():
+    # 能单独补足空间的组中取价值最低的，而不是最大或最先插入的
+    candidates = make((5, 0.5), (100, 9.0), (60, 4.0), (40, 6.0))
+    plan = qbt.plan_reclaim(candidates, 50)
+    # 收尾的组单独就够，前面取的小组随后被去掉
+    assert total(plan) == (60, 4.0)
+
+
+def test_oversized_group_does_not_win_by_density():
+    # 超出目标的空间不计入密度，特别大的组不会因此排在最前
+    candidates = make((19, 1.76), (12, 1.04), (23, 5.15), (540, 9.25))
+    assert round(total(qbt.plan_reclaim(candidates, 27))[1], 2) == 2.8
+
+
+def test_prune_drops_redundant_groups():
+    chosen = make((10, 5.0), (30, 1.0), (30, 1.0))
+    assert total(qbt.prune_reclaim(chosen, 60)) == (60, 2.0)
+
+
+def test_swap_replaces_expensive_group():
+    candidates = make((30, 1.0), (30, 9.0), (35, 2.0))
+    chosen = candidates[:2]
+    assert qbt.swap_reclaim(chosen, candidates, 60)
+    assert total(chosen) == (65, 3.0)
+    assert not qbt.swap_reclaim(chosen, candidates, 60)
+
+
+def test_within_twice_optimum():
+    rng = random.Random(5)
+    for _ in range(1500):
+        candidates = make(*((rng.randint(1, 200), rng.random() * 10) for _ in range(rng.randint(1, 8))))
+        target = rng.randint(1, sum(c.freed for c in candidates))
+        plan = qbt.plan_reclaim(candidates, target)
+        freed, value = total(plan)
+        assert freed >= target
+        assert len({id(c) for c in plan}) == len(plan)
+        assert value <= 2 * optimum(candidates, target) + 1e-9
@@ -0,0 +1,129 @@
+"""规则引擎与多模式匹配：与逐个子串判断、原来的三个检查策略结果一致"""
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import qbt
+
+
+def substring_search(patterns, text, ignore_case=False):
+    if ignore_case:
+        return any(p.lower() in text.lower() for p in patterns)
+    return any(p in text for p in patterns)
+
+
+@pytest.mark.parametrize("patterns, text, expected", [
+    (["he", "she", "his", "hers"], "ushers", True),
+    (["abcd", "bc"], "xabcx", True),  # 在长模式的中途失配后仍能找到短模式
+    (["abcd", "bcd"], "abcbcd", True),
+    (["aaab"], "aaaab", True),
+    (["abc"], "ab", False),
+    ([], "anything", False),
+    ([""], "", True),  # 与 "" in text 一样，空模式匹配任何文本
+    (["x", ""], "abc", True),
+])
+def test_matcher_cases(patterns, text, expected):
+    assert qbt.MultiPatternMatcher(patterns).search(text) is expected
+    assert substring_search(patterns, text) is expected
+
+
+def test_matcher_case_handling():
+    assert not qbt.MultiPatternMatcher(["FRDS"]).search("movie-frds")
+    assert qbt.MultiPatternMatcher(["FRDS"], ignore_case=True).search("movie-frds")
+    assert qbt.MultiPatternMatcher(["frds"], ignore_case=True).search("MOVIE-FRDS")
+
+
+@pytest.mark.parametrize("ignore_case", [False, True])
+@pytest.mark.parametrize("memoize", [False, True])
+def test_matcher_matches_substring_search(ignore_case, memoize):
+    rng = random.Random(7)
+    alphabet = "abAB."
+    for _ in range(300):
+        patterns = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0 if rng.random() < 0.05 else 1, 4)))
+                    for _ in range(rng.randint(0, 5))]
+        matcher = qbt.MultiPatternMatcher(patterns, ignore_case=ignore_case, memoize=memoize)
+        for _ in range(20):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            assert matcher.search(text) == substring_search(patterns, text, ignore_case)
+            assert matcher.search(text) == substring_search(patterns, text, ignore_case)
+
+
+class Meta:
+    def __init__(self, trackers):
+        self._trackers = trackers
+
+    def trackers(self, torrent):
+        return self._trackers[torrent.hash]
+
+
+def torrent(h, name="Movie.2020-ABC", tags="", state="uploading", size=100, ratio=1.0, added_on=0):
+    return qbt.TorrentRecord(
+        {"hash": h, "name": name, "tags": tags, "state": state, "total_size": size, "ratio": ratio, "added_on": added_on}
+    )
+
+
+def test_composition_and_unknown_results():
+    group = qbt.GroupView([torrent("a", tags="Keep, x"), torrent("b", state="pausedUP")])
+    meta = Meta({"a": ["https://pt.one.cc/a"], "b": []})
+    evaluate = lambda spec, m=meta: qbt.compile_rule(spec).evaluate(group, m)  # noqa: E731
+    assert evaluate({"tag_in": ["KEEP"]}) is True  # 标签不区分大小写
+    assert evaluate({"state_in": ["pausedUP"]}) is True  # 组内任一种子满足即可
+    assert evaluate({"not": {"state_in": ["error"]}}) is True
+    assert evaluate({"any": [{"tag_in": ["none"]}, {"size": {"min": 50}}]}) is True
+    assert evaluate([{"tag_in": ["keep"]}, {"size": {"max": 50}}]) is False
+    assert evaluate({"tag_in": ["keep"], "ratio": {"min": 2}}) is False
+    # 缺少 tracker 时无法判断；其他条件已经能确定结果时不需要 tracker
+    assert evaluate({"tracker_contains": ["one.cc"]}, None) is None
+    assert evaluate({"all": [{"tracker_contains": ["one.cc"]}, {"size": {"max": 50}}]}, None) is False
+    assert evaluate({"any": [{"tracker_contains": ["one.cc"]}, {"size": {"min": 50}}]}, None) is True
+    assert evaluate({"not": {"tracker_contains": ["one.cc"]}}, None) is None
+    assert evaluate({"tracker_not_contains": ["two.cc"]}) is True
+
+
+@pytest.mark.parametrize("spec", [{}, [], {"all": []}, {"any": []}, {"unknown": 1}, "tag_in"])
+def test_invalid_rules(spec):
+    with pytest.raises(ValueError):
+        qbt.compile_rule(spec)
+
+
+# 原来的三个检查策略（逐组判断，串行过滤即全部满足）
+def baseline(group, trackers, required, official, forbidden):
+    urls = {url for t in group for url in trackers[t.hash]}
+    if any(any(req in url for req in required) for url in urls):
+        return False
+    if any(name.lower() in group[0].name.lower() for name in official):
+        return False
+    for t in group:
+        tags = [tag.strip().lower() for tag in t.tags.split(",")] if t.tags else []
+        if any(tag in [f.lower() for f in forbidden] for tag in tags):
+            return False
+    return True
+
+
+def test_strategies_match_baseline():
+    rng = random.Random(11)
+    sites = ["https://pt.one.cc/announce", "https://Tracker.Two.cc/a", "udp://three.org:80", "https://req.site/x"]
+    names = ["Movie.2020-ABC", "Show.S01-abc", "Film-XYZ", "Other.aaa"]
+    tags = ["", "keep", "KEEP, other", " Keep ", "other", "pt, Seed"]
+    for _ in range(500):
+        required = rng.sample(["req.site", "two.cc", "Two.cc", ""], rng.randint(0, 2))
+        official = rng.sample(["ABC", "xyz", "bbb"], rng.randint(1, 2))
+        forbidden = rng.sample(["keep", "Seed", "none"], rng.randint(0, 2))
+        group = [torrent(str(i), name=rng.choice(names), tags=rng.choice(tags)) for i in range(rng.randint(1, 3))]
+        trackers = {t.hash: rng.sample(sites, rng.randint(0, 3)) for t in group}
+        config = SimpleNamespace(
+            active_strategies=["missing_trackers", "official_group", "tracker_tag_filter"],
+            check_strategies={
+                "missing_trackers": {"required_trackers": required},
+                "official_group": {"groups": {"g": official}, "selected_group": "g"},
+                "tracker_tag_filter": {"forbidden_tags": forbidden},
+            },
+        )
+        _, rule = qbt.build_strategies(config)
+        view = qbt.GroupView(group)
+        meta = Meta(trackers)
+        expected = baseline(group, trackers, required, official, forbidden)
+        cheap = rule.evaluate(view, None)
+        assert cheap in (None, expected)
+        assert rule.evaluate(view, meta) is expected
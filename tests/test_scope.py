@@ -0,0 +1,37 @@
+"""query.scope 按种子组选择：组内任一种子在范围内即选中整组，规则求值作用于整组"""
+from types import SimpleNamespace
+
+import qbt
+
+HOME = SimpleNamespace(name="home", scope=qbt.TorrentQuery("seeding"))
+SEEDBOX = SimpleNamespace(name="seedbox", scope=qbt.TorrentQuery())
+
+
+def torrent(h, name, state, inst=HOME, tags=""):
+    record = qbt.TorrentRecord({"hash": h, "name": name, "total_size": 100, "state": state, "tags": tags})
+    record.instance = inst
+    return record
+
+
+def test_group_selected_when_any_member_in_scope():
+    groups = {
+        "a": [torrent("a1", "a", "uploading"), torrent("a2", "a", "pausedUP")],
+        "b": [torrent("b1", "b", "pausedUP")],
+        "c": [torrent("c1", "c", "pausedUP"), torrent("c2", "c", "pausedUP", SEEDBOX)],
+    }
+    selected = qbt.select_scoped_groups(groups)
+    assert list(selected) == ["a", "c"]
+    # 范围外的辅种仍在组内，删除时一并处理
+    assert [t.hash for t in selected["a"]] == ["a1", "a2"]
+
+
+def test_rules_see_out_of_scope_members():
+    groups = {
+        # 暂停的辅种带有保护标签：整组不应命中
+        "a": [torrent("a1", "a", "uploading"), torrent("a2", "a", "pausedUP", tags="keep")],
+        "b": [torrent("b1", "b", "uploading"), torrent("b2", "b", "pausedUP")],
+    }
+    rule = qbt.compile_rule({"not": {"tag_in": ["keep"]}})
+    matched = qbt.filter_groups(rule, qbt.select_scoped_groups(groups), None)
+    assert list(matched) == ["b"]
+    assert [t.hash for t in matched["b"]] == ["b1", "b2"]
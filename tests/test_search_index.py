@@ -0,0 +1,101 @@
+"""SearchIndex：增量刷新与 trigram 查询，少于 3 个字符的关键词退回逐行匹配，结果与逐个匹配一致"""
+import random
+
+import pytest
+
+import qbt
+
+
+def record(h, name, size=100, added_on=0, tracker=""):
+    return qbt.TorrentRecord({"hash": h, "name": name, "total_size": size, "added_on": added_on, "tracker": tracker})
+
+
+def make_index(torrents, fts=True):
+    index = qbt.SearchIndex(qbt.open_cache_db(":memory:"))
+    if not fts:
+        index.fts = False  # 模拟不支持 trigram 的 SQLite
+    index.refresh(torrents)
+    return index
+
+
+def search(index, *args, **kwargs):
+    return index.query(qbt.SearchQuery(*args, **kwargs))
+
+
+TORRENTS = {
+    "a": record("a", "The.Matrix.1999.1080p", 10, 100),
+    "b": record("b", "Matrix.Reloaded.2003", 20, 200),
+    "c": record("c", "Up.2009.720p", 30, 300),
+    "d": record("d", 'Say "Quoted" Name', 40, 400),
+}
+
+
+@pytest.mark.parametrize("fts", [True, False])
+def test_keywords(fts):
+    index = make_index(dict(TORRENTS), fts)
+    assert index.fts is fts
+    assert search(index, "matrix") == ["a", "b"]
+    assert search(index, "MATRIX 1080p") == ["a"]
+    # 少于 3 个字符的关键词不能使用 trigram 索引，逐行匹配
+    assert search(index, "up") == ["c"]
+    assert search(index, "p") == ["a", "c"]
+    assert search(index, "up 720p") == ["c"]
+    assert search(index, '"quoted"') == ["d"]
+    assert search(index, "nothing") == []
+
+
+def test_ranges_and_regex():
+    index = make_index(dict(TORRENTS))
+    assert search(index, None, 15, 30) == ["b", "c"]
+    assert search(index, "matrix", min_size=15) == ["b"]
+    assert search(index, None, regex=r"^up\.") == ["c"]
+    query = qbt.SearchQuery(None, added_after="1970-01-01")
+    query.added_after, query.added_before = 150, 350
+    assert index.query(query) == ["b", "c"]
+
+
+def test_incremental_refresh():
+    torrents = dict(TORRENTS)
+    index = make_index(torrents)
+    torrents["a"] = record("a", "Renamed.Film.1999", 10, 100)
+    del torrents["b"]
+    torrents["e"] = record("e", "New.Matrix.Resurrections", 50, 500)
+    index.refresh(torrents)
+    assert index.count() == 4
+    assert search(index, "matrix") == ["e"]
+    assert search(index, "renamed") == ["a"]
+    assert search(index, "reloaded") == []
+
+
+def test_file_paths():
+    index = make_index(dict(TORRENTS))
+    files = {"a": ["The.Matrix.1999.1080p/extras/Making.Of.mkv"], "c": ["Up.2009.720p/up.mkv"]}
+    requested = []
+
+    def fetch_files(hashes):
+        requested.append(sorted(hashes))
+        return {h: files[h] for h in hashes if h in files}
+
+    index.refresh(dict(TORRENTS), fetch_files)
+    assert search(index, "making", match_files=True) == ["a"]
+    assert search(index, "making") == []
+    # 获取失败的种子下次重试，已索引的不再请求
+    index.refresh(dict(TORRENTS), fetch_files)
+    assert requested == [["a", "b", "c", "d"], ["b", "d"]]
+
+
+@pytest.mark.parametrize("fts", [True, False])
+def test_matches_linear_search(fts):
+    rng = random.Random(3)
+    words = ["matrix", "up", "a", "The", "ab", "abc", "1080p", "x264", "Re"]
+    torrents = {
+        "%03d" % i: record("%03d" % i, ".".join(rng.choice(words) for _ in range(rng.randint(1, 4))), rng.randint(1, 50))
+        for i in range(200)
+    }
+    index = make_index(torrents, fts)
+    for _ in range(200):
+        keyword = " ".join(rng.choice(words + ["tri", "x2", "p", "atr"]) for _ in range(rng.randint(1, 2)))
+        min_size = rng.choice([None, 10])
+        query = qbt.SearchQuery(keyword, min_size)
+        expected = [h for h, t in sorted(torrents.items()) if query.matches(t)]
+        assert index.query(query) == expected
@@ -0,0 +1,107 @@
+"""SnapshotStore：按 rid 增量同步 sync/maindata（全量同步、移除、部分字段合并），内存与数据库保持一致"""
+import json
+
+import qbt
+
+
+class MaindataClient:
+    """按顺序返回预先准备的 sync/maindata 响应，并记录请求的 rid"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.rids = []
+
+    def _post_cast(self, _name, _method, data, response_class):
+        self.rids.append(data["rid"])
+        return json.dumps(self.responses.pop(0)).encode()
+
+
+def torrent(name, **fields):
+    return dict({"name": name, "total_size": 100, "added_on": 1, "state": "uploading", "tags": ""}, **fields)
+
+
+def stored(store):
+    return {h: json.loads(data) for h, data in store.db.execute("SELECT hash, data FROM torrents")}
+
+
+def make_store():
+    return qbt.SnapshotStore(qbt.open_cache_db(":memory:"))
+
+
+def test_full_then_partial_updates():
+    store = make_store()
+    client = MaindataClient(
+        {"rid": 1, "full_update": True, "torrents": {"a": torrent("a", ratio=0.5), "b": torrent("b")}},
+        {"rid": 2, "torrents": {"a": {"ratio": 1.5, "tags": "keep"}, "c": torrent("c")}, "torrents_removed": ["b"]},
+        {"rid": 3},
+    )
+    changed, removed, full_update = store.apply(client)
+    assert full_update and set(changed) == {"a", "b"} and removed == []
+
+    changed, removed, full_update = store.apply(client)
+    assert not full_update
+    assert changed == {"a": {"ratio": 1.5, "tags": "keep"}, "c": torrent("c")}
+    assert removed == ["b"]
+    # 部分字段合并：未变化的字段保留
+    a = store.torrents["a"]
+    assert (a.name, a.ratio, a.tags, a.total_size, a.state) == ("a", 1.5, "keep", 100, "uploading")
+    assert set(store.torrents) == {"a", "c"}
+    rows = stored(store)
+    assert set(rows) == {"a", "c"}
+    assert rows["a"] == a.to_dict()
+
+    assert store.apply(client) == ({}, [], False)
+    assert client.rids == [0, 1, 2]
+    assert store.get_meta("rid") == "3"
+
+
+def test_full_update_drops_missing_torrents():
+    store = make_store()
+    client = MaindataClient(
+        {"rid": 1, "full_update": True, "torrents": {"a": torrent("a"), "b": torrent("b")}},
+        {"rid": 7, "full_update": True, "torrents": {"b": torrent("b", state="pausedUP")}},
+    )
+    store.apply(client)
+    changed, removed, full_update = store.apply(client)
+    assert full_update and removed == ["a"]
+    assert set(store.torrents) == set(stored(store)) == {"b"}
+    assert store.torrents["b"].state == "pausedUP"
+
+
+def test_reload_from_database():
+    db = qbt.open_cache_db(":memory:")
+    qbt.SnapshotStore(db).apply(MaindataClient({"rid": 4, "full_update": True, "torrents": {"a": torrent("a")}}))
+    store = qbt.SnapshotStore(db)
+    # 未加载到内存时直接从数据库读取
+    assert [t.name for t in store.get(["a", "missing"])] == ["a"]
+    client = MaindataClient({"rid": 5, "torrents": {"a": {"upspeed": 9}}})
+    store.apply(client)
+    assert client.rids == [4]
+    assert store.torrents["a"].name == "a" and store.torrents["a"].upspeed == 9
+
+
+def test_delta_for_unknown_torrent_resyncs():
+    store = make_store()
+    client = MaindataClient(
+        {"rid": 1, "full_update": True, "torrents": {"a": torrent("a")}},
+        # 本地没有 b 的完整信息，只能重新全量同步
+        {"rid": 2, "torrents": {"b": {"ratio": 2.0}}},
+        {"rid": 3, "full_update": True, "torrents": {"a": torrent("a"), "b": torrent("b", ratio=2.0)}},
+    )
+    store.apply(client)
+    changed, removed, full_update = store.apply(client)
+    assert full_update and client.rids == [0, 1, 0]
+    assert store.torrents["b"].ratio == 2.0
+
+
+def test_field_upgrade_forces_full_sync():
+    store = make_store()
+    client = MaindataClient(
+        {"rid": 1, "full_update": True, "torrents": {"a": torrent("a")}},
+        {"rid": 2, "full_update": True, "torrents": {"a": torrent("a")}},
+    )
+    store.apply(client)
+    # 旧版本保存的字段较少
+    store.set_meta("fields", "hash,name")
+    store.apply(client)
+    assert client.rids == [0, 0]
@@ -0,0 +1,87 @@
+"""stats：NumPy 分组汇总与逐个种子的朴素计算一致；tracker 维度使用全部 tracker"""
+import random
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+
+import qbt
+
+np = pytest.importorskip("numpy")
+
+
+def naive_stats(codes, labels, columns):
+    rows = {}
+    members = defaultdict(list)
+    for i, code in enumerate(codes):
+        members[code].append(i)
+    for code, items in members.items():
+        ratios = [columns["ratio"][i] for i in items]
+        unique = {columns["group"][i]: columns["size"][i] for i in items}
+        row = {
+            "count": len(items),
+            "total_size": sum(columns["size"][i] for i in items),
+            "unique_size": sum(unique.values()),
+            "uploaded": sum(columns["uploaded"][i] for i in items),
+            "ratio_mean": round(sum(ratios) / len(items), 3),
+            "avg_upspeed": round(sum(columns["upspeed"][i] for i in items) / len(items)),
+        }
+        for key, q in qbt.STATS_RATIO_QUANTILES.items():
+            row[key] = round(float(np.percentile(ratios, q * 100)), 3)
+        rows[labels[code]] = row
+    return rows
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_aggregate_matches_naive(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 300)
+    labels = ["label-%d" % i for i in range(rng.randint(1, 12))]
+    codes = [rng.randrange(len(labels)) for _ in range(n)]
+    groups = [rng.randrange(max(1, n // 3)) for _ in range(n)]
+    group_size = {g: rng.randint(1, 10 ** 12) for g in groups}
+    columns = {
+        "size": [group_size[g] for g in groups],
+        "uploaded": [rng.randint(0, 10 ** 13) for _ in range(n)],
+        "ratio": [round(rng.random() * 5, 2) if rng.random() < 0.8 else 1.0 for _ in range(n)],
+        "upspeed": [rng.randint(0, 10 ** 7) for _ in range(n)],
+        "group": groups,
+    }
+    arrays = {
+        key: np.asarray(values, dtype=np.float64 if key == "ratio" else np.int64) for key, values in columns.items()
+    }
+    rows = qbt.aggregate_stats(np, np.asarray(codes, dtype=np.int64), labels, arrays)
+    expected = naive_stats(codes, labels, columns)
+    actual = {row.pop("key"): row for row in rows}
+    assert actual.keys() == expected.keys()
+    for key, row in actual.items():
+        # 插值的计算顺序不同，保留三位小数时末位可能相差 1
+        assert row == pytest.approx(expected[key], abs=1.01e-3)
+
+
+def test_tracker_dimension_uses_all_trackers(monkeypatch):
+    trackers = {
+        "a": ["https://pt.one.cc/announce", "https://tracker.two.cc/announce", "https://pt.one.cc/other"],
+        "b": [],
+        "c": ["udp://tracker.two.cc:6969/announce"],
+    }
+    monkeypatch.setattr(qbt, "fleet", SimpleNamespace(multi=False, trackers=lambda t: trackers[t.hash]))
+
+    def torrent(h, tracker, trackers_count):
+        return qbt.TorrentRecord({
+            "hash": h, "name": h, "total_size": 100, "tracker": tracker, "trackers_count": trackers_count,
+            "added_on": 0, "ratio": 1.0,
+        })
+
+    torrents = [
+        # 当前工作的 tracker 只是其中一个
+        torrent("a", "https://tracker.two.cc/announce", 3),
+        # 暂停或出错：当前 tracker 为空
+        torrent("b", "", 0),
+        torrent("c", "", 1),
+        # 单 tracker 种子直接使用当前 tracker，不查询列表
+        torrent("d", "https://pt.one.cc/announce", 1),
+    ]
+    groups = {t.hash: [t] for t in torrents}
+    rows = {row["key"]: row["count"] for row in qbt.compute_stats(np, torrents, groups)["tracker"]}
+    assert rows == {"pt.one.cc": 2, "tracker.two.cc": 2, "（未知）": 1}
@@ -0,0 +1,85 @@
+"""watch：检查策略和 query.scope 读取的字段变化时重新检查，含 age_days 时定时重新检查"""
+import json
+from types import SimpleNamespace
+
+import qbt
+
+
+class MaindataClient:
+    """按顺序返回预先准备的 sync/maindata 响应"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def _post_cast(self, _name, _method, data, response_class):
+        return json.dumps(self.responses.pop(0)).encode()
+
+
+class NullMeta:
+    def retain(self, torrents):
+        pass
+
+    def forget(self, hashes):
+        pass
+
+    def prefetch(self, torrents, **kwargs):
+        pass
+
+
+def make_watcher(match, *responses, scope=None, recheck=3600):
+    instance = SimpleNamespace(
+        name="home", label="", client=MaindataClient(*responses), snapshot=None,
+        scope=scope or qbt.TorrentQuery(), grouping_mode="name_size", meta_cache=NullMeta(),
+        active_strategies=["rules"], check_strategies={"rules": {"match": match}},
+        upload_speed_limits_by_tracker={},
+    )
+    return qbt.Watcher(instance, debounce=0, recheck=recheck)
+
+
+def torrent(name, state, **fields):
+    return dict({"name": name, "total_size": 100, "added_on": 1, "state": state}, **fields)
+
+
+def test_fields_follow_rules_and_scope():
+    assert "state" in make_watcher({"state_in": ["pausedUP"]}).fields
+    assert {"ratio", "added_on"} <= make_watcher({"ratio": {"min": 2}, "age_days": {"min": 30}}).fields
+    watcher = make_watcher({"name_contains": ["x"]}, scope=qbt.TorrentQuery("seeding"))
+    assert "state" in watcher.fields and "ratio" not in watcher.fields
+
+
+def test_state_change_rechecks_group():
+    watcher = make_watcher(
+        {"state_in": ["pausedUP"]},
+        {"rid": 1, "full_update": True, "torrents": {"a": torrent("a", "uploading"), "b": torrent("b", "uploading")}},
+        {"rid": 2, "torrents": {"b": {"state": "pausedUP"}}},
+        {"rid": 3, "torrents": {"a": {"upspeed": 10}}},
+    )
+    watcher.poll()
+    watcher.process()
+    assert not watcher.reported
+    watcher.poll()
+    assert list(watcher.pending) == ["b"]
+    watcher.process()
+    assert watcher.reported == {("b", 100)}
+    # 规则不读取的字段变化不触发检查
+    watcher.poll()
+    assert not watcher.pending
+
+
+def test_age_rules_recheck_periodically():
+    watcher = make_watcher(
+        {"age_days": {"min": 1}},
+        {"rid": 1, "full_update": True, "torrents": {"a": torrent("a", "uploading")}},
+        {"rid": 2},
+        scope=None, recheck=0,
+    )
+    watcher.poll()
+    watcher.process()
+    assert watcher.reported == {("a", 100)}
+    watcher.poll()
+    assert list(watcher.pending) == ["a"]
+    # 已输出过的组不重复输出
+    watcher.process()
+    assert watcher.reported == {("a", 100)}
+
+    assert make_watcher({"state_in": ["pausedUP"]}).recheck is None